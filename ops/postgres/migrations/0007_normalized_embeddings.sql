@@ -0,0 +1,30 @@
+-- 0007_normalized_embeddings.sql
+--
+-- Store claim embeddings unit-normalized so similarity search can use the
+-- inner product operator (<#>) instead of cosine distance (<=>).
+--
+--   embedding_norm : L2 norm of the vector as returned by the provider
+--   is_normalized  : TRUE once embedding holds the unit vector
+--
+-- The backfill is idempotent (only touches rows with is_normalized = FALSE)
+-- and requires pgvector >= 0.7 for l2_normalize().
+
+BEGIN;
+
+ALTER TABLE claim_embedding
+  ADD COLUMN IF NOT EXISTS embedding_norm DOUBLE PRECISION;
+
+ALTER TABLE claim_embedding
+  ADD COLUMN IF NOT EXISTS is_normalized BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Backfill existing rows (zero vectors are left untouched).
+UPDATE claim_embedding
+SET
+  embedding_norm = vector_norm(embedding),
+  embedding      = l2_normalize(embedding),
+  is_normalized  = TRUE,
+  updated_tms    = now()
+WHERE NOT is_normalized
+  AND vector_norm(embedding) > 0;
+
+COMMIT;
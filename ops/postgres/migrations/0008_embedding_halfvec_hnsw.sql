@@ -0,0 +1,50 @@
+-- 0008_embedding_halfvec_hnsw.sql
+--
+-- Half-precision shadow of claim_embedding.embedding with an HNSW index.
+--
+-- pgvector cannot build ivfflat/hnsw on vector(3072) (see 0002), but
+-- halfvec indexes support up to 4000 dimensions. We keep the float vector
+-- as the source of truth (exact similarities for classify()) and maintain
+-- embedding_half from it with a trigger, so every write path stays
+-- unchanged.
+--
+-- Used by semantic-dedupe when PGVECTOR_SEARCH_MODE=halfvec; tune recall
+-- with HNSW_EF_SEARCH. Embeddings are unit-normalized (0007), so the index
+-- uses inner product ops.
+--
+-- Requires pgvector >= 0.7.
+
+BEGIN;
+
+ALTER TABLE claim_embedding
+  ADD COLUMN IF NOT EXISTS embedding_half halfvec(3072);
+
+CREATE OR REPLACE FUNCTION claim_embedding_set_half()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.embedding_half := NEW.embedding::halfvec(3072);
+  RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_claim_embedding_set_half ON claim_embedding;
+CREATE TRIGGER trg_claim_embedding_set_half
+  BEFORE INSERT OR UPDATE OF embedding ON claim_embedding
+  FOR EACH ROW
+  EXECUTE FUNCTION claim_embedding_set_half();
+
+-- Backfill existing rows
+UPDATE claim_embedding
+SET embedding_half = embedding::halfvec(3072)
+WHERE embedding_half IS NULL;
+
+COMMIT;
+
+CREATE INDEX IF NOT EXISTS claim_embedding_half_hnsw
+  ON claim_embedding
+  USING hnsw (embedding_half halfvec_ip_ops)
+  WITH (m = 16, ef_construction = 64);
+
+ANALYZE claim_embedding;
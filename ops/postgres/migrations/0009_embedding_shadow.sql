@@ -0,0 +1,31 @@
+-- 0009_embedding_shadow.sql
+--
+-- Reduced-dimension ("shadow") embeddings for indexed two-stage search.
+--
+-- text-embedding-3 models are trained so that a prefix of the vector is
+-- itself a usable embedding. embedding_short holds the first 1024
+-- components of the unit-normalized embedding, re-normalized. At 1024 dims
+-- it fits pgvector's 2000-dim limit for vector HNSW indexes.
+--
+-- semantic-dedupe writes this column when EMBEDDING_SHADOW_DIMS=1024 and
+-- searches it when PGVECTOR_SEARCH_MODE=shadow: ANN candidates come from
+-- this index, then get an exact rerank on the full vector(3072).
+--
+-- Existing rows are NOT backfilled here (that would rewrite the table in
+-- one transaction). Run the batched job instead:
+--
+--   python -m app.shadow_backfill
+--
+-- Requires pgvector >= 0.7 (subvector, l2_normalize).
+
+BEGIN;
+
+ALTER TABLE claim_embedding
+  ADD COLUMN IF NOT EXISTS embedding_short vector(1024);
+
+COMMIT;
+
+CREATE INDEX IF NOT EXISTS claim_embedding_short_hnsw
+  ON claim_embedding
+  USING hnsw (embedding_short vector_ip_ops)
+  WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,41 @@
+-- 0010_embedding_jobs.sql
+--
+-- Job queue for accept-then-process duplicate checks.
+--
+-- POST /claims/check-duplicate-async records the claim text here and
+-- returns job_id immediately. Worker processes (services/semantic_dedupe/
+-- worker.py) claim queued jobs in batches with FOR UPDATE SKIP LOCKED,
+-- embed them with batched provider calls, run search + cluster assignment
+-- and store the same payload /claims/check-duplicate would have returned
+-- in result. Clients poll GET /claims/jobs/{job_id}.
+--
+-- A job stuck in 'running' past the worker lease (crashed worker) is
+-- claimed again; after EMBEDDING_JOB_MAX_ATTEMPTS it is marked 'failed'.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS claim_embedding_job (
+  job_id       BIGSERIAL PRIMARY KEY,
+  claim_text   TEXT NOT NULL,
+  top_k        INT NOT NULL DEFAULT 5,
+  status       TEXT NOT NULL DEFAULT 'queued'
+    CHECK (status IN ('queued', 'running', 'done', 'failed')),
+  attempts     INT NOT NULL DEFAULT 0,
+  claim_id     BIGINT REFERENCES claim(claim_id) ON DELETE SET NULL,
+  result       JSONB,
+  error        TEXT,
+  locked_tms   TIMESTAMPTZ,
+  created_tms  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_tms  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Claim order: oldest queued first; stale leases are found by locked_tms.
+CREATE INDEX IF NOT EXISTS idx_claim_embedding_job_queued
+  ON claim_embedding_job (job_id)
+  WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS idx_claim_embedding_job_running
+  ON claim_embedding_job (locked_tms)
+  WHERE status = 'running';
+
+COMMIT;
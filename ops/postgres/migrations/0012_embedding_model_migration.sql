@@ -0,0 +1,187 @@
+-- 0012_embedding_model_migration.sql
+--
+-- Support for switching EMBEDDINGS_MODEL without downtime or a wipe
+-- (python -m app.reembed):
+--
+--   claim_embedding_staged   vectors computed with the new model while the
+--                            service keeps serving the current one; one
+--                            row per (model, claim). No dimension is fixed
+--                            here, but promoting into claim_embedding
+--                            requires the column's vector(3072).
+--   claim_embedding_backfill per-model resume checkpoint (highest claim_id
+--                            below which every claim has been staged).
+--
+-- Search only compares vectors of the query claim's own embedding_model,
+-- so claim_embedding may mix models while a promotion is in progress;
+-- semantic_dedupe_check() (0011) is re-created with that filter.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS claim_embedding_staged (
+  embedding_model TEXT NOT NULL,
+  claim_id        BIGINT NOT NULL REFERENCES claim(claim_id) ON DELETE CASCADE,
+  embedding       vector NOT NULL,
+  embedding_norm  DOUBLE PRECISION NOT NULL,
+  created_tms     TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (embedding_model, claim_id)
+);
+
+CREATE TABLE IF NOT EXISTS claim_embedding_backfill (
+  embedding_model TEXT PRIMARY KEY,
+  last_claim_id   BIGINT NOT NULL DEFAULT 0,
+  rows_embedded   BIGINT NOT NULL DEFAULT 0,
+  started_tms     TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_tms     TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION semantic_dedupe_check(
+  p_claim_id       BIGINT,
+  p_top_k          INT,
+  p_join_threshold FLOAT8,
+  p_mode           TEXT DEFAULT 'exact',
+  p_candidates     INT DEFAULT NULL,
+  p_ef_search      INT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_similar    JSONB;
+  v_best_id    BIGINT;
+  v_best_sim   FLOAT8;
+  v_target     BIGINT;
+  v_cluster_id BIGINT;
+  v_canonical  BIGINT;
+  v_assigned   BOOLEAN := FALSE;
+BEGIN
+  -- 1) Top-k (embeddings are unit-normalized: <#> orders like cosine)
+  IF p_mode = 'exact' THEN
+    SELECT COALESCE(
+             jsonb_agg(
+               jsonb_build_object('claim_id', t.claim_id, 'text', t.claim_text, 'similarity', t.similarity)
+               ORDER BY t.similarity DESC
+             ),
+             '[]'::jsonb
+           )
+    INTO v_similar
+    FROM (
+      SELECT c.claim_id, c.claim_text, -(e.embedding <#> q.embedding) AS similarity
+      FROM claim c
+      JOIN claim_embedding e ON e.claim_id = c.claim_id
+      CROSS JOIN (SELECT embedding, embedding_model FROM claim_embedding WHERE claim_id = p_claim_id) q
+      WHERE c.claim_id <> p_claim_id
+        AND e.embedding_model = q.embedding_model
+      ORDER BY e.embedding <#> q.embedding ASC
+      LIMIT p_top_k
+    ) t;
+
+  ELSIF p_mode IN ('halfvec', 'shadow') THEN
+    IF p_ef_search IS NOT NULL THEN
+      PERFORM set_config('hnsw.ef_search', p_ef_search::text, true);
+    END IF;
+
+    EXECUTE format(
+      $q$
+      SELECT COALESCE(
+               jsonb_agg(
+                 jsonb_build_object('claim_id', t.claim_id, 'text', t.claim_text, 'similarity', t.similarity)
+                 ORDER BY t.similarity DESC
+               ),
+               '[]'::jsonb
+             )
+      FROM (
+        SELECT c.claim_id, c.claim_text, -(e.embedding <#> q.embedding) AS similarity
+        FROM (
+          SELECT a.claim_id
+          FROM claim_embedding a
+          WHERE a.claim_id <> $1
+            AND a.embedding_model = (SELECT embedding_model FROM claim_embedding WHERE claim_id = $1)
+          ORDER BY a.%1$I <#> (SELECT %1$I FROM claim_embedding WHERE claim_id = $1)
+          LIMIT $3
+        ) ann
+        JOIN claim_embedding e ON e.claim_id = ann.claim_id
+        JOIN claim c ON c.claim_id = ann.claim_id
+        CROSS JOIN (SELECT embedding FROM claim_embedding WHERE claim_id = $1) q
+        ORDER BY similarity DESC
+        LIMIT $2
+      ) t
+      $q$,
+      CASE p_mode WHEN 'halfvec' THEN 'embedding_half' ELSE 'embedding_short' END
+    )
+    INTO v_similar
+    USING p_claim_id, p_top_k, COALESCE(p_candidates, p_top_k);
+
+  ELSE
+    RAISE EXCEPTION 'semantic_dedupe_check: unknown search mode %', p_mode;
+  END IF;
+
+  v_best_id  := (v_similar -> 0 ->> 'claim_id')::BIGINT;
+  v_best_sim := COALESCE((v_similar -> 0 ->> 'similarity')::FLOAT8, 0.0);
+
+  -- 2) Cluster assignment
+  SELECT m.cluster_id INTO v_cluster_id
+  FROM claim_cluster_member m
+  WHERE m.claim_id = p_claim_id
+  LIMIT 1;
+
+  IF v_cluster_id IS NULL THEN
+    IF v_best_id IS NOT NULL AND v_best_sim >= p_join_threshold THEN
+      v_target := v_best_id;
+      SELECT m.cluster_id INTO v_cluster_id
+      FROM claim_cluster_member m
+      WHERE m.claim_id = v_target
+      LIMIT 1;
+    ELSE
+      v_target := p_claim_id;
+    END IF;
+
+    IF v_cluster_id IS NULL THEN
+      PERFORM 1 FROM claim WHERE claim_id = v_target FOR UPDATE;
+
+      SELECT cl.cluster_id INTO v_cluster_id
+      FROM claim_cluster cl
+      WHERE cl.canonical_claim_id = v_target
+      LIMIT 1;
+
+      IF v_cluster_id IS NULL THEN
+        INSERT INTO claim_cluster (canonical_claim_id)
+        VALUES (v_target)
+        RETURNING cluster_id INTO v_cluster_id;
+
+        INSERT INTO claim_cluster_member (cluster_id, claim_id, similarity)
+        VALUES (v_cluster_id, v_target, 1.0)
+        ON CONFLICT (cluster_id, claim_id) DO NOTHING;
+      END IF;
+    END IF;
+
+    SELECT cl.canonical_claim_id INTO v_canonical
+    FROM claim_cluster cl
+    WHERE cl.cluster_id = v_cluster_id;
+
+    INSERT INTO claim_cluster_member (cluster_id, claim_id, similarity)
+    VALUES (
+      v_cluster_id,
+      p_claim_id,
+      CASE WHEN p_claim_id = v_canonical THEN 1.0 ELSE v_best_sim END
+    )
+    ON CONFLICT (cluster_id, claim_id) DO NOTHING;
+
+    v_assigned := TRUE;
+  ELSE
+    SELECT cl.canonical_claim_id INTO v_canonical
+    FROM claim_cluster cl
+    WHERE cl.cluster_id = v_cluster_id;
+  END IF;
+
+  -- 3) Canonical text
+  RETURN jsonb_build_object(
+    'similar', v_similar,
+    'cluster_id', v_cluster_id,
+    'canonical_claim_id', v_canonical,
+    'canonical_text', (SELECT claim_text FROM claim WHERE claim_id = v_canonical),
+    'assigned', v_assigned
+  );
+END
+$$;
+
+COMMIT;
@@ -0,0 +1,44 @@
+-- 0013_cluster_rebuild.sql
+--
+-- Offline re-clustering (python -m app.recluster):
+--
+--   claim_cluster_staged         rebuilt clusters, keyed by a job-local
+--                                cluster_key, one row per canonical.
+--   claim_cluster_member_staged  rebuilt memberships (one cluster per claim).
+--   claim_cluster_epoch          single-row counter bumped by every swap;
+--                                services poll it to drop cached topology
+--                                (CLUSTER_CACHE_EPOCH_CHECK_SECONDS).
+--
+-- The staged tables are only read by the swap, which replaces
+-- claim_cluster / claim_cluster_member in a single transaction.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS claim_cluster_staged (
+  cluster_key        BIGINT PRIMARY KEY,
+  canonical_claim_id BIGINT NOT NULL REFERENCES claim(claim_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS claim_cluster_member_staged (
+  claim_id    BIGINT PRIMARY KEY REFERENCES claim(claim_id) ON DELETE CASCADE,
+  cluster_key BIGINT NOT NULL,
+  similarity  FLOAT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_claim_cluster_member_staged_cluster
+  ON claim_cluster_member_staged (cluster_key);
+
+CREATE TABLE IF NOT EXISTS claim_cluster_epoch (
+  singleton   BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+  epoch       BIGINT NOT NULL DEFAULT 1,
+  updated_tms TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO claim_cluster_epoch (singleton) VALUES (TRUE)
+ON CONFLICT (singleton) DO NOTHING;
+
+-- Unique canonicals let the swap map staged clusters to new cluster_ids.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_claim_cluster_staged_canonical
+  ON claim_cluster_staged (canonical_claim_id);
+
+COMMIT;
@@ -0,0 +1,78 @@
+-- 0014_cluster_centroids.sql
+--
+-- Cluster centroids for coarse-to-fine search (PGVECTOR_SEARCH_MODE=centroid).
+--
+--   centroid_sum  sum of the members' unit embeddings. Cosine distance
+--                 (<=>) is scale invariant, so the sum ranks exactly like
+--                 the mean and is cheaper to maintain.
+--   member_count  number of members.
+--
+-- Both are maintained by a statement-level trigger on claim_cluster_member,
+-- so every write path is covered: assign_claim_to_cluster, the bulk path,
+-- semantic_dedupe_check() and the app.recluster swap. Member deletes
+-- (claim deletion) are not subtracted; app.recluster --centroids-only
+-- recomputes both from the member rows, e.g. after an embedding model
+-- promotion (app.reembed).
+--
+-- vector(3072) is above the HNSW limit, so centroids are scanned exactly:
+-- one comparison per cluster instead of one per claim.
+
+BEGIN;
+
+ALTER TABLE claim_cluster
+  ADD COLUMN IF NOT EXISTS centroid_sum vector(3072),
+  ADD COLUMN IF NOT EXISTS member_count INT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION claim_cluster_add_to_centroids()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- Lock in cluster_id order so concurrent bulk inserts cannot deadlock.
+  PERFORM 1
+  FROM claim_cluster
+  WHERE cluster_id IN (SELECT cluster_id FROM new_members)
+  ORDER BY cluster_id
+  FOR UPDATE;
+
+  UPDATE claim_cluster c
+  SET centroid_sum = CASE
+        WHEN c.centroid_sum IS NULL THEN d.total
+        WHEN d.total IS NULL THEN c.centroid_sum
+        ELSE c.centroid_sum + d.total
+      END,
+      member_count = c.member_count + d.n
+  FROM (
+    SELECT n.cluster_id, sum(e.embedding) AS total, count(*) AS n
+    FROM new_members n
+    LEFT JOIN claim_embedding e ON e.claim_id = n.claim_id
+    GROUP BY n.cluster_id
+  ) d
+  WHERE c.cluster_id = d.cluster_id;
+  RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_claim_cluster_member_centroids ON claim_cluster_member;
+CREATE TRIGGER trg_claim_cluster_member_centroids
+  AFTER INSERT ON claim_cluster_member
+  REFERENCING NEW TABLE AS new_members
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION claim_cluster_add_to_centroids();
+
+-- Backfill existing clusters
+UPDATE claim_cluster c
+SET centroid_sum = d.total,
+    member_count = d.n
+FROM (
+  SELECT m.cluster_id, sum(e.embedding) AS total, count(*) AS n
+  FROM claim_cluster_member m
+  LEFT JOIN claim_embedding e ON e.claim_id = m.claim_id
+  GROUP BY m.cluster_id
+) d
+WHERE c.cluster_id = d.cluster_id
+  AND c.centroid_sum IS NULL;
+
+COMMIT;
+
+ANALYZE claim_cluster;
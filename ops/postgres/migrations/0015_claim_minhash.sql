@@ -0,0 +1,24 @@
+-- 0015_claim_minhash.sql
+--
+-- Lexical near-duplicate prefilter (LEXICAL_PREFILTER, app/lexical.py).
+--
+--   claim_minhash_band  MinHash LSH buckets of each claim's normalized text,
+--                       one row per band. Bucket keys include the band
+--                       index, so a single index serves every band.
+--
+-- Candidates found through the buckets are verified against claim.claim_text,
+-- so no signature is stored. Rows are written with the claim's embedding;
+-- older claims are filled by python -m app.lexical_backfill.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS claim_minhash_band (
+  bucket   BIGINT NOT NULL,
+  claim_id BIGINT NOT NULL REFERENCES claim(claim_id) ON DELETE CASCADE,
+  PRIMARY KEY (bucket, claim_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_claim_minhash_band_claim
+  ON claim_minhash_band (claim_id);
+
+COMMIT;
@@ -0,0 +1,54 @@
+-- 0016_claim_embedding_seq.sql
+--
+-- Change sequence for claim_embedding, read by the in-process index
+-- (VectorIndex.sync) and the local segment store (SegmentStore.reconcile)
+-- to pick up new and rewritten embeddings.
+--
+--   embedding_seq  stamped from claim_embedding_seq whenever a row is
+--                  inserted or its embedding / embedding_model changes.
+--
+-- claim_id order is not commit order: ids are reserved before the
+-- embedding is written, and app.reembed promote and stale-model
+-- replacement rewrite old rows. The stamp is taken by a deferred
+-- constraint trigger, i.e. at commit, under a transaction-scoped advisory
+-- lock, so sequence order matches commit order: once a reader has seen
+-- seq N, no transaction can still commit a row stamped below N.
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS claim_embedding_seq;
+
+ALTER TABLE claim_embedding
+  ADD COLUMN IF NOT EXISTS embedding_seq BIGINT;
+
+UPDATE claim_embedding
+SET embedding_seq = nextval('claim_embedding_seq')
+WHERE embedding_seq IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_claim_embedding_seq
+  ON claim_embedding (embedding_seq);
+
+CREATE OR REPLACE FUNCTION claim_embedding_stamp_seq()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- Held until commit: serializes only the commit tail of embedding writers.
+  PERFORM pg_advisory_xact_lock(hashtext('claim_embedding_seq'), 0);
+  UPDATE claim_embedding
+  SET embedding_seq = nextval('claim_embedding_seq')
+  WHERE claim_id = NEW.claim_id;
+  RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_claim_embedding_seq ON claim_embedding;
+CREATE CONSTRAINT TRIGGER trg_claim_embedding_seq
+  AFTER INSERT OR UPDATE OF embedding, embedding_model ON claim_embedding
+  DEFERRABLE INITIALLY DEFERRED
+  FOR EACH ROW
+  EXECUTE FUNCTION claim_embedding_stamp_seq();
+
+COMMIT;
+
+ANALYZE claim_embedding;
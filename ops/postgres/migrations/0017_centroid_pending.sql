@@ -0,0 +1,121 @@
+-- 0017_centroid_pending.sql
+--
+-- Centroid maintenance without per-cluster row locks on the write path.
+--
+-- The 0014 trigger updated claim_cluster.centroid_sum in the inserting
+-- transaction, after SELECT ... FOR UPDATE on the cluster rows, so every
+-- check that joined a hot cluster queued behind the previous one until
+-- it committed. Instead:
+--
+--   claim_centroid_pending  claims not yet reflected in any centroid:
+--                           cluster_id NULL   embedded, not assigned yet
+--                           cluster_id set    assigned, not folded yet
+--
+-- Embedding and member inserts only add pending rows (keyed by claim_id,
+-- so writers never touch the same row). claim_cluster_fold_centroids()
+-- folds assigned rows into centroid_sum / member_count in batches; the
+-- service runs it in the background (CENTROID_FOLD_SECONDS), one folder
+-- at a time. Coarse search (PGVECTOR_SEARCH_MODE=centroid) adds pending
+-- claims to its candidates, so nothing is invisible while it waits.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS claim_centroid_pending (
+  claim_id    BIGINT PRIMARY KEY REFERENCES claim(claim_id) ON DELETE CASCADE,
+  cluster_id  BIGINT
+);
+
+CREATE INDEX IF NOT EXISTS idx_claim_centroid_pending_assigned
+  ON claim_centroid_pending (claim_id)
+  WHERE cluster_id IS NOT NULL;
+
+-- Embedded claims wait here until they join a cluster.
+CREATE OR REPLACE FUNCTION claim_embedding_pending_centroid()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO claim_centroid_pending (claim_id)
+  SELECT claim_id FROM new_embeddings
+  ON CONFLICT (claim_id) DO NOTHING;
+  RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_claim_embedding_pending_centroid ON claim_embedding;
+CREATE TRIGGER trg_claim_embedding_pending_centroid
+  AFTER INSERT ON claim_embedding
+  REFERENCING NEW TABLE AS new_embeddings
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION claim_embedding_pending_centroid();
+
+-- Replaces the 0014 function: record the membership, don't lock the cluster.
+CREATE OR REPLACE FUNCTION claim_cluster_add_to_centroids()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO claim_centroid_pending (claim_id, cluster_id)
+  SELECT claim_id, cluster_id FROM new_members
+  ON CONFLICT (claim_id) DO UPDATE SET cluster_id = EXCLUDED.cluster_id;
+  RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION claim_cluster_fold_centroids(max_rows INT)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  folded INT;
+BEGIN
+  -- One folder at a time; the others return at once.
+  IF NOT pg_try_advisory_xact_lock(hashtext('claim_cluster_fold_centroids'), 0) THEN
+    RETURN 0;
+  END IF;
+
+  WITH batch AS (
+    DELETE FROM claim_centroid_pending p
+    WHERE p.claim_id IN (
+      SELECT claim_id
+      FROM claim_centroid_pending
+      WHERE cluster_id IS NOT NULL
+      ORDER BY claim_id
+      LIMIT max_rows
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING p.claim_id, p.cluster_id
+  ),
+  d AS (
+    SELECT b.cluster_id, sum(e.embedding) AS total, count(*) AS n
+    FROM batch b
+    LEFT JOIN claim_embedding e ON e.claim_id = b.claim_id
+    GROUP BY b.cluster_id
+  ),
+  applied AS (
+    UPDATE claim_cluster c
+    SET centroid_sum = CASE
+          WHEN c.centroid_sum IS NULL THEN d.total
+          WHEN d.total IS NULL THEN c.centroid_sum
+          ELSE c.centroid_sum + d.total
+        END,
+        member_count = c.member_count + d.n
+    FROM d
+    WHERE c.cluster_id = d.cluster_id
+    RETURNING d.n
+  )
+  SELECT COALESCE(sum(n), 0) INTO folded FROM applied;
+  RETURN folded;
+END
+$$;
+
+-- Claims embedded but never assigned (e.g. a request that died in between)
+INSERT INTO claim_centroid_pending (claim_id)
+SELECT e.claim_id
+FROM claim_embedding e
+WHERE NOT EXISTS (SELECT 1 FROM claim_cluster_member m WHERE m.claim_id = e.claim_id)
+ON CONFLICT (claim_id) DO NOTHING;
+
+COMMIT;
+
+ANALYZE claim_centroid_pending;
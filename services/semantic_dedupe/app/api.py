@@ -1,32 +1,151 @@
+import asyncio
 import json
 import time
-from typing import Any, Dict, List, Optional, Literal
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Literal, Tuple
 
-from fastapi import FastAPI, Depends, HTTPException
+import numpy as np
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
+from starlette.routing import Route
 
 from app.db import (
-    get_db,
+    _get_session_factory,
+    _lookup_claim_states,
+    dispose_async_engine,
+    own_async_session,
+    fold_centroids,
+    get_async_db,
+    decode_embedding,
     get_or_create_claim_with_embedding,
+    get_or_create_claims_bulk,
+    prefetch_claim_embeddings,
     assign_claim_to_cluster,
+    assign_claims_to_clusters_bulk,
     fetch_claim_text,
+    fetch_claim_texts,
+    check_claim_server_side,
+    find_lexical_duplicates,
+    record_committed_embeddings,
+    run_blocking,
 )
 from app.hashing import content_hash
-from app.similarity import cosine_similarity
+from app.jobs import enqueue_job, fetch_job
+from app import metrics
+from app.metrics import stage
+from app.singleflight import SingleFlight
+from app.clustering import intra_batch_topk, merge_topk
+from app.cluster_cache import get_cluster_cache, read_epoch
+from app.vector_index import get_vector_index, maintain_vector_indexes, save_vector_indexes
 from app.config import (
     EMBEDDINGS_PROVIDER,
     EMBEDDINGS_MODEL,
+    PGVECTOR_SEARCH_MODE,
+    HNSW_EF_SEARCH,
+    CENTROID_PROBES,
+    SHADOW_RERANK_FACTOR,
+    DEDUPE_SQL_FUNCTION,
+    EMBEDDING_STORE_PATH,
+    PYTHON_SEARCH_BACKEND,
+    HNSW_MAINTENANCE_SECONDS,
+    CENTROID_FOLD_BATCH,
+    CENTROID_FOLD_SECONDS,
+    STREAM_WINDOW_SIZE,
+    STREAM_MAX_LINE_BYTES,
     DUPLICATE_THRESHOLD,
     NEAR_DUPLICATE_THRESHOLD,
+    LEXICAL_PREFILTER,
+    LEXICAL_DUPLICATE_THRESHOLD,
 )
 
+from app.embedding.cache import with_cache
+from app.embedding.microbatch import with_microbatching
 from app.embedding.openai_provider import OpenAIEmbeddingProvider
 from app.embedding.stub_provider import StubEmbeddingProvider
 
 
-app = FastAPI(title="VeriSphere Semantic Dedupe")
+def _warm_vector_index() -> None:
+    """
+    Build the in-process index before serving (from the segment store when
+    one is configured), so the first request doesn't pay for it.
+    """
+    db = _get_session_factory()()
+    try:
+        if db.bind.dialect.name != "postgresql":
+            get_vector_index(db).sync(db)
+    finally:
+        db.close()
+
+
+async def _maintain_vector_indexes() -> None:
+    """
+    Compact and checkpoint in-process ANN graphs off the request path.
+    """
+    while True:
+        await asyncio.sleep(HNSW_MAINTENANCE_SECONDS)
+        try:
+            await asyncio.to_thread(maintain_vector_indexes)
+        except Exception as e:
+            print(f"vector index maintenance failed: {e}", flush=True)
+
+
+def _fold_centroids() -> Optional[int]:
+    """
+    One fold transaction; None when the database doesn't queue centroid
+    updates (SQLite folds inline).
+    """
+    db = _get_session_factory()()
+    try:
+        if db.bind.dialect.name != "postgresql":
+            return None
+        folded = fold_centroids(db)
+        db.commit()
+        return folded
+    finally:
+        db.close()
+
+
+async def _maintain_centroids() -> None:
+    """
+    Fold queued cluster members into the centroids off the request path.
+    """
+    while True:
+        await asyncio.sleep(CENTROID_FOLD_SECONDS)
+        try:
+            while True:
+                folded = await asyncio.to_thread(_fold_centroids)
+                if folded is None:
+                    return
+                if folded < CENTROID_FOLD_BATCH:
+                    break
+        except Exception as e:
+            print(f"centroid fold failed: {e}", flush=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EMBEDDING_STORE_PATH:
+        _warm_vector_index()
+    maintenance = (
+        asyncio.create_task(_maintain_vector_indexes()) if PYTHON_SEARCH_BACKEND == "hnsw" else None
+    )
+    centroids = asyncio.create_task(_maintain_centroids())
+    yield
+    centroids.cancel()
+    if maintenance is not None:
+        maintenance.cancel()
+    # Checkpoint in-process ANN graphs so a restart doesn't rebuild them.
+    await asyncio.to_thread(save_vector_indexes)
+    await dispose_async_engine()
+
+
+app = FastAPI(title="VeriSphere Semantic Dedupe", lifespan=lifespan)
+# In-flight gauge and latency per route template, streams included
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 
 # ---------------------------------------------------------------------
@@ -49,9 +168,9 @@ class BatchCheckDuplicateRequest(BaseModel):
 
 def make_embedder():
     if EMBEDDINGS_PROVIDER == "stub":
-        return StubEmbeddingProvider()
+        return with_cache(StubEmbeddingProvider())
     if EMBEDDINGS_PROVIDER == "openai":
-        return OpenAIEmbeddingProvider()
+        return with_cache(with_microbatching(OpenAIEmbeddingProvider()))
     raise RuntimeError(f"Invalid EMBEDDINGS_PROVIDER={EMBEDDINGS_PROVIDER}")
 
 
@@ -76,51 +195,56 @@ def classify(sim: float) -> Classification:
     return "new"
 
 
-def decode_embedding(db: Session, value) -> Optional[List[float]]:
-    """
-    Normalize embedding from DB into List[float].
+def _set_hnsw_ef_search(db: Session) -> None:
+    # Transaction-local, so pooled connections are not affected.
+    db.execute(
+        text("SELECT set_config('hnsw.ef_search', :ef, true)"),
+        {"ef": str(max(HNSW_EF_SEARCH, 1))},
+    )
 
-    - SQLite (tests): JSON text
-    - Postgres (pgvector): may come back as string "[0.1,0.2,...]"
-    """
-    if value is None:
-        return None
 
-    if db.bind.dialect.name == "sqlite":
-        return json.loads(value)
+# Indexed shadow column per ANN search mode (migrations 0008 / 0009).
+_ANN_COLUMNS = {"halfvec": "embedding_half", "shadow": "embedding_short"}
 
-    if isinstance(value, str):
-        v = value.strip()
-        if v.startswith("[") and v.endswith("]"):
-            inner = v[1:-1].strip()
-            if inner == "":
-                return []
-            return [float(x) for x in inner.split(",") if x.strip()]
 
-    try:
-        return list(value)
-    except TypeError:
-        return None
+def _ann_candidates(top_k: int) -> int:
+    """
+    Candidates fetched from the ANN index before the exact rerank.
+    Truncated vectors reorder neighbours more than half precision does,
+    so shadow mode over-fetches.
+    """
+    if PGVECTOR_SEARCH_MODE == "shadow":
+        return top_k * max(SHADOW_RERANK_FACTOR, 1)
+    return top_k
 
 
 def pgvector_topk(db: Session, claim_id: int, top_k: int) -> List[Dict[str, Any]]:
+    # Embeddings are stored unit-normalized, so negative inner product (<#>)
+    # orders exactly like cosine distance without per-row norm computation.
+    # Only vectors of the query's own model are compared (see app/reembed.py).
+    if PGVECTOR_SEARCH_MODE in _ANN_COLUMNS:
+        return pgvector_topk_ann(db, claim_id, top_k)
+    if PGVECTOR_SEARCH_MODE == "centroid":
+        return pgvector_topk_centroid(db, claim_id, top_k)
+
     rows = db.execute(
         text(
             """
             WITH q AS (
-              SELECT embedding
+              SELECT embedding, embedding_model
               FROM claim_embedding
               WHERE claim_id = :claim_id
             )
             SELECT
               c.claim_id,
               c.claim_text,
-              (1.0 - (e.embedding <=> q.embedding)) AS similarity
+              -(e.embedding <#> q.embedding) AS similarity
             FROM claim c
             JOIN claim_embedding e USING (claim_id)
             CROSS JOIN q
             WHERE c.claim_id != :claim_id
-            ORDER BY (e.embedding <=> q.embedding) ASC
+              AND e.embedding_model = q.embedding_model
+            ORDER BY (e.embedding <#> q.embedding) ASC
             LIMIT :top_k
             """
         ),
@@ -133,70 +257,625 @@ def pgvector_topk(db: Session, claim_id: int, top_k: int) -> List[Dict[str, Any]
     ]
 
 
-def python_topk(db: Session, claim_id: int, query_emb: List[float], top_k: int) -> List[Dict[str, Any]]:
+def pgvector_topk_ann(db: Session, claim_id: int, top_k: int) -> List[Dict[str, Any]]:
+    """
+    Two-stage top-k through the HNSW index of the current search mode.
+
+    1) ANN candidate retrieval on the shadow column (halfvec or truncated);
+       the query vector is a scalar subquery so the planner can use the
+       index for ORDER BY ... LIMIT.
+    2) Exact rerank of the candidates on the full float vectors, so the
+       similarities classify() sees are exact.
+    """
+    column = _ANN_COLUMNS[PGVECTOR_SEARCH_MODE]
+    _set_hnsw_ef_search(db)
+
     rows = db.execute(
         text(
+            f"""
+            WITH q AS (
+              SELECT embedding
+              FROM claim_embedding
+              WHERE claim_id = :claim_id
+            ),
+            ann AS (
+              SELECT e.claim_id
+              FROM claim_embedding e
+              WHERE e.claim_id != :claim_id
+                AND e.embedding_model = (
+                  SELECT embedding_model FROM claim_embedding WHERE claim_id = :claim_id
+                )
+              ORDER BY e.{column} <#> (
+                SELECT {column} FROM claim_embedding WHERE claim_id = :claim_id
+              )
+              LIMIT :candidates
+            )
+            SELECT
+              c.claim_id,
+              c.claim_text,
+              -(e.embedding <#> q.embedding) AS similarity
+            FROM ann
+            JOIN claim_embedding e USING (claim_id)
+            JOIN claim c USING (claim_id)
+            CROSS JOIN q
+            ORDER BY similarity DESC
+            LIMIT :top_k
             """
-            SELECT c.claim_id, c.claim_text, e.embedding
-            FROM claim c
+        ),
+        {"claim_id": claim_id, "top_k": top_k, "candidates": _ann_candidates(top_k)},
+    ).fetchall()
+
+    return [
+        {"claim_id": int(cid), "text": str(text_), "similarity": float(sim)}
+        for cid, text_, sim in rows
+    ]
+
+
+# Candidate claims for a query vector qe (a claim_embedding row): members
+# of the closest multi-member clusters by centroid, the closest singleton
+# clusters, whose centroid is their only member's vector, and every claim
+# not yet in a centroid (unassigned, or assigned but not folded yet).
+_CENTROID_CANDIDATES = """
+  SELECT m.claim_id
+  FROM (
+    SELECT cl.cluster_id
+    FROM claim_cluster cl
+    WHERE cl.member_count > 1
+    ORDER BY cl.centroid_sum <=> qe.embedding
+    LIMIT :probes
+  ) probe
+  JOIN claim_cluster_member m ON m.cluster_id = probe.cluster_id
+  UNION
+  SELECT single.canonical_claim_id
+  FROM (
+    SELECT cl.canonical_claim_id
+    FROM claim_cluster cl
+    WHERE cl.member_count = 1
+    ORDER BY cl.centroid_sum <=> qe.embedding
+    LIMIT :top_k
+  ) single
+  UNION
+  SELECT p.claim_id
+  FROM claim_centroid_pending p
+"""
+
+
+def _centroid_probes(top_k: int) -> int:
+    return max(CENTROID_PROBES, top_k, 1)
+
+
+def pgvector_topk_centroid(db: Session, claim_id: int, top_k: int) -> List[Dict[str, Any]]:
+    """
+    Coarse-to-fine top-k (PGVECTOR_SEARCH_MODE=centroid): rank clusters by
+    their maintained centroid (0014_cluster_centroids.sql), then score the
+    members of the closest CENTROID_PROBES clusters, the closest singletons
+    and the claims still queued in claim_centroid_pending (0017) exactly.
+    Comparisons per query drop from one per claim to one per cluster plus
+    the probed members.
+
+    Approximate: a neighbour in a cluster whose centroid is not among the
+    probes is missed.
+    """
+    rows = db.execute(
+        text(
+            f"""
+            WITH qe AS (
+              SELECT embedding, embedding_model
+              FROM claim_embedding
+              WHERE claim_id = :claim_id
+            ),
+            cand AS (
+              SELECT cc.claim_id
+              FROM qe
+              CROSS JOIN LATERAL ({_CENTROID_CANDIDATES}) cc
+            )
+            SELECT
+              c.claim_id,
+              c.claim_text,
+              -(e.embedding <#> qe.embedding) AS similarity
+            FROM cand
             JOIN claim_embedding e USING (claim_id)
-            WHERE c.claim_id != :id
+            JOIN claim c USING (claim_id)
+            CROSS JOIN qe
+            WHERE c.claim_id != :claim_id
+              AND e.embedding_model = qe.embedding_model
+            ORDER BY similarity DESC
+            LIMIT :top_k
             """
         ),
-        {"id": claim_id},
+        {"claim_id": claim_id, "top_k": top_k, "probes": _centroid_probes(top_k)},
     ).fetchall()
 
-    scored: List[Dict[str, Any]] = []
-    for cid, text_, emb in rows:
-        emb_vec = decode_embedding(db, emb)
-        if not emb_vec:
-            continue
-        sim = cosine_similarity(query_emb, emb_vec)
-        scored.append({"claim_id": int(cid), "text": str(text_), "similarity": float(sim)})
+    return [
+        {"claim_id": int(cid), "text": str(text_), "similarity": float(sim)}
+        for cid, text_, sim in rows
+    ]
 
-    scored.sort(key=lambda x: x["similarity"], reverse=True)
-    return scored[:top_k]
 
+def python_topk(db: Session, claim_id: int, query_emb: List[float], top_k: int) -> List[Dict[str, Any]]:
+    index = get_vector_index(db)
+    index.add(claim_id, query_emb)
+    index.sync(db)
 
-def compute_one(db: Session, claim_text: str, top_k: int) -> Dict[str, Any]:
-    t0 = time.time()
+    hits = run_blocking(lambda: index.search(query_emb, top_k, exclude=(claim_id,)))
+    if not hits:
+        return []
 
-    claim_id, created = get_or_create_claim_with_embedding(
-        db,
-        claim_text=claim_text,
-        embedder=embedder,
-    )
+    rows = db.execute(
+        text(
+            """
+            SELECT claim_id, claim_text
+            FROM claim
+            WHERE claim_id IN :ids
+            """
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": [cid for cid, _ in hits]},
+    ).fetchall()
+    texts = {int(cid): str(text_) for cid, text_ in rows}
 
-    # Similarity search
-    if db.bind.dialect.name == "postgresql":
-        similar = pgvector_topk(db, claim_id, top_k)
+    # Rows that vanished (e.g. rolled back after being indexed) are skipped.
+    return [
+        {"claim_id": cid, "text": texts[cid], "similarity": sim}
+        for cid, sim in hits
+        if cid in texts
+    ]
+
+
+def pgvector_topk_many(
+    db: Session,
+    claim_ids: List[int],
+    exclude_ids: List[int],
+    top_k: int,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Corpus top-k for every batch position in one LATERAL query.
+    Claims in exclude_ids (the batch's own new claims) are never returned.
+    In ANN modes each lateral probe walks the HNSW index of the shadow
+    column and its candidates are re-ranked on the full vectors; in
+    centroid mode the candidates are the members of the probed clusters.
+    """
+    if PGVECTOR_SEARCH_MODE == "centroid":
+        # Members of the probed clusters, re-scored below like ANN candidates
+        candidates = f"""
+                SELECT e.claim_id
+                FROM ({_CENTROID_CANDIDATES}) cc
+                JOIN claim_embedding e ON e.claim_id = cc.claim_id
+                WHERE e.claim_id != q.claim_id
+                  AND e.embedding_model = qe.embedding_model
+                  AND NOT (e.claim_id = ANY (CAST(:exclude_ids AS BIGINT[])))
+        """
     else:
-        row = db.execute(
-            text("SELECT embedding FROM claim_embedding WHERE claim_id = :id"),
-            {"id": claim_id},
-        ).fetchone()
-        if not row:
+        if PGVECTOR_SEARCH_MODE in _ANN_COLUMNS:
+            _set_hnsw_ef_search(db)
+            column = _ANN_COLUMNS[PGVECTOR_SEARCH_MODE]
+            order_by = f"e.{column} <#> qe.{column}"
+        else:
+            order_by = "e.embedding <#> qe.embedding"
+        candidates = f"""
+                SELECT e.claim_id
+                FROM claim_embedding e
+                WHERE e.claim_id != q.claim_id
+                  AND e.embedding_model = qe.embedding_model
+                  AND NOT (e.claim_id = ANY (CAST(:exclude_ids AS BIGINT[])))
+                ORDER BY {order_by}
+                LIMIT :candidates
+        """
+
+    rows = db.execute(
+        text(
+            f"""
+            SELECT q.pos, c.claim_id, c.claim_text, n.similarity
+            FROM unnest(CAST(:claim_ids AS BIGINT[]))
+                 WITH ORDINALITY AS q(claim_id, pos)
+            JOIN claim_embedding qe ON qe.claim_id = q.claim_id
+            CROSS JOIN LATERAL (
+              SELECT
+                r.claim_id,
+                -(r.embedding <#> qe.embedding) AS similarity
+              FROM ({candidates}) cand
+              JOIN claim_embedding r USING (claim_id)
+              ORDER BY similarity DESC
+              LIMIT :top_k
+            ) n
+            JOIN claim c ON c.claim_id = n.claim_id
+            ORDER BY q.pos, n.similarity DESC
+            """
+        ),
+        {
+            "claim_ids": claim_ids,
+            "exclude_ids": exclude_ids,
+            "top_k": top_k,
+            "candidates": _ann_candidates(top_k),
+            "probes": _centroid_probes(top_k),
+        },
+    ).fetchall()
+
+    out: List[List[Dict[str, Any]]] = [[] for _ in claim_ids]
+    for pos, cid, text_, sim in rows:
+        out[int(pos) - 1].append(
+            {"claim_id": int(cid), "text": str(text_), "similarity": float(sim)}
+        )
+    return out
+
+
+def python_topk_many(
+    db: Session,
+    claim_ids: List[int],
+    query_embs: List[List[float]],
+    exclude_ids: List[int],
+    top_k: int,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Same contract as pgvector_topk_many, served from the resident matrix.
+    """
+    index = get_vector_index(db)
+    index.sync(db)
+
+    hits = run_blocking(
+        lambda: index.search_many(
+            query_embs,
+            top_k,
+            excludes=[[cid, *exclude_ids] for cid in claim_ids],
+        )
+    )
+
+    texts = fetch_claim_texts(db, [cid for row in hits for cid, _ in row])
+    return [
+        [
+            {"claim_id": cid, "text": texts[cid], "similarity": sim}
+            for cid, sim in row
+            if cid in texts
+        ]
+        for row in hits
+    ]
+
+
+def _batch_query_embeddings(db: Session, claims: List[Dict[str, Any]]) -> Dict[int, List[float]]:
+    """
+    Embeddings for every claim in the batch: new ones from memory, claims
+    that already existed in one query.
+    """
+    embs = {c["claim_id"]: c["embedding"] for c in claims if c["created"]}
+    missing = sorted({c["claim_id"] for c in claims} - set(embs))
+    if missing:
+        rows = db.execute(
+            text(
+                """
+                SELECT claim_id, embedding
+                FROM claim_embedding
+                WHERE claim_id IN :ids
+                """
+            ).bindparams(bindparam("ids", expanding=True)),
+            {"ids": missing},
+        ).fetchall()
+        for cid, emb in rows:
+            embs[int(cid)] = decode_embedding(db, emb) or []
+
+    for cid in missing:
+        if not embs.get(cid):
             raise RuntimeError("Missing embedding")
-        query_emb = decode_embedding(db, row[0])
-        if not query_emb:
-            raise RuntimeError("Failed to decode embedding")
-        similar = python_topk(db, claim_id, query_emb, top_k)
+    return embs
+
+
+def _lexical_matches(db: Session, claim_texts: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    content_hash -> lexical near-duplicate for texts the prefilter answers
+    without an embedding (empty unless LEXICAL_PREFILTER).
+    """
+    if not LEXICAL_PREFILTER or not claim_texts:
+        return {}
+    with stage("lexical_prefilter"):
+        return find_lexical_duplicates(db, claim_texts, min_similarity=LEXICAL_DUPLICATE_THRESHOLD)
+
+
+def _lexical_results(
+    db: Session,
+    claim_texts: List[str],
+    t0: float,
+    matches: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    content_hash -> compute_one-shaped result for every text the lexical
+    prefilter answers. The variant itself is not stored: "hash" is its own
+    content_hash and "claim_id" is None, and the claim it duplicates is
+    reported under "duplicate_of" (and as the top "similar" hit) with its
+    shingle Jaccard similarity. matches are _lexical_matches() results the
+    caller already has; the prefilter only runs when they aren't given.
+    """
+    if matches is None:
+        matches = _lexical_matches(db, claim_texts)
+    if not matches:
+        return {}
+    texts = fetch_claim_texts(db, [m["canonical_claim_id"] for m in matches.values()])
+    db.commit()
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for h, match in matches.items():
+        out[h] = {
+            "hash": h,
+            "claim_id": None,
+            "created": False,
+            "embedding_model": EMBEDDINGS_MODEL,
+            "provider": EMBEDDINGS_PROVIDER,
+
+            "classification": "duplicate",
+            "max_similarity": match["similarity"],
+            "similar": [
+                {
+                    "claim_id": match["claim_id"],
+                    "text": match["text"],
+                    "similarity": match["similarity"],
+                }
+            ],
+            "match": "lexical",
+            "duplicate_of": {
+                "claim_id": match["claim_id"],
+                "hash": content_hash(match["text"]),
+                "similarity": match["similarity"],
+            },
+
+            "cluster_id": match["cluster_id"],
+            "canonical_claim": {
+                "claim_id": match["canonical_claim_id"],
+                "text": texts.get(match["canonical_claim_id"]),
+            },
+
+            "timing_ms": int((time.time() - t0) * 1000),
+        }
+    return out
+
+
+def compute_batch(
+    db: Session,
+    claim_texts: List[str],
+    top_k: int,
+    embeddings: Optional[Dict[str, List[float]]] = None,
+    *,
+    prefilter: bool = True,
+    lexical_matches: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Set-based equivalent of [compute_one(db, t, top_k) for t in claim_texts].
+    embeddings optionally maps content_hash -> precomputed embedding; when
+    not given, missing embeddings are computed before the transaction
+    starts (prefetch_claim_embeddings).
+
+    Runs in a single transaction with a fixed number of queries regardless
+    of batch size: bulk get-or-create, one batched corpus top-k, bulk
+    cluster assignment and one canonical-text fetch.
+
+    Claims in the batch are compared with each other in memory (B x B dot
+    products) rather than through the database, then merged with the corpus
+    top-k. Position i only sees batch claims created before it, so results
+    match processing the claims one at a time.
+
+    With LEXICAL_PREFILTER, claims the lexical prefilter answers are taken
+    out of the batch first (prefilter=False skips that step). lexical_matches
+    passes on the matches prefetch_embeddings already found, so the
+    prefilter isn't run a second time.
+    """
+    t0 = time.time()
+    new_ids: List[int] = []
+
+    lexical = _lexical_results(db, claim_texts, t0, lexical_matches) if prefilter else {}
+    if lexical:
+        rest = [t for t in claim_texts if content_hash(t) not in lexical]
+        semantic = iter(compute_batch(db, rest, top_k, embeddings, prefilter=False) if rest else [])
+        return [
+            dict(lexical[content_hash(t)]) if content_hash(t) in lexical else next(semantic)
+            for t in claim_texts
+        ]
+
+    if embeddings is None:
+        embeddings = prefetch_claim_embeddings(db, claim_texts=claim_texts, embedder=embedder)
+
+    try:
+        claims = get_or_create_claims_bulk(
+            db,
+            claim_texts=claim_texts,
+            embedder=embedder,
+            embeddings=embeddings,
+        )
+
+        claim_ids = [c["claim_id"] for c in claims]
+        visible: List[int] = []
+        for c in claims:
+            if c["created"]:
+                new_ids.append(c["claim_id"])
+            visible.append(len(new_ids))
+
+        with stage("search"):
+            embs = _batch_query_embeddings(db, claims)
+            query_embs = [embs[cid] for cid in claim_ids]
+
+            if db.bind.dialect.name == "postgresql":
+                corpus = pgvector_topk_many(db, claim_ids, new_ids, top_k)
+            else:
+                corpus = python_topk_many(db, claim_ids, query_embs, new_ids, top_k)
+                get_vector_index(db).add_many((cid, embs[cid]) for cid in new_ids)
+
+            row_of_new = {cid: j for j, cid in enumerate(new_ids)}
+            intra = run_blocking(
+                lambda: intra_batch_topk(
+                    np.asarray(query_embs, dtype=np.float32),
+                    np.asarray([embs[cid] for cid in new_ids], dtype=np.float32).reshape(
+                        len(new_ids), len(query_embs[0])
+                    ),
+                    visible,
+                    top_k,
+                    self_index=[row_of_new.get(cid, -1) for cid in claim_ids],
+                )
+            )
+
+        text_of_new = {c["claim_id"]: claim_texts[i] for i, c in enumerate(claims) if c["created"]}
+
+        similar = [
+            merge_topk(
+                [
+                    corpus_hits,
+                    [
+                        {
+                            "claim_id": new_ids[j],
+                            "text": text_of_new[new_ids[j]],
+                            "similarity": sim,
+                        }
+                        for j, sim in batch_hits
+                    ],
+                ],
+                top_k,
+            )
+            for corpus_hits, batch_hits in zip(corpus, intra)
+        ]
+
+        best = [
+            (
+                cid,
+                int(sims[0]["claim_id"]) if sims else None,
+                float(sims[0]["similarity"]) if sims else 0.0,
+            )
+            for cid, sims in zip(claim_ids, similar)
+        ]
+
+        with stage("cluster_assign"):
+            # Read before the memberships, in the same transaction
+            epoch = read_epoch(db)
+            clusters = assign_claims_to_clusters_bulk(
+                db,
+                assignments=best,
+                join_threshold=NEAR_DUPLICATE_THRESHOLD,
+            )
+        with stage("canonical_fetch"):
+            canonical_texts = fetch_claim_texts(db, [c["canonical_claim_id"] for c in clusters])
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        if db.bind.dialect.name != "postgresql":
+            get_vector_index(db).discard(new_ids)
+        raise
+
+    record_committed_embeddings([(cid, embs[cid]) for cid in new_ids])
+    cache = get_cluster_cache(db)
+    for cid, cluster_info in zip(claim_ids, clusters):
+        cache.remember(
+            claim_id=cid,
+            cluster_id=cluster_info["cluster_id"],
+            canonical_claim_id=cluster_info["canonical_claim_id"],
+            epoch=epoch,
+        )
+    timing_ms = int((time.time() - t0) * 1000)
+
+    results: List[Dict[str, Any]] = []
+    for c, sims, (_, _, max_sim), cluster_info in zip(claims, similar, best, clusters):
+        canonical_claim_id = int(cluster_info["canonical_claim_id"])
+        results.append(
+            {
+                "hash": c["hash"],
+                "claim_id": c["claim_id"],
+                "created": c["created"],
+                "embedding_model": EMBEDDINGS_MODEL,
+                "provider": EMBEDDINGS_PROVIDER,
+
+                "classification": classify(max_sim),
+                "max_similarity": max_sim,
+                "similar": sims,
+
+                "cluster_id": int(cluster_info["cluster_id"]),
+                "canonical_claim": {
+                    "claim_id": canonical_claim_id,
+                    "text": canonical_texts.get(canonical_claim_id),
+                },
+
+                "timing_ms": timing_ms,
+            }
+        )
+    return results
+
+
+def _search_and_assign(db: Session, claim_id: int, top_k: int):
+    """
+    Top-k search, SC/CCS cluster assignment and canonical text fetch as
+    separate queries. Returns (similar, cluster_info, canonical_text).
+    """
+    # Similarity search
+    with stage("search"):
+        if db.bind.dialect.name == "postgresql":
+            similar = pgvector_topk(db, claim_id, top_k)
+        else:
+            row = db.execute(
+                text("SELECT embedding FROM claim_embedding WHERE claim_id = :id"),
+                {"id": claim_id},
+            ).fetchone()
+            if not row:
+                raise RuntimeError("Missing embedding")
+            query_emb = decode_embedding(db, row[0])
+            if not query_emb:
+                raise RuntimeError("Failed to decode embedding")
+            similar = python_topk(db, claim_id, query_emb, top_k)
 
     max_sim = float(similar[0]["similarity"]) if similar else 0.0
     best_match_id = int(similar[0]["claim_id"]) if similar else None
-    classification = classify(max_sim)
 
     # SC/CCS cluster assignment
-    cluster_info = assign_claim_to_cluster(
+    with stage("cluster_assign"):
+        cluster_info = assign_claim_to_cluster(
+            db,
+            claim_id=claim_id,
+            best_match_claim_id=best_match_id,
+            best_match_similarity=max_sim,
+            join_threshold=NEAR_DUPLICATE_THRESHOLD,
+        )
+
+    with stage("canonical_fetch"):
+        canonical_text = fetch_claim_text(db, int(cluster_info["canonical_claim_id"]))
+    return similar, cluster_info, canonical_text
+
+
+def compute_one(
+    db: Session,
+    claim_text: str,
+    top_k: int,
+    embedding: Optional[List[float]] = None,
+    lexical_matches: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    t0 = time.time()
+
+    if embedding is None:
+        lexical = _lexical_results(db, [claim_text], t0, lexical_matches)
+        if lexical:
+            return lexical[content_hash(claim_text)]
+
+    claim_id, created = get_or_create_claim_with_embedding(
         db,
-        claim_id=claim_id,
-        best_match_claim_id=best_match_id,
-        best_match_similarity=max_sim,
-        join_threshold=NEAR_DUPLICATE_THRESHOLD,
+        claim_text=claim_text,
+        embedder=embedder,
+        embedding=embedding,
     )
 
+    if (
+        DEDUPE_SQL_FUNCTION
+        and db.bind.dialect.name == "postgresql"
+        and PGVECTOR_SEARCH_MODE != "centroid"  # not implemented by the function
+    ):
+        # Same steps in one round-trip (semantic_dedupe_check, migration 0011)
+        with stage("sql_function"):
+            cluster_info = check_claim_server_side(
+                db,
+                claim_id=claim_id,
+                top_k=top_k,
+                join_threshold=NEAR_DUPLICATE_THRESHOLD,
+                mode=PGVECTOR_SEARCH_MODE,
+                candidates=_ann_candidates(top_k),
+                ef_search=max(HNSW_EF_SEARCH, 1),
+            )
+        similar = cluster_info["similar"]
+        canonical_text = cluster_info["canonical_text"]
+    else:
+        similar, cluster_info, canonical_text = _search_and_assign(db, claim_id, top_k)
+
+    max_sim = float(similar[0]["similarity"]) if similar else 0.0
+    classification = classify(max_sim)
     canonical_claim_id = int(cluster_info["canonical_claim_id"])
-    canonical_text = fetch_claim_text(db, canonical_claim_id)
 
     return {
         "hash": content_hash(claim_text),
@@ -229,18 +908,328 @@ def health():
     return {"ok": True}
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """
+    Prometheus exposition: per-stage latency histograms
+    (semantic_dedupe_stage_seconds), request latency and in-flight
+    requests, cache/single-flight counters and DB pool gauges (see
+    app/metrics.py).
+    """
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
+@app.get("/stats/embeddings")
+def embedding_stats():
+    """
+    Counters from each embedding wrapper layer (cache hits, micro-batch
+    sizes and queueing delay) and from single-flight coalescing.
+    """
+    out: Dict[str, Any] = {}
+    provider = embedder
+    while provider is not None:
+        stats = getattr(provider, "stats", None)
+        if stats is not None:
+            out[type(provider).__name__] = stats()
+        provider = getattr(provider, "inner", None)
+    out["SingleFlight"] = {
+        "claims": claim_flights.stats(),
+        "embeddings": embedding_flights.stats(),
+    }
+    return out
+
+
+# In-process single-flight, keyed by content_hash
+claim_flights: SingleFlight[Dict[str, Any]] = SingleFlight()
+embedding_flights: SingleFlight[List[float]] = SingleFlight()
+
+metrics.register_collector(lambda: embedder, {"claims": claim_flights, "embeddings": embedding_flights})
+
+
+async def prefetch_embeddings(
+    db: AsyncSession, claim_texts: List[str]
+) -> Tuple[Dict[str, List[float]], Dict[str, Dict[str, Any]]]:
+    """
+    Embed the claims that don't exist yet through the async provider and
+    return ({content_hash: embedding}, lexical matches). Passing these to
+    compute_one / compute_batch keeps the embeddings API call off the event
+    loop's critical path and the lexical prefilter to one run; the sync
+    compute path then only does database work.
+    """
+    pending: Dict[str, str] = {}
+    for t in claim_texts:
+        pending.setdefault(content_hash(t), t)
+
+    states = await db.run_sync(_lookup_claim_states, list(pending))
+    missing = [h for h in pending if states.get(h, (0, None))[1] != EMBEDDINGS_MODEL]
+    # Lexical near-duplicates are answered without an embedding.
+    lexical = await db.run_sync(_lexical_matches, [pending[h] for h in missing])
+    missing = [h for h in missing if h not in lexical]
+    # End the read transaction so no connection is held while embedding.
+    await db.commit()
+    if not missing:
+        return {}, lexical
+
+    async def embed(hashes: List[str]) -> List[List[float]]:
+        with stage("embed"):
+            vectors = await embedder.aembed_many([pending[h] for h in hashes])
+            if len(vectors) != len(hashes):
+                raise RuntimeError("Embedding provider returned wrong number of embeddings")
+        return vectors
+
+    # Hashes another request is already embedding are awaited, not re-sent.
+    vectors = await embedding_flights.do_many(missing, embed)
+    return dict(zip(missing, vectors)), lexical
+
+
 @app.post("/claims/check-duplicate")
-def check_duplicate(req: CheckDuplicateRequest, db: Session = Depends(get_db)):
+async def check_duplicate(req: CheckDuplicateRequest, db: AsyncSession = Depends(get_async_db)):
+    h = content_hash(req.claim_text)
+
+    async def check() -> Dict[str, Any]:
+        # Waiters share this result, and the leader's request may finish
+        # (closing its session) first, so the leader works in its own.
+        async with own_async_session(db) as own:
+            embeddings, lexical = await prefetch_embeddings(own, [req.claim_text])
+            return await own.run_sync(compute_one, req.claim_text, req.top_k, embeddings.get(h), lexical)
+
     try:
-        return compute_one(db, req.claim_text, req.top_k)
+        # Concurrent checks of the same content share one embedding and one
+        # insert; the others then read the claim the leader created.
+        result, shared = await claim_flights.do(h, check)
+        if shared:
+            result = await db.run_sync(compute_one, req.claim_text, req.top_k)
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@app.post("/claims/check-duplicate-async", status_code=202)
+async def check_duplicate_async(req: CheckDuplicateRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Accept a check for a worker (worker.py) to process; poll
+    GET /claims/jobs/{job_id} for the result.
+    """
+    try:
+        job_id = await db.run_sync(
+            lambda s: enqueue_job(s, claim_text=req.claim_text, top_k=req.top_k)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/claims/jobs/{job_id}")
+async def get_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        job = await db.run_sync(fetch_job, job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
 @app.post("/claims/check-duplicate-batch")
-def check_duplicate_batch(req: BatchCheckDuplicateRequest, db: Session = Depends(get_db)):
+async def check_duplicate_batch(req: BatchCheckDuplicateRequest, db: AsyncSession = Depends(get_async_db)):
     try:
-        return {"results": [compute_one(db, claim_text, req.top_k) for claim_text in req.claims]}
+        embeddings, lexical = await prefetch_embeddings(db, req.claims)
+        results = await db.run_sync(
+            lambda s: compute_batch(s, req.claims, req.top_k, embeddings, lexical_matches=lexical)
+        )
+        return {"results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
+
+# ---------------------------------------------------------------------
+# Streaming bulk ingest (NDJSON in, NDJSON out)
+# ---------------------------------------------------------------------
+
+class _LineTooLong(ValueError):
+    pass
+
+
+def _parse_claim_line(raw: bytes) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """
+    One NDJSON input line -> (claim_text, None) or (None, error).
+    A line is {"claim_text": "..."} or a bare JSON string; blank lines
+    return None.
+    """
+    if not raw.strip():
+        return None
+    try:
+        value = json.loads(raw)
+    except ValueError as e:
+        return None, f"invalid JSON: {e}"
+    if isinstance(value, dict):
+        value = value.get("claim_text")
+    if not isinstance(value, str) or not value.strip():
+        return None, "expected a non-empty claim_text string"
+    return value, None
+
+
+async def _ndjson_claims(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int,
+) -> AsyncIterator[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    Split a request body stream into lines. Yields (line_no, claim_text,
+    error). At most one partial line is buffered between chunks.
+    """
+    buf = b""
+    line_no = 0
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            if len(raw) > max_line_bytes:
+                raise _LineTooLong(f"line {line_no} exceeds {max_line_bytes} bytes")
+            parsed = _parse_claim_line(raw)
+            if parsed is not None:
+                yield (line_no, *parsed)
+        if len(buf) > max_line_bytes:
+            raise _LineTooLong(f"line {line_no + 1} exceeds {max_line_bytes} bytes")
+
+    parsed = _parse_claim_line(buf)
+    if parsed is not None:
+        yield (line_no + 1, *parsed)
+
+
+def _ndjson(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+async def _check_window(db: AsyncSession, window: List[Tuple[int, str]], top_k: int) -> List[Dict[str, Any]]:
+    texts = [t for _, t in window]
+    try:
+        embeddings, lexical = await prefetch_embeddings(db, texts)
+        results = await db.run_sync(lambda s: compute_batch(s, texts, top_k, embeddings, lexical_matches=lexical))
+    except Exception as e:
+        return [{"line": n, "error": str(e)} for n, _ in window]
+    return [{"line": n, **r} for (n, _), r in zip(window, results)]
+
+
+async def stream_check_duplicates(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    top_k: int,
+    *,
+    window_size: int = STREAM_WINDOW_SIZE,
+    max_line_bytes: int = STREAM_MAX_LINE_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Run NDJSON claims through compute_batch in windows of window_size and
+    yield one NDJSON result per input line ({"line", ...check result} or
+    {"line", "error"}), then a {"summary": {...}} line with counters.
+
+    The body is only read while the current window fills up and the
+    window's results are sent before the next one is read, so a slow
+    client throttles ingestion and memory is bounded by one window
+    regardless of input size. An over-long line ends the stream (after
+    the summary) since the rest of the body can't be re-synchronized.
+    """
+    t0 = time.time()
+    counts = {"lines": 0, "claims": 0, "created": 0, "errors": 0, "windows": 0}
+    window: List[Tuple[int, str]] = []
+    aborted: Optional[str] = None
+
+    def tally(records: List[Dict[str, Any]]) -> None:
+        counts["windows"] += 1
+        for r in records:
+            if "error" in r:
+                counts["errors"] += 1
+            else:
+                counts["claims"] += 1
+                counts["created"] += int(bool(r["created"]))
+
+    try:
+        async for line_no, claim_text, error in _ndjson_claims(chunks, max_line_bytes):
+            counts["lines"] = line_no
+            if error is not None:
+                counts["errors"] += 1
+                yield _ndjson({"line": line_no, "error": error})
+                continue
+
+            window.append((line_no, claim_text))
+            if len(window) >= window_size:
+                records = await _check_window(db, window, top_k)
+                window = []
+                tally(records)
+                for r in records:
+                    yield _ndjson(r)
+    except _LineTooLong as e:
+        aborted = str(e)
+
+    if window:
+        records = await _check_window(db, window, top_k)
+        tally(records)
+        for r in records:
+            yield _ndjson(r)
+
+    elapsed = max(time.time() - t0, 1e-9)
+    summary: Dict[str, Any] = {
+        **counts,
+        "elapsed_ms": int(elapsed * 1000),
+        "claims_per_second": round(counts["claims"] / elapsed, 1),
+    }
+    if aborted is not None:
+        summary["aborted"] = aborted
+    yield _ndjson({"summary": summary})
+
+
+class CheckDuplicateStream:
+    """
+    POST /claims/check-duplicate-stream?top_k=5: bulk ingest without the
+    200-claim cap of check-duplicate-batch. Send NDJSON claims
+    ({"claim_text": ...} or a JSON string per line) and read NDJSON
+    results back as each window completes.
+
+    A raw ASGI endpoint rather than a StreamingResponse: the request body
+    is read while the response is being sent, and StreamingResponse's
+    disconnect listener would consume the body messages from the same
+    receive channel. Here the body is only read between writes, and
+    http.disconnect simply ends the input.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        request = Request(scope, receive)
+        try:
+            top_k = int(request.query_params.get("top_k", 5))
+            if not 1 <= top_k <= 50:
+                raise ValueError
+        except ValueError:
+            response = JSONResponse({"detail": "top_k must be an integer between 1 and 50"}, status_code=422)
+            await response(scope, receive, send)
+            return
+
+        async def chunks() -> AsyncIterator[bytes]:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body = message.get("body", b"")
+                if body:
+                    yield body
+                if not message.get("more_body", False):
+                    return
+
+        # Honour app.dependency_overrides like the Depends() endpoints do.
+        session_dependency = asynccontextmanager(app.dependency_overrides.get(get_async_db, get_async_db))
+        async with session_dependency() as db:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")],
+                }
+            )
+            async for line in stream_check_duplicates(db, chunks(), top_k):
+                await send({"type": "http.response.body", "body": line, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+app.router.routes.append(
+    Route("/claims/check-duplicate-stream", CheckDuplicateStream(), methods=["POST"], include_in_schema=False)
+)
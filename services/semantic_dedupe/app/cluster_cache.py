@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, List, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import CLUSTER_CACHE_EPOCH_CHECK_SECONDS, CLUSTER_CACHE_MAX_ITEMS
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _LRU(Generic[K, V]):
+    def __init__(self, max_items: int):
+        self.max_items = max(0, int(max_items))
+        self._items: "OrderedDict[K, V]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: K) -> Optional[V]:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        if self.max_items <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+
+class ClusterCache:
+    """
+    Process-local copy of the SC/CCS topology:
+      claim_id -> cluster_id, cluster_id -> canonical_claim_id,
+      claim_id -> claim_text (canonicals).
+
+    Safe to cache because CCS is stable: memberships are never moved,
+    canonicals are never re-elected and claim text never changes. Only
+    positive facts are stored ("not in a cluster yet" can change under us),
+    and writes must be recorded only after their transaction commits.
+    Each map is an independent LRU of max_items entries.
+
+    The one exception is an offline rebuild (app/recluster.py), which bumps
+    claim_cluster_epoch; set_epoch() drops the topology when it changes.
+    Facts read from the database are remembered with the epoch read in the
+    same statement (epoch_sql), so a read that raced a rebuild is never
+    cached under the new epoch. Without the table (migration 0013 not
+    applied) there are no rebuilds and epochs are not tracked.
+    """
+
+    def __init__(self, max_items: int):
+        self._lock = threading.Lock()
+        self._cluster_of: _LRU[int, int] = _LRU(max_items)
+        self._canonical_of: _LRU[int, int] = _LRU(max_items)
+        self._text_of: _LRU[int, str] = _LRU(max_items)
+        self._stats = {"hits": 0, "misses": 0}
+        self.enabled = self._cluster_of.max_items > 0
+        self.epoch: Optional[int] = None
+        self.epoch_checked_at = 0.0
+        self.has_epoch_table = False
+
+    @property
+    def epoch_sql(self) -> str:
+        """
+        SQL expression for the current epoch, to select alongside a read.
+        """
+        return "(SELECT epoch FROM claim_cluster_epoch)" if self.has_epoch_table else "NULL"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._stats,
+                "claims": len(self._cluster_of),
+                "clusters": len(self._canonical_of),
+                "texts": len(self._text_of),
+            }
+
+    def _get(self, lru: _LRU, key: int):
+        with self._lock:
+            value = lru.get(key)
+            self._stats["hits" if value is not None else "misses"] += 1
+            return value
+
+    def cluster_of(self, claim_id: int) -> Optional[int]:
+        return self._get(self._cluster_of, int(claim_id))
+
+    def canonical_of(self, cluster_id: int) -> Optional[int]:
+        return self._get(self._canonical_of, int(cluster_id))
+
+    def text_of(self, claim_id: int) -> Optional[str]:
+        return self._get(self._text_of, int(claim_id))
+
+    def remember(
+        self,
+        *,
+        claim_id: Optional[int] = None,
+        cluster_id: Optional[int] = None,
+        canonical_claim_id: Optional[int] = None,
+        epoch: Optional[int] = None,
+    ) -> None:
+        """
+        Record committed facts: claim_id is a member of cluster_id and/or
+        cluster_id's canonical is canonical_claim_id (itself a member).
+        epoch is the topology epoch they were read under, if known; facts
+        from an older epoch are ignored.
+        """
+        with self._lock:
+            if cluster_id is None:
+                return
+            if epoch is not None and self.epoch is not None and epoch != self.epoch:
+                if epoch < self.epoch:
+                    return
+                self._drop_topology()
+            if epoch is not None:
+                self.epoch = int(epoch)
+            if claim_id is not None:
+                self._cluster_of.put(int(claim_id), int(cluster_id))
+            if canonical_claim_id is not None:
+                self._canonical_of.put(int(cluster_id), int(canonical_claim_id))
+                self._cluster_of.put(int(canonical_claim_id), int(cluster_id))
+
+    def remember_text(self, claim_id: int, claim_text: str) -> None:
+        with self._lock:
+            self._text_of.put(int(claim_id), claim_text)
+
+    def set_epoch(self, epoch: int) -> None:
+        """
+        Record the current topology epoch; a change means the clusters were
+        rebuilt, so every cached membership and canonical is dropped.
+        Claim texts are kept.
+        """
+        with self._lock:
+            if self.epoch is not None and epoch != self.epoch:
+                self._drop_topology()
+            self.epoch = int(epoch)
+            self.epoch_checked_at = time.monotonic()
+
+    def _drop_topology(self) -> None:
+        self._cluster_of = _LRU(self._cluster_of.max_items)
+        self._canonical_of = _LRU(self._canonical_of.max_items)
+
+
+# -------------------------------------------------------------------
+# Per-database caches
+# -------------------------------------------------------------------
+
+_caches: "weakref.WeakKeyDictionary[Engine, ClusterCache]" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_cluster_cache(db: Session) -> ClusterCache:
+    """
+    Process-wide cache for the database behind db (one per engine).
+    Sized by CLUSTER_CACHE_MAX_ITEMS (0 disables caching).
+
+    At most every CLUSTER_CACHE_EPOCH_CHECK_SECONDS the cluster epoch is
+    re-read through db, so a rebuild is noticed by every process. Until
+    claim_cluster_epoch exists only its presence is checked.
+    """
+    engine = db.get_bind()
+    with _caches_lock:
+        cache = _caches.get(engine)
+        if cache is None:
+            cache = ClusterCache(CLUSTER_CACHE_MAX_ITEMS)
+            _caches[engine] = cache
+
+    if (
+        cache.enabled
+        and time.monotonic() - cache.epoch_checked_at >= CLUSTER_CACHE_EPOCH_CHECK_SECONDS
+    ):
+        if not cache.has_epoch_table:
+            cache.has_epoch_table = _epoch_table_exists(db)
+        if cache.has_epoch_table:
+            epoch = db.execute(text("SELECT epoch FROM claim_cluster_epoch")).scalar()
+            cache.set_epoch(int(epoch or 0))
+        else:
+            cache.epoch_checked_at = time.monotonic()
+    return cache
+
+
+def _epoch_table_exists(db: Session) -> bool:
+    if db.get_bind().dialect.name == "sqlite":
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'claim_cluster_epoch'"
+    else:
+        sql = "SELECT to_regclass('claim_cluster_epoch') IS NOT NULL"
+    return bool(db.execute(text(sql)).scalar())
+
+
+def read_epoch(db: Session) -> Optional[int]:
+    """
+    The current epoch, or None without claim_cluster_epoch. Read it before
+    (or with) the topology reads whose results will be remembered.
+    """
+    cache = get_cluster_cache(db)
+    if not cache.has_epoch_table:
+        return None
+    epoch = db.execute(text("SELECT epoch FROM claim_cluster_epoch")).scalar()
+    return int(epoch or 0)
+
+
+def all_cluster_caches() -> List[ClusterCache]:
+    """
+    Every live per-engine cache (for /metrics).
+    """
+    with _caches_lock:
+        return list(_caches.values())
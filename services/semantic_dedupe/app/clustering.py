@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+class UnionFind:
+    """
+    Disjoint-set forest with path compression.
+
+    union(a, b) is directional: a's component is attached under b's root,
+    so the root of a component is its first element (e.g. the canonical
+    claim) as long as elements are linked to earlier ones.
+    """
+
+    def __init__(self):
+        self._parent: Dict[Hashable, Hashable] = {}
+
+    def __contains__(self, x: Hashable) -> bool:
+        return x in self._parent
+
+    def find(self, x: Hashable) -> Hashable:
+        parent = self._parent
+        root = parent.setdefault(x, x)
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        ra = self.find(a)
+        rb = self.find(b)
+        if ra != rb:
+            self._parent[ra] = rb
+        return rb
+
+    def components(self) -> Dict[Hashable, List[Hashable]]:
+        groups: Dict[Hashable, List[Hashable]] = {}
+        for x in list(self._parent):
+            groups.setdefault(self.find(x), []).append(x)
+        return groups
+
+
+def intra_batch_topk(
+    queries: np.ndarray,
+    candidates: np.ndarray,
+    visible: Sequence[int],
+    top_k: int,
+    *,
+    self_index: Sequence[int],
+) -> List[List[Tuple[int, float]]]:
+    """
+    Top-k over the batch's own embeddings.
+
+    queries    : P x D unit vectors (one per batch position)
+    candidates : N x D unit vectors (the batch's new claims, in batch order)
+    visible[i] : position i may only see candidates[:visible[i]]
+    self_index : candidate row of position i itself (or -1)
+
+    Returns, per position, (candidate_row, similarity) pairs, best first.
+    """
+    out: List[List[Tuple[int, float]]] = []
+    if top_k <= 0 or len(candidates) == 0:
+        return [[] for _ in range(len(queries))]
+
+    scores = np.asarray(queries, dtype=np.float32) @ np.asarray(candidates, dtype=np.float32).T
+
+    for i, row in enumerate(scores):
+        n = int(visible[i])
+        row = row[:n].copy()
+        if 0 <= self_index[i] < n:
+            row[self_index[i]] = -np.inf
+        k = min(top_k, n)
+        if k <= 0:
+            out.append([])
+            continue
+        cand = np.argpartition(-row, k - 1)[:k] if k < n else np.arange(n)
+        cand = cand[np.argsort(-row[cand], kind="stable")]
+        out.append([(int(j), float(row[j])) for j in cand if np.isfinite(row[j])])
+    return out
+
+
+def merge_topk(
+    lists: Iterable[Sequence[Dict]],
+    top_k: int,
+) -> List[Dict]:
+    """
+    Merge several best-first similarity lists, keeping one entry per claim_id.
+    """
+    best: Dict[int, Dict] = {}
+    for items in lists:
+        for item in items:
+            cid = int(item["claim_id"])
+            if cid not in best or item["similarity"] > best[cid]["similarity"]:
+                best[cid] = item
+    return sorted(best.values(), key=lambda x: x["similarity"], reverse=True)[:top_k]
+
+
+# -------------------------------------------------------------------
+# Offline clustering (app/recluster.py)
+# -------------------------------------------------------------------
+
+def _find_roots(parent: np.ndarray, x: np.ndarray) -> np.ndarray:
+    roots = parent[x]
+    while True:
+        up = parent[roots]
+        if np.array_equal(up, roots):
+            return roots
+        roots = up
+
+
+def union_edges(parent: np.ndarray, a: np.ndarray, b: np.ndarray) -> None:
+    """
+    Vectorized union-find: merge the components of every (a[i], b[i]) edge
+    in the parent array (parent[x] == x for roots). Roots are always
+    hooked under the smaller root, so a component's root is its smallest
+    element. Conflicting hooks within a round are resolved by repeating
+    until every edge is satisfied.
+    """
+    while len(a):
+        ra = _find_roots(parent, a)
+        rb = _find_roots(parent, b)
+        split = ra != rb
+        if not split.any():
+            return
+        a, b, ra, rb = a[split], b[split], ra[split], rb[split]
+        parent[np.maximum(ra, rb)] = np.minimum(ra, rb)
+
+
+def threshold_components(
+    vectors: np.ndarray,
+    threshold: float,
+    *,
+    block_rows: int = 4096,
+    progress=None,
+) -> np.ndarray:
+    """
+    Connected components of the graph linking unit vectors whose cosine
+    similarity is >= threshold. Returns one label per row (the smallest
+    row index in its component).
+
+    Similarities are computed as blocked float32 matrix products over the
+    upper triangle, so memory is bounded by one block_rows x block_rows
+    score block regardless of the number of rows.
+    """
+    x = np.ascontiguousarray(vectors, dtype=np.float32)
+    n = len(x)
+    parent = np.arange(n, dtype=np.int64)
+    block = max(1, int(block_rows))
+
+    for i0 in range(0, n, block):
+        xi = x[i0 : i0 + block]
+        for j0 in range(i0, n, block):
+            scores = xi @ x[j0 : j0 + block].T
+            rows, cols = np.nonzero(scores >= threshold)
+            if j0 == i0:
+                upper = cols > rows
+                rows, cols = rows[upper], cols[upper]
+            if len(rows):
+                union_edges(parent, rows.astype(np.int64) + i0, cols.astype(np.int64) + j0)
+        if progress is not None:
+            progress(min(i0 + block, n), n)
+
+    return _find_roots(parent, np.arange(n, dtype=np.int64))
+
+
+def component_medoids(vectors: np.ndarray, labels: np.ndarray) -> Dict[int, int]:
+    """
+    label -> row of the component's medoid: the member with the highest
+    total cosine similarity to the other members. For unit vectors that
+    is argmax_i x_i . sum_j x_j, so no pairwise matrix is needed.
+    """
+    x = np.asarray(vectors, dtype=np.float32)
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+
+    out: Dict[int, int] = {}
+    for s, e in zip(starts, ends):
+        rows = order[s:e]
+        if len(rows) <= 2:
+            # Ties: keep the earliest claim (the current greedy canonical)
+            out[int(sorted_labels[s])] = int(rows.min())
+            continue
+        members = x[rows]
+        scores = members @ members.sum(axis=0)
+        out[int(sorted_labels[s])] = int(rows[int(np.argmax(scores))])
+    return out
@@ -2,12 +2,133 @@ import os
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# --- Connection pool (per process, sync and async engines each) ---
+# Embeddings are computed with no connection checked out, so the pool only
+# needs to cover the short read/write transactions.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
 EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", "openai").lower()
 EMBEDDINGS_MODEL = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-large")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
+# --- Batched embedding calls (embed_many) ---
+# Max inputs per embeddings.create request, and an estimated token budget
+# per request (OpenAI caps a single request at 300k tokens).
+EMBEDDINGS_BATCH_SIZE = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "256"))
+EMBEDDINGS_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDINGS_BATCH_MAX_TOKENS", "250000"))
+
+# --- Micro-batching of concurrent single-claim embeddings (async path) ---
+# Flush after this many queued texts (<= 1 disables) or after WAIT_MS.
+EMBEDDINGS_MICROBATCH_MAX_ITEMS = int(os.getenv("EMBEDDINGS_MICROBATCH_MAX_ITEMS", "64"))
+EMBEDDINGS_MICROBATCH_WAIT_MS = float(os.getenv("EMBEDDINGS_MICROBATCH_WAIT_MS", "5"))
+
+# --- Embedding cache, keyed by (content_hash, model) ---
+# In-memory LRU budget in bytes of float32 vectors (0 disables; 128 MiB is
+# ~11k vectors at 3072 dims) and optional file-backed tier.
+EMBEDDING_CACHE_MEMORY_BYTES = int(os.getenv("EMBEDDING_CACHE_MEMORY_BYTES", str(128 * 1024**2)))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(2 * 1024**3)))
+
 LOG_LEVEL = os.getenv("LOG_LEVEL", "info").lower()
 
+# Max wait for another request/replica creating the same claim (advisory
+# lock or claim reservation); should exceed the embedding provider timeout.
+CLAIM_LOCK_TIMEOUT_MS = int(os.getenv("CLAIM_LOCK_TIMEOUT_MS", "30000"))
+# Poll interval while waiting for a claim reserved by another request.
+CLAIM_WAIT_POLL_MS = int(os.getenv("CLAIM_WAIT_POLL_MS", "50"))
+
+# --- pgvector search ---
+# exact   : sequential scan over vector(3072) (no ANN index possible)
+# halfvec : HNSW over the halfvec(3072) shadow column (migration 0008),
+#           candidates re-scored on the full vectors
+# shadow  : HNSW over the truncated embedding_short column (migration 0009),
+#           top_k * SHADOW_RERANK_FACTOR candidates re-ranked on full vectors
+# centroid: score cluster centroids (migration 0014) first, then compare
+#           members of the CENTROID_PROBES closest clusters exactly
+PGVECTOR_SEARCH_MODE = os.getenv("PGVECTOR_SEARCH_MODE", "exact").lower()
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "100"))
+CENTROID_PROBES = int(os.getenv("CENTROID_PROBES", "8"))
+# Postgres queues new cluster members (migration 0017); the API folds them
+# into the centroids every CENTROID_FOLD_SECONDS, up to CENTROID_FOLD_BATCH
+# rows per transaction.
+CENTROID_FOLD_SECONDS = float(os.getenv("CENTROID_FOLD_SECONDS", "1"))
+CENTROID_FOLD_BATCH = int(os.getenv("CENTROID_FOLD_BATCH", "10000"))
+
+# Truncated shadow embeddings (0 disables). Must match the column dimension
+# in 0009_embedding_shadow.sql.
+EMBEDDING_SHADOW_DIMS = int(os.getenv("EMBEDDING_SHADOW_DIMS", "0"))
+EMBEDDING_SHADOW_COLUMN_DIMS = 1024  # embedding_short vector(1024)
+SHADOW_RERANK_FACTOR = int(os.getenv("SHADOW_RERANK_FACTOR", "10"))
+
+# Run top-k + cluster assignment + canonical fetch in one call to the
+# semantic_dedupe_check() SQL function (migration 0011) on Postgres.
+DEDUPE_SQL_FUNCTION = os.getenv("DEDUPE_SQL_FUNCTION", "false").lower() in ("1", "true", "yes")
+
+# Lexical prefilter (migration 0015, app/lexical.py): a claim whose
+# normalized text has shingle Jaccard >= LEXICAL_DUPLICATE_THRESHOLD (scaled
+# down for short claims) with an already clustered claim, and the same words
+# up to typos and reordering, is answered as its duplicate without an
+# embedding call.
+LEXICAL_PREFILTER = os.getenv("LEXICAL_PREFILTER", "false").lower() in ("1", "true", "yes")
+LEXICAL_DUPLICATE_THRESHOLD = float(os.getenv("LEXICAL_DUPLICATE_THRESHOLD", "0.92"))
+
+# Process-local LRU of cluster topology (claim -> cluster -> canonical, and
+# canonical text); entries per map, 0 disables.
+CLUSTER_CACHE_MAX_ITEMS = int(os.getenv("CLUSTER_CACHE_MAX_ITEMS", "100000"))
+# How often each process re-reads claim_cluster_epoch to notice an offline
+# re-clustering (python -m app.recluster).
+CLUSTER_CACHE_EPOCH_CHECK_SECONDS = float(os.getenv("CLUSTER_CACHE_EPOCH_CHECK_SECONDS", "5"))
+
+# --- In-process search (SQLite/dev and standalone deployments) ---
+# matrix : exact brute force over a resident float32 matrix
+# hnsw   : built-in approximate HNSW graph (app/hnsw.py)
+PYTHON_SEARCH_BACKEND = os.getenv("PYTHON_SEARCH_BACKEND", "matrix").lower()
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+# Persist the built-in HNSW graph here ("" keeps it in memory only) and
+# checkpoint every HNSW_SAVE_EVERY inserts.
+HNSW_INDEX_PATH = os.getenv("HNSW_INDEX_PATH", "")
+HNSW_SAVE_EVERY = int(os.getenv("HNSW_SAVE_EVERY", "10000"))
+# Rebuild the graph once tombstones (discarded rows) exceed this share of it.
+HNSW_COMPACT_RATIO = float(os.getenv("HNSW_COMPACT_RATIO", "0.2"))
+# How often the API's background task checkpoints / compacts the graph.
+HNSW_MAINTENANCE_SECONDS = float(os.getenv("HNSW_MAINTENANCE_SECONDS", "30"))
+
+# Local mmap'd embedding segment store for fast warm starts ("" disables)
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", "")
+EMBEDDING_STORE_SEGMENT_ROWS = int(os.getenv("EMBEDDING_STORE_SEGMENT_ROWS", "65536"))
+
+# --- Embedding job queue (POST /claims/check-duplicate-async + worker.py) ---
+EMBEDDING_JOB_BATCH_SIZE = int(os.getenv("EMBEDDING_JOB_BATCH_SIZE", "64"))
+EMBEDDING_JOB_POLL_SECONDS = float(os.getenv("EMBEDDING_JOB_POLL_SECONDS", "0.5"))
+# A 'running' job whose worker hasn't finished within the lease is retried.
+EMBEDDING_JOB_LEASE_SECONDS = int(os.getenv("EMBEDDING_JOB_LEASE_SECONDS", "300"))
+EMBEDDING_JOB_MAX_ATTEMPTS = int(os.getenv("EMBEDDING_JOB_MAX_ATTEMPTS", "3"))
+
+# --- Streaming bulk ingest (POST /claims/check-duplicate-stream) ---
+# Claims per compute_batch window, and the longest accepted NDJSON line.
+STREAM_WINDOW_SIZE = int(os.getenv("STREAM_WINDOW_SIZE", "200"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+
+if PYTHON_SEARCH_BACKEND not in ("matrix", "hnsw"):
+    raise RuntimeError(f"Invalid PYTHON_SEARCH_BACKEND={PYTHON_SEARCH_BACKEND}")
+
+if PGVECTOR_SEARCH_MODE not in ("exact", "halfvec", "shadow", "centroid"):
+    raise RuntimeError(f"Invalid PGVECTOR_SEARCH_MODE={PGVECTOR_SEARCH_MODE}")
+
+# pgvector rejects any other length, so catch it here, not on the first write.
+if EMBEDDING_SHADOW_DIMS not in (0, EMBEDDING_SHADOW_COLUMN_DIMS):
+    raise RuntimeError(
+        f"Invalid EMBEDDING_SHADOW_DIMS={EMBEDDING_SHADOW_DIMS}: "
+        f"embedding_short is vector({EMBEDDING_SHADOW_COLUMN_DIMS}), use 0 or {EMBEDDING_SHADOW_COLUMN_DIMS}"
+    )
+
+if PGVECTOR_SEARCH_MODE == "shadow" and EMBEDDING_SHADOW_DIMS <= 0:
+    raise RuntimeError("PGVECTOR_SEARCH_MODE=shadow requires EMBEDDING_SHADOW_DIMS > 0")
+
 # --- Similarity thresholds ---
 # cosine similarity ∈ [0, 1]
 DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.95"))
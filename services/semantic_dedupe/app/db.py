@@ -1,13 +1,35 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Generator, Optional, Tuple, Dict, Any
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Callable, Generator, Optional, Tuple, Dict, Any, List, Sequence, Set, TypeVar
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.util.concurrency import await_only, in_greenlet
 
-from app.config import DATABASE_URL, EMBEDDINGS_MODEL
+from app.config import (
+    CENTROID_FOLD_BATCH,
+    CLAIM_LOCK_TIMEOUT_MS,
+    CLAIM_WAIT_POLL_MS,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    EMBEDDINGS_MODEL,
+    EMBEDDING_SHADOW_DIMS,
+    LEXICAL_PREFILTER,
+)
+from app.clustering import UnionFind
+from app.cluster_cache import get_cluster_cache
+from app.metrics import stage
+from app.similarity import l2_normalize, shadow_embedding
+from app import lexical
 
 
 # -------------------------------------------------------------------
@@ -16,6 +38,23 @@ from app.config import DATABASE_URL, EMBEDDINGS_MODEL
 
 _engine: Optional[Engine] = None
 _SessionLocal: Optional[sessionmaker] = None
+_async_engine: Optional[AsyncEngine] = None
+_AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+
+def _pool_options(url: str) -> Dict[str, Any]:
+    """
+    QueuePool sizing from config. SQLite URLs keep SQLAlchemy's default
+    pool (in-memory SQLite doesn't accept these arguments).
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
 
 
 def _get_engine() -> Engine:
@@ -30,6 +69,7 @@ def _get_engine() -> Engine:
         DATABASE_URL,
         pool_pre_ping=True,
         future=True,
+        **_pool_options(DATABASE_URL),
     )
     return _engine
 
@@ -58,6 +98,77 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+# -------------------------------------------------------------------
+# Async engine/session (request path)
+# -------------------------------------------------------------------
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def _async_url(url: str):
+    """
+    Same database as DATABASE_URL, through its asyncio driver.
+    """
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend in _ASYNC_DRIVERS:
+        u = u.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+    return u
+
+
+def _get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is not None:
+        return _async_engine
+
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+
+    _async_engine = create_async_engine(
+        _async_url(DATABASE_URL),
+        pool_pre_ping=True,
+        **_pool_options(DATABASE_URL),
+    )
+    return _async_engine
+
+
+def _get_async_session_factory() -> async_sessionmaker:
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is not None:
+        return _AsyncSessionLocal
+
+    _AsyncSessionLocal = async_sessionmaker(
+        bind=_get_async_engine(),
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    return _AsyncSessionLocal
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    SessionLocal = _get_async_session_factory()
+    async with SessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def own_async_session(db: AsyncSession) -> AsyncGenerator[AsyncSession, None]:
+    """
+    A new AsyncSession on db's engine, for work that other requests share
+    (single-flight leaders) and so must not borrow the caller's session.
+    """
+    async with AsyncSession(bind=db.bind, autoflush=False, expire_on_commit=False) as own:
+        yield own
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _AsyncSessionLocal = None
+
+
 # -------------------------------------------------------------------
 # Helpers
 # -------------------------------------------------------------------
@@ -66,6 +177,34 @@ def _is_sqlite(db: Session) -> bool:
     return db.bind.dialect.name == "sqlite"
 
 
+T = TypeVar("T")
+
+
+def run_blocking(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Call fn(*args), which blocks or is CPU-bound (sync provider calls,
+    top-k over the resident index).
+
+    Sync code run through AsyncSession.run_sync (the async endpoints) is on
+    the event loop thread, so there fn goes to a worker thread and the
+    loop keeps serving other requests meanwhile. Elsewhere (worker, CLI
+    tools) it is called directly.
+    """
+    if in_greenlet():
+        return await_only(asyncio.to_thread(fn, *args))
+    return fn(*args)
+
+
+def pause(seconds: float) -> None:
+    """
+    time.sleep that yields to the event loop under AsyncSession.run_sync.
+    """
+    if in_greenlet():
+        await_only(asyncio.sleep(seconds))
+    else:
+        time.sleep(seconds)
+
+
 def _serialize_embedding(embedding):
     """
     SQLite cannot store vectors; Postgres (pgvector) can.
@@ -73,6 +212,140 @@ def _serialize_embedding(embedding):
     return json.dumps(embedding)
 
 
+def _vector_param(db: Session, embedding) -> str:
+    """
+    Bind value for a vector column: JSON text on SQLite, pgvector's text
+    form on Postgres, to be cast in SQL (_multirow_values casts=). asyncpg
+    has no pgvector codec, so a plain list would not bind there.
+    """
+    if _is_sqlite(db):
+        return _serialize_embedding(embedding)
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+
+def _vector_casts(db: Session, *cols: str) -> Dict[str, str]:
+    return {} if _is_sqlite(db) else {c: "vector" for c in cols}
+
+
+def decode_embedding(db: Session, value) -> Optional[List[float]]:
+    """
+    Normalize embedding from DB into List[float].
+
+    - SQLite (tests): JSON text
+    - Postgres (pgvector): may come back as string "[0.1,0.2,...]"
+    """
+    if value is None:
+        return None
+
+    if _is_sqlite(db):
+        return json.loads(value)
+
+    if isinstance(value, str):
+        v = value.strip()
+        if v.startswith("[") and v.endswith("]"):
+            inner = v[1:-1].strip()
+            if inner == "":
+                return []
+            return [float(x) for x in inner.split(",") if x.strip()]
+
+    try:
+        return list(value)
+    except TypeError:
+        return None
+
+
+def _multirow_values(
+    rows: Sequence[Dict[str, Any]],
+    cols: Sequence[str],
+    casts: Optional[Dict[str, str]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Render a multi-row VALUES list with uniquely named bind params.
+    casts maps a column to the SQL type its params are CAST to.
+    """
+    casts = casts or {}
+    parts: List[str] = []
+    params: Dict[str, Any] = {}
+    for i, row in enumerate(rows):
+        names = []
+        for c in cols:
+            key = f"{c}_{i}"
+            params[key] = row[c]
+            names.append(f"CAST(:{key} AS {casts[c]})" if c in casts else f":{key}")
+        parts.append("(" + ", ".join(names) + ")")
+    return ",\n".join(parts), params
+
+
+_REPLACE_STALE_EMBEDDING = """
+ON CONFLICT (claim_id) DO UPDATE SET
+  embedding_model = EXCLUDED.embedding_model,
+  embedding = EXCLUDED.embedding,
+  embedding_norm = EXCLUDED.embedding_norm,
+  is_normalized = EXCLUDED.is_normalized,
+  updated_tms = CURRENT_TIMESTAMP
+  {short}
+WHERE claim_embedding.embedding_model <> EXCLUDED.embedding_model
+"""
+
+
+def _insert_embeddings(
+    db: Session,
+    rows: Sequence[Tuple[int, List[float], float]],
+    *,
+    skip_existing: bool = False,
+) -> List[int]:
+    """
+    Insert (claim_id, unit_vector, norm) rows into claim_embedding and
+    return the claim_ids written. With skip_existing, rows whose claim
+    already has an embedding of the active model are left alone instead of
+    raising, and embeddings of another model (see app/reembed.py) are
+    replaced.
+
+    On Postgres with EMBEDDING_SHADOW_DIMS > 0 the truncated shadow vector
+    (migration 0009) is written alongside the full vector.
+    """
+    if not rows:
+        return []
+
+    sqlite = _is_sqlite(db)
+    shadow = EMBEDDING_SHADOW_DIMS > 0 and not sqlite
+
+    cols = ["id", "model", "vec", "norm", "normalized"]
+    if shadow:
+        cols.append("short")
+
+    values, params = _multirow_values(
+        [
+            {
+                "id": claim_id,
+                "model": EMBEDDINGS_MODEL,
+                "vec": _vector_param(db, unit),
+                "norm": norm,
+                "normalized": norm > 0.0,
+                "short": _vector_param(db, shadow_embedding(unit, EMBEDDING_SHADOW_DIMS)) if shadow else None,
+            }
+            for claim_id, unit, norm in rows
+        ],
+        cols,
+        _vector_casts(db, "vec", "short"),
+    )
+
+    written = db.execute(
+        text(
+            f"""
+            INSERT INTO claim_embedding
+              (claim_id, embedding_model, embedding, embedding_norm, is_normalized
+               {", embedding_short" if shadow else ""})
+            VALUES {values}
+            {_REPLACE_STALE_EMBEDDING.format(short=", embedding_short = EXCLUDED.embedding_short" if shadow else "") if skip_existing else ""}
+            RETURNING claim_id
+            """
+        ),
+        params,
+    ).fetchall()
+    return [int(r[0]) for r in written]
+
+
 # -------------------------------------------------------------------
 # Claim persistence
 # -------------------------------------------------------------------
@@ -82,96 +355,626 @@ def get_or_create_claim_with_embedding(
     *,
     claim_text: str,
     embedder,
+    embedding: Optional[List[float]] = None,
 ) -> Tuple[int, bool]:
     """
     Returns (claim_id, created)
 
     created=True iff the embedding was newly computed & stored.
+    If embedding is given (e.g. from a batched embed_many call) it is used
+    instead of calling the embedder.
+
+    The provider is never called with a transaction open: the claim row is
+    reserved in one short transaction (INSERT ... ON CONFLICT, so exactly
+    one request/replica owns it), the embedding is computed with no
+    connection held, and a second short transaction stores it.
+
+    A request that loses the reservation and has no embedding of its own
+    polls for the owner's write (up to CLAIM_LOCK_TIMEOUT_MS) rather than
+    paying for the embedding again, and takes over if the owner gave up.
     """
 
     from app.hashing import content_hash
 
     h = content_hash(claim_text)
 
-    # 1) Lookup existing claim
-    row = db.execute(
+    # 1) Lookup existing claim (short read)
+    state = _lookup_claim_states(db, [h]).get(h)
+    db.commit()
+    if state is not None and state[1] == EMBEDDINGS_MODEL:
+        return state[0], False
+
+    # 2) Reserve the content_hash with a bare claim row (short write)
+    reserved = True
+    if state is None:
+        row = db.execute(
+            text(
+                """
+                INSERT INTO claim (claim_text, content_hash)
+                VALUES (:t, :h)
+                ON CONFLICT (content_hash) DO NOTHING
+                RETURNING claim_id
+                """
+            ),
+            {"t": claim_text, "h": h},
+        ).fetchone()
+        db.commit()
+        owner = row is not None
+        claim_id = int(row[0]) if owner else _lookup_claim_ids(db, [h]).get(h)
+        if claim_id is None:
+            raise RuntimeError("Failed to insert claim")
+    else:
+        # Reserved by another request, or embedded with a previous model
+        owner = False
+        claim_id, model = state
+        reserved = model is None
+
+    if not owner and reserved and embedding is None:
+        waited = _wait_for_embedding(db, claim_id)
+        if waited == "stored":
+            return claim_id, False
+        if waited == "released":
+            return get_or_create_claim_with_embedding(db, claim_text=claim_text, embedder=embedder)
+
+    # 3) Compute embedding exactly once, outside any transaction
+    try:
+        if embedding is None:
+            with stage("embed"):
+                embedding = run_blocking(embedder.embed, claim_text)
+        if not embedding:
+            raise RuntimeError("Embedding provider returned empty embedding")
+    except Exception:
+        if owner:
+            _release_reservation(db, claim_id)
+        raise
+
+    # 4) Store unit-normalized embedding (similarity becomes a dot product)
+    unit, norm = l2_normalize(embedding)
+    written = _insert_embeddings(db, [(claim_id, unit, norm)], skip_existing=not owner)
+    if written and LEXICAL_PREFILTER:
+        insert_minhash_buckets(db, [(claim_id, claim_text)])
+    db.commit()
+
+    if not written:
+        return claim_id, False
+    record_committed_embeddings([(claim_id, unit)])
+    return claim_id, True
+
+
+def _wait_for_embedding(db: Session, claim_id: int) -> str:
+    """
+    Poll until another writer stores claim_id's embedding. Each probe is
+    its own short transaction. Returns "stored", "released" (the owner
+    dropped its reservation), "stale" (the owner wrote another model's
+    embedding) or "timeout".
+    """
+    deadline = time.monotonic() + CLAIM_LOCK_TIMEOUT_MS / 1000.0
+    while True:
+        row = db.execute(
+            text(
+                """
+                SELECT c.claim_id, e.embedding_model
+                FROM claim c
+                LEFT JOIN claim_embedding e ON e.claim_id = c.claim_id
+                WHERE c.claim_id = :id
+                """
+            ),
+            {"id": claim_id},
+        ).fetchone()
+        db.commit()
+        if row is None:
+            return "released"
+        if row[1] is not None:
+            return "stored" if row[1] == EMBEDDINGS_MODEL else "stale"
+        if time.monotonic() >= deadline:
+            return "timeout"
+        pause(CLAIM_WAIT_POLL_MS / 1000.0)
+
+
+def _release_reservation(db: Session, claim_id: int) -> None:
+    """
+    Drop a reserved claim row whose embedding could not be computed, so
+    waiters stop waiting and the next request starts over.
+    """
+    db.rollback()
+    db.execute(
         text(
             """
-            SELECT claim_id
-            FROM claim
-            WHERE content_hash = :h
+            DELETE FROM claim
+            WHERE claim_id = :id
+              AND NOT EXISTS (SELECT 1 FROM claim_embedding WHERE claim_id = :id)
             """
         ),
-        {"h": h},
-    ).fetchone()
+        {"id": claim_id},
+    )
+    db.commit()
 
-    if row:
-        return int(row[0]), False
 
-    # 2) Insert claim
-    row = db.execute(
+def record_committed_embeddings(rows: Sequence[Tuple[int, List[float]]]) -> None:
+    """
+    Mirror committed (claim_id, unit_vector) rows into the local segment
+    store, if one is configured. Call only after the transaction commits.
+    """
+    from app.segment_store import get_segment_store
+
+    store = get_segment_store()
+    if store is not None and rows:
+        store.append(rows)
+
+
+def _lookup_claim_states(db: Session, hashes: Sequence[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+    """
+    content_hash -> (claim_id, embedding_model) for the claims that exist.
+    embedding_model is None for a claim reserved by an in-progress request
+    (no embedding yet); a model other than EMBEDDINGS_MODEL means the
+    stored vector is stale and must be recomputed.
+    """
+    if not hashes:
+        return {}
+    with stage("hash_lookup"):
+        rows = db.execute(
+            text(
+                """
+                SELECT c.content_hash, c.claim_id, e.embedding_model
+                FROM claim c
+                LEFT JOIN claim_embedding e ON e.claim_id = c.claim_id
+                WHERE c.content_hash IN :hashes
+                """
+            ).bindparams(bindparam("hashes", expanding=True)),
+            {"hashes": list(hashes)},
+        ).fetchall()
+    return {str(h): (int(cid), model) for h, cid, model in rows}
+
+
+def _lock_content_hashes(db: Session, hashes: Sequence[str]) -> None:
+    """
+    Postgres: take transaction-scoped advisory locks on the given
+    content_hashes, held until commit/rollback. Locks are taken in key
+    order so overlapping batches can't deadlock, and waits are bounded by
+    CLAIM_LOCK_TIMEOUT_MS. No-op on other dialects.
+    """
+    if db.bind.dialect.name != "postgresql" or not hashes:
+        return
+
+    db.execute(
+        text("SELECT set_config('lock_timeout', :t, true)"),
+        {"t": f"{CLAIM_LOCK_TIMEOUT_MS}ms"},
+    )
+    db.execute(
         text(
             """
-            INSERT INTO claim (claim_text, content_hash)
-            VALUES (:t, :h)
-            RETURNING claim_id
+            SELECT pg_advisory_xact_lock(k)
+            FROM (
+              SELECT DISTINCT hashtextextended(h, 0) AS k
+              FROM unnest(CAST(:hashes AS text[])) AS h
+              ORDER BY k
+            ) keys
             """
         ),
-        {"t": claim_text, "h": h},
-    ).fetchone()
+        {"hashes": list(hashes)},
+    )
+
+
+def _lookup_claim_ids(db: Session, hashes: Sequence[str]) -> Dict[str, int]:
+    if not hashes:
+        return {}
+    rows = db.execute(
+        text(
+            """
+            SELECT content_hash, claim_id
+            FROM claim
+            WHERE content_hash IN :hashes
+            """
+        ).bindparams(bindparam("hashes", expanding=True)),
+        {"hashes": list(hashes)},
+    ).fetchall()
+    return {str(h): int(cid) for h, cid in rows}
 
-    if not row:
-        raise RuntimeError("Failed to insert claim")
 
-    claim_id = int(row[0])
+def prefetch_claim_embeddings(
+    db: Session,
+    *,
+    claim_texts: Sequence[str],
+    embedder,
+) -> Dict[str, List[float]]:
+    """
+    {content_hash: embedding} for the claims that still need one, computed
+    after the lookup transaction has ended, so no pooled connection is held
+    during the provider call. Pass the result to get_or_create_claims_bulk.
+    """
+    from app.hashing import content_hash
+
+    pending: Dict[str, str] = {}
+    for t in claim_texts:
+        pending.setdefault(content_hash(t), t)
+
+    states = _lookup_claim_states(db, list(pending))
+    db.commit()
 
-    # 3) Compute embedding exactly once
-    embedding = embedder.embed(claim_text)
-    if not embedding:
-        raise RuntimeError("Embedding provider returned empty embedding")
+    missing = [h for h in pending if states.get(h, (0, None))[1] != EMBEDDINGS_MODEL]
+    if not missing:
+        return {}
+    with stage("embed"):
+        vectors = run_blocking(embedder.embed_many, [pending[h] for h in missing])
+        if len(vectors) != len(missing):
+            raise RuntimeError("Embedding provider returned wrong number of embeddings")
+    return dict(zip(missing, vectors))
 
-    # 4) Store embedding
-    value = _serialize_embedding(embedding) if _is_sqlite(db) else embedding
 
+def get_or_create_claims_bulk(
+    db: Session,
+    *,
+    claim_texts: Sequence[str],
+    embedder,
+    embeddings: Optional[Dict[str, List[float]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Set-based get_or_create_claim_with_embedding for a whole batch.
+
+    embeddings optionally maps content_hash -> precomputed embedding (e.g.
+    from prefetch_claim_embeddings); only claims missing from it are
+    embedded here, i.e. inside the caller's transaction.
+
+    Returns one dict per input, in order:
+      {"claim_id", "hash", "created", "embedding"}
+    where embedding is the stored unit vector for newly created claims and
+    None otherwise. created=True only for the first occurrence of a new
+    content_hash in the batch.
+
+    Round-trips: one hash lookup (plus advisory locks and a re-check of
+    the new hashes on Postgres), one embed_many, one multi-row claim
+    INSERT ... RETURNING and one multi-row claim_embedding INSERT.
+    Does NOT commit; the caller owns the transaction.
+    """
+
+    from app.hashing import content_hash
+
+    hashes = [content_hash(t) for t in claim_texts]
+
+    pending: Dict[str, str] = {}
+    for h, t in zip(hashes, claim_texts):
+        pending.setdefault(h, t)
+
+    # 1) Lookup existing claims, then lock and re-check the new ones so
+    #    concurrent batches on other replicas don't insert them twice
+    states = _lookup_claim_states(db, list(pending))
+    new_hashes = [h for h in pending if h not in states]
+    if new_hashes:
+        _lock_content_hashes(db, new_hashes)
+        states.update(_lookup_claim_states(db, new_hashes))
+        new_hashes = [h for h in new_hashes if h not in states]
+    ids = {h: cid for h, (cid, _) in states.items()}
+
+    # Claims reserved by a single-claim request whose embedding isn't
+    # stored yet, or embedded with a previous model: this batch has (or
+    # computes) the vector anyway, so it writes it.
+    adopted = [h for h, (_, model) in states.items() if model != EMBEDDINGS_MODEL]
+
+    vectors: Dict[str, Tuple[List[float], float]] = {}
+    written: List[str] = []
+    need = new_hashes + adopted
+    if need:
+        # 2) Embed all new claims in as few provider calls as possible
+        known = embeddings or {}
+        to_embed = [h for h in need if h not in known]
+        fresh: List[List[float]] = []
+        if to_embed:
+            with stage("embed"):
+                fresh = run_blocking(embedder.embed_many, [pending[h] for h in to_embed])
+                if len(fresh) != len(to_embed):
+                    raise RuntimeError("Embedding provider returned wrong number of embeddings")
+        known = {**known, **dict(zip(to_embed, fresh))}
+        for h in need:
+            emb = known[h]
+            if not emb:
+                raise RuntimeError("Embedding provider returned empty embedding")
+            vectors[h] = l2_normalize(emb)
+
+        # 3) Insert claims (a writer that doesn't lock may win some hashes)
+        if new_hashes:
+            values, params = _multirow_values(
+                [{"t": pending[h], "h": h} for h in new_hashes],
+                ("t", "h"),
+            )
+            rows = db.execute(
+                text(
+                    f"""
+                    INSERT INTO claim (claim_text, content_hash)
+                    VALUES {values}
+                    ON CONFLICT (content_hash) DO NOTHING
+                    RETURNING content_hash, claim_id
+                    """
+                ),
+                params,
+            ).fetchall()
+            ids.update({str(h): int(cid) for h, cid in rows})
+
+            lost = [h for h in new_hashes if h not in ids]
+            ids.update(_lookup_claim_ids(db, lost))
+
+        # 4) Store unit-normalized embeddings
+        stored = set(
+            _insert_embeddings(
+                db,
+                [(ids[h], *vectors[h]) for h in need],
+                skip_existing=True,
+            )
+        )
+        written = [h for h in need if ids[h] in stored]
+        if LEXICAL_PREFILTER:
+            insert_minhash_buckets(db, [(ids[h], pending[h]) for h in written])
+
+    created = set(written)
+    out: List[Dict[str, Any]] = []
+    for h in hashes:
+        first = h in created
+        created.discard(h)
+        out.append(
+            {
+                "claim_id": ids[h],
+                "hash": h,
+                "created": first,
+                "embedding": vectors[h][0] if first else None,
+            }
+        )
+    return out
+
+
+# -------------------------------------------------------------------
+# Lexical prefilter (0015_claim_minhash.sql)
+# -------------------------------------------------------------------
+
+def insert_minhash_buckets(db: Session, rows: Sequence[Tuple[int, str]]) -> None:
+    """
+    Store the LSH buckets of each (claim_id, claim_text). Existing rows
+    are kept. Does NOT commit.
+    """
+    if not rows:
+        return
     db.execute(
         text(
             """
-            INSERT INTO claim_embedding
-              (claim_id, embedding_model, embedding)
-            VALUES
-              (:id, :model, :vec)
+            INSERT INTO claim_minhash_band (bucket, claim_id)
+            VALUES (:bucket, :id)
+            ON CONFLICT (bucket, claim_id) DO NOTHING
             """
         ),
-        {
-            "id": claim_id,
-            "model": EMBEDDINGS_MODEL,
-            "vec": value,
-        },
+        [
+            {"bucket": bucket, "id": int(cid)}
+            for cid, claim_text in rows
+            for bucket in lexical.band_buckets(claim_text)
+        ],
     )
 
-    db.commit()
-    return claim_id, True
+
+def find_lexical_duplicates(
+    db: Session,
+    claim_texts: Sequence[str],
+    *,
+    min_similarity: float,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Lexical near-duplicates of claims that don't exist yet, in two queries.
+
+    Returns content_hash -> {"claim_id", "text", "similarity", "cluster_id",
+    "canonical_claim_id"} for every text whose most similar clustered
+    candidate (sharing one of the text's own LSH buckets) passes
+    lexical.match() at min_similarity. Texts whose content_hash already has
+    a claim are left to the exact path.
+    """
+    from app.hashing import content_hash
+
+    pending: Dict[str, str] = {}
+    for t in claim_texts:
+        pending.setdefault(content_hash(t), t)
+    existing = _lookup_claim_states(db, list(pending))
+    pending = {h: t for h, t in pending.items() if h not in existing}
+    if not pending:
+        return {}
+
+    text_buckets = {h: lexical.band_buckets(t) for h, t in pending.items()}
+    rows = db.execute(
+        text(
+            """
+            SELECT b.bucket, c.claim_id, c.claim_text, m.cluster_id, cl.canonical_claim_id
+            FROM claim_minhash_band b
+            JOIN claim c ON c.claim_id = b.claim_id
+            JOIN claim_cluster_member m ON m.claim_id = c.claim_id
+            JOIN claim_cluster cl ON cl.cluster_id = m.cluster_id
+            WHERE b.bucket IN :buckets
+            """
+        ).bindparams(bindparam("buckets", expanding=True)),
+        {"buckets": sorted({b for bs in text_buckets.values() for b in bs})},
+    ).fetchall()
+
+    candidates: Dict[int, Tuple[str, int, int]] = {}
+    in_bucket: Dict[int, Set[int]] = {}
+    for bucket, cid, candidate, cluster_id, canonical_id in rows:
+        candidates[int(cid)] = (str(candidate), int(cluster_id), int(canonical_id))
+        in_bucket.setdefault(int(bucket), set()).add(int(cid))
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for h, t in pending.items():
+        # Only the candidates that collide with this text, not the batch's union
+        ids = set().union(*(in_bucket.get(b, ()) for b in text_buckets[h]))
+        best = None
+        for cid in sorted(ids):
+            candidate, cluster_id, canonical_id = candidates[cid]
+            sim = lexical.match(t, candidate, min_similarity)
+            if sim and (best is None or sim > best["similarity"]):
+                best = {
+                    "claim_id": cid,
+                    "text": candidate,
+                    "similarity": sim,
+                    "cluster_id": cluster_id,
+                    "canonical_claim_id": canonical_id,
+                }
+        if best is not None:
+            out[h] = best
+    return out
 
 
 # -------------------------------------------------------------------
 # SC/CCS: Semantic Clustering / Canonical Claim Selection
 # -------------------------------------------------------------------
 
-def _get_existing_cluster_id(db: Session, claim_id: int) -> Optional[int]:
-    row = db.execute(
+# Element-wise JSON sum, so SQLite keeps centroids without a round-trip.
+_SQLITE_ADD_TO_CENTROID = """
+UPDATE claim_cluster
+SET member_count = member_count + 1,
+    centroid_sum = COALESCE(
+      (
+        SELECT NULLIF(json_group_array(v), '[]')
+        FROM (
+          SELECT e.value + COALESCE(json_extract(claim_cluster.centroid_sum, '$[' || e.key || ']'), 0) AS v
+          FROM json_each((SELECT embedding FROM claim_embedding WHERE claim_id = :claim_id)) e
+          ORDER BY e.key
+        )
+      ),
+      centroid_sum
+    )
+WHERE cluster_id = :cluster_id
+"""
+
+
+def _add_to_centroids(db: Session, members: Sequence[Tuple[int, int]]) -> None:
+    """
+    Fold newly inserted (cluster_id, claim_id) memberships into
+    claim_cluster.centroid_sum / member_count.
+
+    On Postgres the claim_cluster_member trigger queues them in
+    claim_centroid_pending (0017_centroid_pending.sql) and fold_centroids
+    applies them later; SQLite has a single writer and folds inline.
+    """
+    if not members or not _is_sqlite(db):
+        return
+    db.execute(
+        text(_SQLITE_ADD_TO_CENTROID),
+        [{"cluster_id": int(k), "claim_id": int(cid)} for k, cid in members],
+    )
+
+
+def refresh_centroids(db: Session, *, model: str = EMBEDDINGS_MODEL) -> int:
+    """
+    Recompute every cluster's centroid_sum / member_count from its member
+    rows, counting only vectors of model in the centroid. Used after member
+    deletes or an embedding model promotion. Does NOT commit.
+    Returns the number of clusters.
+
+    On Postgres the pending assigned rows are cleared in the same
+    statement, so they are neither lost nor folded in twice.
+    """
+    if not _is_sqlite(db):
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext('claim_cluster_fold_centroids'), 0)"))
+        return db.execute(
+            text(
+                """
+                WITH cleared AS (
+                  DELETE FROM claim_centroid_pending WHERE cluster_id IS NOT NULL
+                )
+                UPDATE claim_cluster c
+                SET centroid_sum = (
+                      SELECT sum(e.embedding)
+                      FROM claim_cluster_member m
+                      JOIN claim_embedding e ON e.claim_id = m.claim_id
+                      WHERE m.cluster_id = c.cluster_id
+                        AND e.embedding_model = :model
+                    ),
+                    member_count = (
+                      SELECT count(*) FROM claim_cluster_member m WHERE m.cluster_id = c.cluster_id
+                    )
+                """
+            ),
+            {"model": model},
+        ).rowcount
+
+    sums: Dict[int, Any] = {}
+    counts: Dict[int, int] = {}
+    rows = db.execute(
         text(
             """
-            SELECT cluster_id
-            FROM claim_cluster_member
-            WHERE claim_id = :claim_id
+            SELECT m.cluster_id, e.embedding, e.embedding_model
+            FROM claim_cluster_member m
+            LEFT JOIN claim_embedding e ON e.claim_id = m.claim_id
+            """
+        )
+    )
+    for cluster_id, emb, emb_model in rows:
+        cluster_id = int(cluster_id)
+        counts[cluster_id] = counts.get(cluster_id, 0) + 1
+        vec = decode_embedding(db, emb) if emb_model == model else None
+        if vec:
+            prev = sums.get(cluster_id)
+            sums[cluster_id] = vec if prev is None else [a + b for a, b in zip(prev, vec)]
+
+    cluster_ids = [int(r[0]) for r in db.execute(text("SELECT cluster_id FROM claim_cluster")).fetchall()]
+    if cluster_ids:
+        db.execute(
+            text("UPDATE claim_cluster SET centroid_sum = :s, member_count = :n WHERE cluster_id = :id"),
+            [
+                {
+                    "id": cid,
+                    "s": _serialize_embedding(sums[cid]) if cid in sums else None,
+                    "n": counts.get(cid, 0),
+                }
+                for cid in cluster_ids
+            ],
+        )
+    return len(cluster_ids)
+
+
+def fold_centroids(db: Session, *, max_rows: int = CENTROID_FOLD_BATCH) -> int:
+    """
+    Apply up to max_rows queued memberships to the cluster centroids
+    (claim_cluster_fold_centroids(), 0017_centroid_pending.sql). Returns
+    the number folded: 0 if another folder holds the lock, and always 0
+    on SQLite, which folds inline. Does NOT commit.
+    """
+    if _is_sqlite(db):
+        return 0
+    return int(
+        db.execute(
+            text("SELECT claim_cluster_fold_centroids(:max_rows)"), {"max_rows": max_rows}
+        ).scalar()
+        or 0
+    )
+
+
+def _lookup_cluster_id(db: Session, claim_id: int) -> Tuple[Optional[int], Optional[int], bool]:
+    """
+    (cluster_id, epoch, cached): epoch is read in the same statement as the
+    membership, None on a cache hit or without claim_cluster_epoch.
+    """
+    cache = get_cluster_cache(db)
+    cached = cache.cluster_of(claim_id)
+    if cached is not None:
+        return cached, None, True
+    row = db.execute(
+        text(
+            f"""
+            SELECT
+              (SELECT cluster_id FROM claim_cluster_member WHERE claim_id = :claim_id),
+              {cache.epoch_sql}
             """
         ),
         {"claim_id": claim_id},
     ).fetchone()
-    return int(row[0]) if row else None
+    cluster_id, epoch = row
+    return (
+        int(cluster_id) if cluster_id is not None else None,
+        int(epoch) if epoch is not None else None,
+        False,
+    )
+
+
+def _get_existing_cluster_id(db: Session, claim_id: int) -> Optional[int]:
+    return _lookup_cluster_id(db, claim_id)[0]
 
 
 def _get_canonical_claim_id(db: Session, cluster_id: int) -> int:
+    cached = get_cluster_cache(db).canonical_of(cluster_id)
+    if cached is not None:
+        return cached
     row = db.execute(
         text(
             """
@@ -233,6 +1036,7 @@ def _ensure_cluster_with_canonical(db: Session, canonical_claim_id: int) -> int:
         ),
         {"cluster_id": cluster_id, "claim_id": canonical_claim_id, "sim": 1.0},
     )
+    _add_to_centroids(db, [(cluster_id, canonical_claim_id)])
 
     return cluster_id
 
@@ -257,11 +1061,22 @@ def assign_claim_to_cluster(
           - Create cluster with canonical=claim_id
 
     Canonical selection (CCS) is stable in MVP: we do not re-elect canonicals.
+    That makes the topology cacheable: lookups go through the process-local
+    ClusterCache, so repeat checks and joins to known clusters issue no
+    cluster queries.
     """
 
-    existing_cluster = _get_existing_cluster_id(db, claim_id)
+    cache = get_cluster_cache(db)
+
+    # Everything below is read at or after this epoch, so a rebuild that
+    # lands mid-way leaves the remembered facts tagged with the old one.
+    existing_cluster, epoch, cached = _lookup_cluster_id(db, claim_id)
     if existing_cluster is not None:
         canonical_id = _get_canonical_claim_id(db, existing_cluster)
+        if not cached:
+            cache.remember(
+                claim_id=claim_id, cluster_id=existing_cluster, canonical_claim_id=canonical_id, epoch=epoch
+            )
         return {
             "cluster_id": existing_cluster,
             "canonical_claim_id": canonical_id,
@@ -273,29 +1088,34 @@ def assign_claim_to_cluster(
         bm_cluster = _get_existing_cluster_id(db, best_match_claim_id)
         if bm_cluster is not None:
             cluster_id = bm_cluster
+            canonical_id = _get_canonical_claim_id(db, cluster_id)
         else:
             cluster_id = _ensure_cluster_with_canonical(db, best_match_claim_id)
+            canonical_id = best_match_claim_id
     else:
         cluster_id = _ensure_cluster_with_canonical(db, claim_id)
-
-    canonical_id = _get_canonical_claim_id(db, cluster_id)
+        canonical_id = claim_id
 
     # Store membership similarity.
     # For canonical itself => 1.0, otherwise store best-match similarity.
     sim = 1.0 if claim_id == canonical_id else float(best_match_similarity)
 
-    db.execute(
+    inserted = db.execute(
         text(
             """
             INSERT INTO claim_cluster_member (cluster_id, claim_id, similarity)
             VALUES (:cluster_id, :claim_id, :sim)
             ON CONFLICT (cluster_id, claim_id) DO NOTHING
+            RETURNING claim_id
             """
         ),
         {"cluster_id": cluster_id, "claim_id": claim_id, "sim": sim},
-    )
+    ).fetchall()
+    if inserted:
+        _add_to_centroids(db, [(cluster_id, claim_id)])
 
     db.commit()
+    cache.remember(claim_id=claim_id, cluster_id=cluster_id, canonical_claim_id=canonical_id, epoch=epoch)
 
     return {
         "cluster_id": cluster_id,
@@ -305,9 +1125,264 @@ def assign_claim_to_cluster(
 
 
 def fetch_claim_text(db: Session, claim_id: int) -> Optional[str]:
+    cache = get_cluster_cache(db)
+    cached = cache.text_of(claim_id)
+    if cached is not None:
+        return cached
     row = db.execute(
         text("SELECT claim_text FROM claim WHERE claim_id = :id"),
         {"id": claim_id},
     ).fetchone()
-    return str(row[0]) if row else None
+    if not row:
+        return None
+    cache.remember_text(claim_id, str(row[0]))
+    return str(row[0])
+
+
+def check_claim_server_side(
+    db: Session,
+    *,
+    claim_id: int,
+    top_k: int,
+    join_threshold: float,
+    mode: str,
+    candidates: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Postgres only: top-k search, cluster assignment (same rules as
+    assign_claim_to_cluster) and canonical text fetch in a single call to
+    semantic_dedupe_check() from 0011_dedupe_check_function.sql. Commits.
+
+    Returns {"similar", "cluster_id", "canonical_claim_id",
+    "canonical_text", "assigned"}.
+    """
+    cache = get_cluster_cache(db)
+    row = db.execute(
+        text(
+            f"""
+            SELECT semantic_dedupe_check(
+              CAST(:claim_id AS BIGINT),
+              CAST(:top_k AS INT),
+              CAST(:threshold AS FLOAT8),
+              CAST(:mode AS TEXT),
+              CAST(:candidates AS INT),
+              CAST(:ef_search AS INT)
+            ), {cache.epoch_sql}
+            """
+        ),
+        {
+            "claim_id": claim_id,
+            "top_k": top_k,
+            "threshold": join_threshold,
+            "mode": mode,
+            "candidates": candidates,
+            "ef_search": ef_search,
+        },
+    ).fetchone()
+    db.commit()
+
+    result = row[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+
+    cache.remember(
+        claim_id=claim_id,
+        cluster_id=int(result["cluster_id"]),
+        canonical_claim_id=int(result["canonical_claim_id"]),
+        epoch=row[1],
+    )
+    if result["canonical_text"] is not None:
+        cache.remember_text(int(result["canonical_claim_id"]), result["canonical_text"])
+
+    return {
+        "similar": [
+            {"claim_id": int(s["claim_id"]), "text": str(s["text"]), "similarity": float(s["similarity"])}
+            for s in result["similar"]
+        ],
+        "cluster_id": int(result["cluster_id"]),
+        "canonical_claim_id": int(result["canonical_claim_id"]),
+        "canonical_text": result["canonical_text"],
+        "assigned": bool(result["assigned"]),
+    }
+
 
+def fetch_claim_texts(db: Session, claim_ids: Sequence[int]) -> Dict[int, str]:
+    cache = get_cluster_cache(db)
+    out: Dict[int, str] = {}
+    missing = set()
+    for cid in {int(c) for c in claim_ids}:
+        cached = cache.text_of(cid)
+        if cached is not None:
+            out[cid] = cached
+        else:
+            missing.add(cid)
+    if not missing:
+        return out
+    rows = db.execute(
+        text(
+            """
+            SELECT claim_id, claim_text
+            FROM claim
+            WHERE claim_id IN :ids
+            """
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": sorted(missing)},
+    ).fetchall()
+    for cid, t in rows:
+        out[int(cid)] = str(t)
+        cache.remember_text(int(cid), str(t))
+    return out
+
+
+def assign_claims_to_clusters_bulk(
+    db: Session,
+    *,
+    assignments: Sequence[Tuple[int, Optional[int], float]],
+    join_threshold: float,
+) -> List[Dict[str, Any]]:
+    """
+    Set-based assign_claim_to_cluster for an ordered batch of
+    (claim_id, best_match_claim_id, best_match_similarity).
+
+    Applies exactly the MVP rules of assign_claim_to_cluster, in batch
+    order, in one pass over a union-find view of the cluster tables. Existing
+    memberships/canonicals are read in two queries and new clusters and
+    memberships are written with one multi-row INSERT each.
+    Does NOT commit; the caller owns the transaction.
+    """
+    if not assignments:
+        return []
+
+    involved = set()
+    for claim_id, best_id, _ in assignments:
+        involved.add(int(claim_id))
+        if best_id is not None:
+            involved.add(int(best_id))
+
+    # Cluster keys are real cluster_ids (int) or ("new", canonical_claim_id).
+    member_of: Dict[int, Any] = {}
+    rows = db.execute(
+        text(
+            """
+            SELECT claim_id, cluster_id
+            FROM claim_cluster_member
+            WHERE claim_id IN :ids
+            ORDER BY cluster_id
+            """
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": sorted(involved)},
+    ).fetchall()
+    for cid, cluster_id in rows:
+        member_of.setdefault(int(cid), int(cluster_id))
+
+    canonical_of: Dict[Any, int] = {}
+    cluster_of_root: Dict[int, Any] = {}
+    rows = db.execute(
+        text(
+            """
+            SELECT cluster_id, canonical_claim_id
+            FROM claim_cluster
+            WHERE cluster_id IN :clusters
+               OR canonical_claim_id IN :ids
+            ORDER BY cluster_id
+            """
+        ).bindparams(
+            bindparam("clusters", expanding=True),
+            bindparam("ids", expanding=True),
+        ),
+        {"clusters": sorted(set(member_of.values())), "ids": sorted(involved)},
+    ).fetchall()
+    for cluster_id, canonical_id in rows:
+        canonical_of[int(cluster_id)] = int(canonical_id)
+        cluster_of_root.setdefault(int(canonical_id), int(cluster_id))
+
+    # Union-find over claims, rooted at canonicals: every clustered claim
+    # hangs under its cluster's canonical, so find(x) is the canonical a
+    # claim joining x ends up with.
+    uf = UnionFind()
+    for cid, cluster_id in member_of.items():
+        if cluster_id not in canonical_of:
+            raise RuntimeError(f"claim_cluster missing cluster_id={cluster_id}")
+        uf.union(cid, canonical_of[cluster_id])
+
+    new_clusters: List[int] = []
+    new_members: List[Tuple[Any, int, float]] = []
+
+    decided: List[Tuple[Any, bool]] = []
+    for claim_id, best_id, best_sim in assignments:
+        claim_id = int(claim_id)
+        existing = member_of.get(claim_id)
+        if existing is not None:
+            decided.append((existing, False))
+            continue
+
+        if best_id is not None and best_sim >= join_threshold:
+            root = uf.union(claim_id, int(best_id))
+        else:
+            root = uf.find(claim_id)
+
+        key = cluster_of_root.get(root)
+        if key is None:
+            # New cluster with canonical=root (the best match, or the claim itself)
+            key = ("new", root)
+            new_clusters.append(root)
+            cluster_of_root[root] = key
+            canonical_of[key] = root
+            if root != claim_id:
+                member_of[root] = key
+                new_members.append((key, root, 1.0))
+
+        sim = 1.0 if claim_id == canonical_of[key] else float(best_sim)
+        member_of[claim_id] = key
+        new_members.append((key, claim_id, sim))
+        decided.append((key, True))
+
+    # Materialize new clusters, then all memberships
+    resolved: Dict[Any, int] = {k: k for k in canonical_of if isinstance(k, int)}
+    if new_clusters:
+        values, params = _multirow_values([{"cid": c} for c in new_clusters], ("cid",))
+        rows = db.execute(
+            text(
+                f"""
+                INSERT INTO claim_cluster (canonical_claim_id)
+                VALUES {values}
+                RETURNING canonical_claim_id, cluster_id
+                """
+            ),
+            params,
+        ).fetchall()
+        for canonical_id, cluster_id in rows:
+            resolved[("new", int(canonical_id))] = int(cluster_id)
+        if len(rows) != len(new_clusters):
+            raise RuntimeError("Failed to create claim_cluster")
+
+    if new_members:
+        values, params = _multirow_values(
+            [
+                {"cluster_id": resolved[key], "claim_id": cid, "sim": sim}
+                for key, cid, sim in new_members
+            ],
+            ("cluster_id", "claim_id", "sim"),
+        )
+        inserted = db.execute(
+            text(
+                f"""
+                INSERT INTO claim_cluster_member (cluster_id, claim_id, similarity)
+                VALUES {values}
+                ON CONFLICT (cluster_id, claim_id) DO NOTHING
+                RETURNING cluster_id, claim_id
+                """
+            ),
+            params,
+        ).fetchall()
+        _add_to_centroids(db, [(int(k), int(cid)) for k, cid in inserted])
+
+    return [
+        {
+            "cluster_id": resolved[key],
+            "canonical_claim_id": canonical_of[key],
+            "assigned": assigned,
+        }
+        for key, assigned in decided
+    ]
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List
 
@@ -16,4 +17,22 @@ class EmbeddingProvider(ABC):
     def embed(self, text: str) -> List[float]:
         ...
 
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts, preserving input order.
+        Providers with a native multi-input API should override this.
+        """
+        return [self.embed(t) for t in texts]
 
+    async def aembed(self, text: str) -> List[float]:
+        """
+        Async embed(). The default runs embed() in a worker thread;
+        providers with an async client should override this.
+        """
+        return await asyncio.to_thread(self.embed, text)
+
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Async embed_many(); same default as aembed().
+        """
+        return await asyncio.to_thread(self.embed_many, texts)
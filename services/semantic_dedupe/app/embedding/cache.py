@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_CACHE_MEMORY_BYTES,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MAX_BYTES,
+)
+from app.embedding.base import EmbeddingProvider
+from app.hashing import content_hash
+
+
+# -------------------------------------------------------------------
+# Tier 1: in-memory LRU
+# -------------------------------------------------------------------
+
+class LRUEmbeddingCache:
+    """
+    Vectors are held as float32 arrays (4 bytes per dimension, not ~32 for
+    a list of Python floats) and the tier is bounded by their total size.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._items: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is None:
+                return None
+            self._items.move_to_end(key)
+        return vec.tolist()
+
+    def put(self, key: str, vec: List[float]) -> None:
+        arr = np.asarray(vec, dtype=np.float32)
+        if arr.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._items[key] = arr
+            self._bytes += arr.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+
+# -------------------------------------------------------------------
+# Tier 2: persistent local store (SQLite file)
+# -------------------------------------------------------------------
+
+class DiskEmbeddingCache:
+    """
+    File-backed embedding store. Vectors are kept as float32 blobs and the
+    least recently used entries are evicted once the total payload exceeds
+    max_bytes.
+
+    Several processes may share the file, so the payload size is read from
+    the file (SUM over a covering index) rather than kept in memory; it is
+    re-checked after every max_bytes / 20 bytes this process writes. Access
+    times are buffered and written in batches, not one UPDATE per hit.
+    """
+
+    TOUCH_BATCH = 256
+    TOUCH_FLUSH_SECONDS = 5.0
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._check_every = max(1, self.max_bytes // 20)
+        self._unchecked_bytes = 0
+        self._touched: Dict[str, float] = {}
+        self._touched_at = time.monotonic()
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+              cache_key    TEXT PRIMARY KEY,
+              vec          BLOB NOT NULL,
+              nbytes       INTEGER NOT NULL,
+              accessed_at  REAL NOT NULL
+            )
+            """
+        )
+        # Covers both the eviction scan and SUM(nbytes), so neither reads
+        # the vector pages.
+        self._conn.execute("DROP INDEX IF EXISTS idx_embedding_cache_accessed")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embedding_cache_accessed_nbytes "
+            "ON embedding_cache (accessed_at, nbytes)"
+        )
+        with self._lock:
+            self._evict()
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embedding_cache").fetchone()
+        return int(row[0])
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vec FROM embedding_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            if (
+                len(self._touched) >= self.TOUCH_BATCH
+                or time.monotonic() - self._touched_at >= self.TOUCH_FLUSH_SECONDS
+            ):
+                self._flush_touches()
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def _flush_touches(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embedding_cache SET accessed_at = ? WHERE cache_key = ?",
+                [(t, key) for key, t in self._touched.items()],
+            )
+            self._touched.clear()
+        self._touched_at = time.monotonic()
+
+    def put(self, key: str, vec: List[float]) -> None:
+        blob = np.asarray(vec, dtype=np.float32).tobytes()
+        if len(blob) > self.max_bytes:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO embedding_cache (cache_key, vec, nbytes, accessed_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (key, blob, len(blob), time.time()),
+            )
+            self._touched.pop(key, None)
+            self._unchecked_bytes += len(blob)
+            if self._unchecked_bytes >= self._check_every:
+                self._evict()
+
+    def _evict(self) -> None:
+        self._flush_touches()
+        self._unchecked_bytes = 0
+        # Evict down to 90% of the budget so we don't evict on every put.
+        target = int(self.max_bytes * 0.9)
+        # IMMEDIATE: the size another process is evicting against can't
+        # change under us.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            total = self._stored_bytes()
+            if total > self.max_bytes:
+                while total > target:
+                    rows = self._conn.execute(
+                        """
+                        SELECT rowid, nbytes
+                        FROM embedding_cache
+                        ORDER BY accessed_at
+                        LIMIT 256
+                        """
+                    ).fetchall()
+                    if not rows:
+                        break
+                    doomed = []
+                    for rowid, nbytes in rows:
+                        doomed.append((rowid,))
+                        total -= int(nbytes)
+                        if total <= target:
+                            break
+                    self._conn.executemany("DELETE FROM embedding_cache WHERE rowid = ?", doomed)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touches()
+            self._conn.close()
+
+
+# -------------------------------------------------------------------
+# Provider wrapper
+# -------------------------------------------------------------------
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    """
+    Caches embeddings in front of another provider, keyed by
+    (content_hash(text), model). Lookups go memory -> disk -> provider.
+    On the async path the disk tier's SQLite I/O runs in a worker thread,
+    off the event loop.
+    """
+
+    def __init__(
+        self,
+        inner: EmbeddingProvider,
+        *,
+        memory: Optional[LRUEmbeddingCache] = None,
+        disk: Optional[DiskEmbeddingCache] = None,
+    ):
+        self.inner = inner
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @property
+    def model_name(self) -> str:
+        return self.inner.model_name
+
+    def cache_key(self, text: str) -> str:
+        return f"{self.model_name}:{content_hash(text)}"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def _lookup_memory(self, key: str) -> Optional[List[float]]:
+        if self.memory is None:
+            return None
+        vec = self.memory.get(key)
+        if vec is not None:
+            self._count("memory_hits")
+        return vec
+
+    def _lookup_disk(self, key: str) -> Optional[List[float]]:
+        if self.disk is None:
+            return None
+        vec = self.disk.get(key)
+        if vec is not None:
+            self._count("disk_hits")
+            if self.memory is not None:
+                self.memory.put(key, vec)
+        return vec
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vec = self._lookup_memory(key)
+        return vec if vec is not None else self._lookup_disk(key)
+
+    def _store(self, key: str, vec: List[float]) -> None:
+        if self.memory is not None:
+            self.memory.put(key, vec)
+        if self.disk is not None:
+            self.disk.put(key, vec)
+
+    async def _alookup_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        out = [self._lookup_memory(k) for k in keys]
+        todo = [i for i, vec in enumerate(out) if vec is None]
+        if todo and self.disk is not None:
+            found = await asyncio.to_thread(lambda: [self._lookup_disk(keys[i]) for i in todo])
+            for i, vec in zip(todo, found):
+                out[i] = vec
+        return out
+
+    async def _astore_many(self, items: Dict[str, List[float]]) -> None:
+        if self.memory is not None:
+            for key, vec in items.items():
+                self.memory.put(key, vec)
+        if self.disk is not None and items:
+            await asyncio.to_thread(lambda: [self.disk.put(key, vec) for key, vec in items.items()])
+
+    def embed(self, text: str) -> List[float]:
+        key = self.cache_key(text)
+        vec = self._lookup(key)
+        if vec is not None:
+            return vec
+
+        self._count("misses")
+        vec = self.inner.embed(text)
+        if vec:
+            self._store(key, vec)
+        return vec
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache_key(t) for t in texts]
+        out: List[Optional[List[float]]] = [self._lookup(k) for k in keys]
+
+        # Embed each missing key once, even if repeated in texts.
+        missing: Dict[str, str] = {}
+        for k, t, vec in zip(keys, texts, out):
+            if vec is None:
+                missing.setdefault(k, t)
+
+        if missing:
+            self._count("misses", len(missing))
+            fresh = self.inner.embed_many(list(missing.values()))
+            if len(fresh) != len(missing):
+                raise RuntimeError("Embedding provider returned wrong number of embeddings")
+            computed = dict(zip(missing, fresh))
+            for k, vec in computed.items():
+                if vec:
+                    self._store(k, vec)
+            out = [vec if vec is not None else computed[k] for k, vec in zip(keys, out)]
+
+        return out  # type: ignore[return-value]
+
+
+    async def aembed(self, text: str) -> List[float]:
+        key = self.cache_key(text)
+        vec = (await self._alookup_many([key]))[0]
+        if vec is not None:
+            return vec
+
+        self._count("misses")
+        vec = await self.inner.aembed(text)
+        if vec:
+            await self._astore_many({key: vec})
+        return vec
+
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache_key(t) for t in texts]
+        out: List[Optional[List[float]]] = await self._alookup_many(keys)
+
+        missing: Dict[str, str] = {}
+        for k, t, vec in zip(keys, texts, out):
+            if vec is None:
+                missing.setdefault(k, t)
+
+        if missing:
+            self._count("misses", len(missing))
+            fresh = await self.inner.aembed_many(list(missing.values()))
+            if len(fresh) != len(missing):
+                raise RuntimeError("Embedding provider returned wrong number of embeddings")
+            computed = dict(zip(missing, fresh))
+            await self._astore_many({k: vec for k, vec in computed.items() if vec})
+            out = [vec if vec is not None else computed[k] for k, vec in zip(keys, out)]
+
+        return out  # type: ignore[return-value]
+
+
+def with_cache(provider: EmbeddingProvider) -> EmbeddingProvider:
+    """
+    Wrap provider with the cache tiers enabled in config (no-op if none).
+    """
+    memory = LRUEmbeddingCache(EMBEDDING_CACHE_MEMORY_BYTES) if EMBEDDING_CACHE_MEMORY_BYTES > 0 else None
+    disk = DiskEmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES) if EMBEDDING_CACHE_PATH else None
+    if memory is None and disk is None:
+        return provider
+    return CachedEmbeddingProvider(provider, memory=memory, disk=disk)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import EMBEDDINGS_MICROBATCH_MAX_ITEMS, EMBEDDINGS_MICROBATCH_WAIT_MS
+from app.embedding.base import EmbeddingProvider
+
+
+# Histogram upper bounds (inclusive); the last bucket is open-ended.
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_DELAY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class _Histogram:
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.n += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        labels = [f"le_{b:g}" for b in self.bounds] + ["inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.n,
+            "sum": self.total,
+        }
+
+
+class MicroBatchingProvider(EmbeddingProvider):
+    """
+    Coalesces concurrent aembed() calls into multi-input requests.
+
+    Pending texts are flushed as one inner.aembed_many() call once
+    max_items are queued or max_wait_ms after the first one arrived,
+    whichever comes first; results are fanned back out to the callers.
+    Requests that are already large (>= max_items texts) and the sync
+    embed()/embed_many() path go straight to the inner provider.
+
+    If a coalesced request fails, it is bisected and the halves retried,
+    so one bad input (e.g. over the model's token limit) fails only its
+    own caller. The inner provider already retries transient errors, so
+    a provider outage costs at most 2n - 1 calls for a batch of n.
+    """
+
+    def __init__(self, inner: EmbeddingProvider, *, max_items: int, max_wait_ms: float):
+        self.inner = inner
+        self.max_items = max(1, int(max_items))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = _Histogram(BATCH_SIZE_BUCKETS)
+        self._queue_delay_ms = _Histogram(QUEUE_DELAY_BUCKETS_MS)
+
+    @property
+    def model_name(self) -> str:
+        return self.inner.model_name
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            return {
+                "batch_size": self._batch_sizes.snapshot(),
+                "queue_delay_ms": self._queue_delay_ms.snapshot(),
+                "pending": len(self._pending),
+            }
+
+    # Sync path: callers already batch (compute_batch, worker).
+    def embed(self, text: str) -> List[float]:
+        return self.inner.embed(text)
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_many(texts)
+
+    async def aembed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # State belongs to a loop that is gone (e.g. a previous asyncio.run).
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+
+        fut = loop.create_future()
+        self._pending.append((text, fut, loop.time()))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await fut
+
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) >= self.max_items:
+            return await self.inner.aembed_many(texts)
+        return list(await asyncio.gather(*(self.aembed(t) for t in texts)))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = self._loop.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        now = self._loop.time()
+        with self._stats_lock:
+            self._batch_sizes.observe(len(batch))
+            for _, _, queued_at in batch:
+                self._queue_delay_ms.observe((now - queued_at) * 1000.0)
+
+        await self._resolve(batch)
+
+    async def _resolve(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        # Callers that went away (cancelled) need no retry.
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        try:
+            vectors = await self.inner.aembed_many([t for t, _, _ in batch])
+            if len(vectors) != len(batch):
+                raise RuntimeError("Embedding provider returned wrong number of embeddings")
+        except Exception as e:
+            if len(batch) == 1:
+                fut = batch[0][1]
+                if not fut.done():
+                    fut.set_exception(e)
+                return
+            # Halves one after the other, so an outage isn't hit with a burst.
+            mid = len(batch) // 2
+            await self._resolve(batch[:mid])
+            await self._resolve(batch[mid:])
+            return
+
+        for (_, fut, _), vec in zip(batch, vectors):
+            if not fut.done():
+                fut.set_result(vec)
+
+
+def with_microbatching(provider: EmbeddingProvider) -> EmbeddingProvider:
+    """
+    Wrap provider with the dispatcher configured in config (no-op if disabled).
+    """
+    if EMBEDDINGS_MICROBATCH_MAX_ITEMS <= 1:
+        return provider
+    return MicroBatchingProvider(
+        provider,
+        max_items=EMBEDDINGS_MICROBATCH_MAX_ITEMS,
+        max_wait_ms=EMBEDDINGS_MICROBATCH_WAIT_MS,
+    )
@@ -1,11 +1,55 @@
-from openai import OpenAI
+import asyncio
+from typing import Iterator, List
 
-from app.config import OPENAI_API_KEY, EMBEDDINGS_MODEL
+from openai import AsyncOpenAI, OpenAI
+
+from app.config import (
+    OPENAI_API_KEY,
+    EMBEDDINGS_MODEL,
+    EMBEDDINGS_BATCH_SIZE,
+    EMBEDDINGS_BATCH_MAX_TOKENS,
+)
 from app.embedding.base import EmbeddingProvider
 
 
+def estimate_tokens(text: str) -> int:
+    """
+    Conservative token estimate (~3 chars/token) without a tokenizer dependency.
+    """
+    return len(text) // 3 + 1
+
+
+def chunk_inputs(
+    texts: List[str],
+    *,
+    max_items: int,
+    max_tokens: int,
+) -> Iterator[List[str]]:
+    """
+    Split texts into request-sized chunks bounded by item count and
+    estimated token budget. A single oversized text still gets its own chunk.
+    """
+    chunk: List[str] = []
+    tokens = 0
+    for t in texts:
+        n = estimate_tokens(t)
+        if chunk and (len(chunk) >= max_items or tokens + n > max_tokens):
+            yield chunk
+            chunk, tokens = [], 0
+        chunk.append(t)
+        tokens += n
+    if chunk:
+        yield chunk
+
+
 class OpenAIEmbeddingProvider(EmbeddingProvider):
-    def __init__(self):
+    def __init__(
+        self,
+        *,
+        model: str = EMBEDDINGS_MODEL,
+        batch_size: int = EMBEDDINGS_BATCH_SIZE,
+        batch_max_tokens: int = EMBEDDINGS_BATCH_MAX_TOKENS,
+    ):
         if not OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY is not set")
 
@@ -13,18 +57,80 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
             api_key=OPENAI_API_KEY,
             timeout=20.0,
         )
+        self.aclient = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=20.0,
+        )
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.batch_max_tokens = max(1, batch_max_tokens)
 
     @property
     def model_name(self) -> str:
-        return EMBEDDINGS_MODEL
+        return self.model
 
     def embed(self, text: str) -> list[float]:
         try:
             resp = self.client.embeddings.create(
-                model=EMBEDDINGS_MODEL,
+                model=self.model,
+                input=text,
+            )
+            return list(resp.data[0].embedding)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI embedding failed: {e}") from e
+
+    def _chunks(self, texts: List[str]) -> List[List[str]]:
+        return list(
+            chunk_inputs(
+                texts,
+                max_items=self.batch_size,
+                max_tokens=self.batch_max_tokens,
+            )
+        )
+
+    @staticmethod
+    def _vectors(resp, chunk: List[str]) -> List[List[float]]:
+        data = sorted(resp.data, key=lambda d: d.index)
+        if len(data) != len(chunk):
+            raise RuntimeError(
+                f"OpenAI embedding returned {len(data)} vectors for {len(chunk)} inputs"
+            )
+        return [list(d.embedding) for d in data]
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        out: List[List[float]] = []
+        for chunk in self._chunks(texts):
+            try:
+                resp = self.client.embeddings.create(
+                    model=self.model,
+                    input=chunk,
+                )
+            except Exception as e:
+                raise RuntimeError(f"OpenAI embedding failed: {e}") from e
+            out.extend(self._vectors(resp, chunk))
+        return out
+
+    async def aembed(self, text: str) -> List[float]:
+        try:
+            resp = await self.aclient.embeddings.create(
+                model=self.model,
                 input=text,
             )
             return list(resp.data[0].embedding)
         except Exception as e:
             raise RuntimeError(f"OpenAI embedding failed: {e}") from e
 
+    async def _aembed_chunk(self, chunk: List[str]) -> List[List[float]]:
+        try:
+            resp = await self.aclient.embeddings.create(
+                model=self.model,
+                input=chunk,
+            )
+        except Exception as e:
+            raise RuntimeError(f"OpenAI embedding failed: {e}") from e
+        return self._vectors(resp, chunk)
+
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        # Chunks are independent requests, so send them concurrently.
+        results = await asyncio.gather(*(self._aembed_chunk(c) for c in self._chunks(texts)))
+        return [vec for chunk in results for vec in chunk]
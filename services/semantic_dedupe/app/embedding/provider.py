@@ -1,4 +1,6 @@
 from app.config import EMBEDDINGS_PROVIDER
+from app.embedding.cache import with_cache
+from app.embedding.microbatch import with_microbatching
 from app.embedding.openai_provider import OpenAIEmbeddingProvider
 from app.embedding.stub_provider import StubEmbeddingProvider
 
@@ -13,10 +15,10 @@ def get_embedding_provider():
         return _provider
 
     if EMBEDDINGS_PROVIDER == "stub":
-        _provider = StubEmbeddingProvider()
+        _provider = with_cache(StubEmbeddingProvider())
         return _provider
 
     # default
-    _provider = OpenAIEmbeddingProvider()
+    _provider = with_cache(with_microbatching(OpenAIEmbeddingProvider()))
     return _provider
 
@@ -23,3 +23,12 @@ class StubEmbeddingProvider(EmbeddingProvider):
         rng = random.Random(seed)
         return [rng.random() for _ in range(self._dims)]
 
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed(t) for t in texts]
+
+    # Cheap and local: no need to leave the event loop.
+    async def aembed(self, text: str) -> list[float]:
+        return self.embed(text)
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_many(texts)
@@ -0,0 +1,448 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import random
+import tempfile
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.config import EMBEDDINGS_MODEL, HNSW_COMPACT_RATIO, HNSW_SAVE_EVERY
+from app.vector_index import VectorIndex
+
+# Saved params layout; 2 = synced watermark is an embedding_seq.
+_FORMAT = 2
+
+
+class HNSWIndex(VectorIndex):
+    """
+    Hierarchical Navigable Small World graph (Malkov & Yashunin) over
+    unit-normalized float32 vectors, scored by inner product.
+
+    - incremental insert (add) as new claims arrive
+    - M / ef_construction / ef_search are configurable
+    - discard() leaves a tombstone: the node still routes searches but is
+      never returned; maintain() rebuilds the graph without them once they
+      exceed HNSW_COMPACT_RATIO of the nodes
+    - save()/load() persist the graph to a single .npz file (maintain()
+      checkpoints every HNSW_SAVE_EVERY inserts, off the insert path); a
+      loaded index
+      resumes sync() from the embedding_seq it was saved at, and records
+      the embedding model its vectors came from
+    """
+
+    def __init__(
+        self,
+        *,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        seed: int = 0,
+        path: Optional[str] = None,
+        initial_capacity: int = 1024,
+        model: str = EMBEDDINGS_MODEL,
+    ):
+        super().__init__()
+        self.model = model
+        self.M = max(2, int(M))
+        self.M0 = 2 * self.M
+        self.ef_construction = max(self.M, int(ef_construction))
+        self.ef_search = max(1, int(ef_search))
+        self.path = path
+
+        self._mL = 1.0 / math.log(self.M)
+        self._rng = random.Random(seed)
+        self._initial_capacity = max(1, int(initial_capacity))
+
+        self._dims: Optional[int] = None
+        self._size = 0
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._row_of: Dict[int, int] = {}
+        self._levels: List[int] = []
+        # _links[row][level] -> neighbour rows
+        self._links: List[List[List[int]]] = []
+        self._deleted: Set[int] = set()
+        self._entry: Optional[int] = None
+        self._max_level = -1
+        self._unsaved = 0
+        # (claim_id, vector or None for a discard) while compact() rebuilds
+        self._journal: Optional[List[Tuple[int, Optional[np.ndarray]]]] = None
+
+    def __len__(self) -> int:
+        return self._size - len(self._deleted)
+
+    def __contains__(self, claim_id: int) -> bool:
+        return int(claim_id) in self._row_of
+
+    # ---------------------------------------------------------------
+    # Graph primitives
+    # ---------------------------------------------------------------
+
+    def _reserve(self, n: int) -> None:
+        capacity = self._vectors.shape[0]
+        if n <= capacity:
+            return
+        new_capacity = max(capacity * 2, self._initial_capacity, n)
+        vectors = np.zeros((new_capacity, self._dims), dtype=np.float32)
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        if self._size:
+            vectors[: self._size] = self._vectors[: self._size]
+            ids[: self._size] = self._ids[: self._size]
+        self._vectors = vectors
+        self._ids = ids
+
+    def _search_layer(
+        self,
+        q: np.ndarray,
+        entry_points: Sequence[int],
+        ef: int,
+        level: int,
+    ) -> List[Tuple[float, int]]:
+        """
+        Best-first search on one layer. Returns up to ef (similarity, row)
+        pairs, best first.
+        """
+        visited = set(entry_points)
+        sims = (self._vectors[list(entry_points)] @ q).tolist()
+
+        candidates = [(-s, r) for s, r in zip(sims, entry_points)]
+        heapq.heapify(candidates)
+        results = [(s, r) for s, r in zip(sims, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_s, row = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_s < results[0][0]:
+                break
+
+            links = self._links[row]
+            if level >= len(links):
+                continue
+            fresh = [n for n in links[level] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+
+            for s, n in zip((self._vectors[fresh] @ q).tolist(), fresh):
+                if len(results) < ef or s > results[0][0]:
+                    heapq.heappush(candidates, (-s, n))
+                    heapq.heappush(results, (s, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        Neighbour selection heuristic: keep a candidate only if it is closer
+        to the new node than to any neighbour already kept, then top up with
+        the best pruned candidates. Keeps the graph navigable across
+        clusters of near-duplicates.
+        """
+        if len(candidates) <= m:
+            return [r for _, r in candidates]
+
+        kept: List[int] = []
+        pruned: List[int] = []
+        for s, r in candidates:
+            if len(kept) >= m:
+                break
+            if kept and float(np.max(self._vectors[kept] @ self._vectors[r])) > s:
+                pruned.append(r)
+            else:
+                kept.append(r)
+
+        for r in pruned:
+            if len(kept) >= m:
+                break
+            kept.append(r)
+        return kept
+
+    def _shrink(self, row: int, level: int, m: int) -> None:
+        links = self._links[row][level]
+        sims = self._vectors[links] @ self._vectors[row]
+        order = np.argsort(-sims, kind="stable")
+        self._links[row][level] = self._select_neighbors(
+            [(float(sims[i]), links[i]) for i in order],
+            m,
+        )
+
+    def _descend(self, q: np.ndarray, down_to: int) -> List[int]:
+        ep = [self._entry]
+        for level in range(self._max_level, down_to, -1):
+            ep = [self._search_layer(q, ep, 1, level)[0][1]]
+        return ep
+
+    # ---------------------------------------------------------------
+    # VectorIndex interface
+    # ---------------------------------------------------------------
+
+    def add(self, claim_id: int, embedding: Sequence[float]) -> bool:
+        claim_id = int(claim_id)
+        vec = np.asarray(embedding, dtype=np.float32)
+
+        with self._lock:
+            if claim_id in self._row_of:
+                return False
+            if self._dims is None:
+                self._dims = int(vec.shape[0])
+            if vec.ndim != 1 or vec.shape[0] != self._dims:
+                return False
+
+            norm = float(np.linalg.norm(vec))
+            if norm > 0.0:
+                vec = vec / norm
+
+            self._reserve(self._size + 1)
+            row = self._size
+            self._vectors[row] = vec
+            self._ids[row] = claim_id
+            self._row_of[claim_id] = row
+            self._size += 1
+
+            level = int(-math.log(1.0 - self._rng.random()) * self._mL)
+            self._levels.append(level)
+            self._links.append([[] for _ in range(level + 1)])
+
+            if self._entry is None:
+                self._entry = row
+                self._max_level = level
+            else:
+                ep = self._descend(vec, level)
+                for lvl in range(min(level, self._max_level), -1, -1):
+                    found = self._search_layer(vec, ep, self.ef_construction, lvl)
+                    neighbors = self._select_neighbors(found, self.M)
+                    self._links[row][lvl] = neighbors
+
+                    m_max = self.M0 if lvl == 0 else self.M
+                    for n in neighbors:
+                        self._links[n][lvl].append(row)
+                        if len(self._links[n][lvl]) > m_max:
+                            self._shrink(n, lvl, m_max)
+
+                    ep = [r for _, r in found]
+
+                if level > self._max_level:
+                    self._entry = row
+                    self._max_level = level
+
+            self._unsaved += 1
+            if self._journal is not None:
+                self._journal.append((claim_id, vec))
+            return True
+
+    def discard(self, claim_ids: Iterable[int]) -> int:
+        removed = 0
+        with self._lock:
+            for claim_id in claim_ids:
+                row = self._row_of.pop(int(claim_id), None)
+                if row is not None:
+                    self._deleted.add(row)
+                    removed += 1
+                    if self._journal is not None:
+                        self._journal.append((int(claim_id), None))
+        return removed
+
+    # ---------------------------------------------------------------
+    # Maintenance (background task / worker idle loop)
+    # ---------------------------------------------------------------
+
+    def maintain(self) -> None:
+        """
+        Compact if tombstones exceed HNSW_COMPACT_RATIO, then checkpoint if
+        HNSW_SAVE_EVERY inserts are unsaved. Slow; never called from the
+        request path.
+        """
+        if self._size and len(self._deleted) > HNSW_COMPACT_RATIO * self._size:
+            self.compact()
+        if self.path and HNSW_SAVE_EVERY > 0 and self._unsaved >= HNSW_SAVE_EVERY:
+            self.save()
+
+    def compact(self) -> None:
+        """
+        Rebuild the graph from the live rows, dropping tombstones.
+
+        The new graph is built without holding the lock, so searches and
+        inserts continue meanwhile; changes made during the rebuild are
+        journaled and replayed before the swap.
+        """
+        with self._lock:
+            if self._journal is not None:
+                return
+            rows = sorted(self._row_of.values())
+            ids = self._ids[rows].copy()
+            vectors = self._vectors[rows].copy()
+            self._journal = []
+
+        try:
+            fresh = HNSWIndex(
+                M=self.M,
+                ef_construction=self.ef_construction,
+                ef_search=self.ef_search,
+                initial_capacity=max(len(rows), 1),
+                model=self.model,
+            )
+            for cid, vec in zip(ids.tolist(), vectors):
+                fresh.add(cid, vec)
+
+            with self._lock:
+                for cid, vec in self._journal:
+                    if vec is None:
+                        fresh.discard([cid])
+                    else:
+                        fresh.add(cid, vec)
+                for name in (
+                    "_dims", "_size", "_vectors", "_ids", "_row_of", "_levels",
+                    "_links", "_deleted", "_entry", "_max_level",
+                ):
+                    setattr(self, name, getattr(fresh, name))
+                self._unsaved = max(self._unsaved, 1)
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def search_many(
+        self,
+        queries: Sequence[Sequence[float]],
+        top_k: int,
+        *,
+        excludes: Optional[Sequence[Iterable[int]]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        if not len(queries):
+            return []
+        if excludes is None:
+            excludes = [()] * len(queries)
+
+        Q = np.asarray(queries, dtype=np.float32)
+
+        with self._lock:
+            if top_k <= 0 or self._entry is None or Q.ndim != 2 or Q.shape[1] != self._dims:
+                return [[] for _ in range(len(Q))]
+
+            out: List[List[Tuple[int, float]]] = []
+            for q, exclude in zip(Q, excludes):
+                qn = float(np.linalg.norm(q))
+                if qn == 0.0:
+                    out.append([])
+                    continue
+                q = q / qn
+
+                hidden = {self._row_of[c] for c in map(int, exclude) if c in self._row_of}
+                # Widen the beam by the expected share of tombstones in it,
+                # at most 2x: maintain() compacts before they pile up.
+                ef = max(self.ef_search, top_k + len(hidden))
+                live = 1.0 - len(self._deleted) / self._size
+                ef = min(int(math.ceil(ef / max(live, 0.5))), 2 * ef)
+                hidden |= self._deleted
+
+                found = self._search_layer(q, self._descend(q, 0), ef, 0)
+                out.append(
+                    [
+                        (int(self._ids[r]), float(s))
+                        for s, r in found
+                        if r not in hidden
+                    ][:top_k]
+                )
+            return out
+
+    # ---------------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------------
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            return
+
+        # Snapshot under the lock, write without it.
+        with self._lock:
+            counts: List[int] = []
+            targets: List[int] = []
+            for links in self._links:
+                for level_links in links:
+                    counts.append(len(level_links))
+                    targets.extend(level_links)
+
+            arrays = dict(
+                params=np.array(
+                    [self.M, self.ef_construction, self.ef_search, self._dims or 0,
+                     -1 if self._entry is None else self._entry, self._max_level,
+                     self._synced_through, _FORMAT],
+                    dtype=np.int64,
+                ),
+                vectors=self._vectors[: self._size].copy(),
+                ids=self._ids[: self._size].copy(),
+                levels=np.asarray(self._levels, dtype=np.int32),
+                link_counts=np.asarray(counts, dtype=np.int32),
+                link_targets=np.asarray(targets, dtype=np.int32),
+                deleted=np.asarray(sorted(self._deleted), dtype=np.int64),
+                model=np.asarray(self.model),
+            )
+            unsaved = self._unsaved
+
+        # Unique temp file in the target directory, so concurrent savers
+        # (processes sharing HNSW_INDEX_PATH) never interleave writes.
+        fd, tmp = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)),
+            prefix=f"{os.path.basename(path)}.",
+            suffix=".tmp",
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        with self._lock:
+            self._unsaved = max(0, self._unsaved - unsaved)
+
+    @classmethod
+    def load(cls, path: str) -> "HNSWIndex":
+        data = np.load(path)
+        params = [int(x) for x in data["params"]]
+        M, ef_construction, ef_search, dims, entry, max_level, synced = params[:7]
+        if len(params) < 8:
+            # Saved before embedding_seq: the watermark was a claim_id.
+            # Re-sync from the start; rows already in the graph are skipped.
+            synced = 0
+
+        # Files saved before the model was recorded load with model "".
+        model = str(data["model"]) if "model" in data.files else ""
+        index = cls(M=M, ef_construction=ef_construction, ef_search=ef_search, path=path, model=model)
+        vectors = data["vectors"]
+        n = int(vectors.shape[0])
+
+        index._dims = dims or None
+        index._size = n
+        index._vectors = np.array(vectors, dtype=np.float32)
+        index._ids = np.array(data["ids"], dtype=np.int64)
+        index._levels = [int(x) for x in data["levels"]]
+        index._deleted = {int(x) for x in data["deleted"]}
+        index._row_of = {
+            int(cid): row for row, cid in enumerate(index._ids[:n]) if row not in index._deleted
+        }
+        index._entry = None if entry < 0 else entry
+        index._max_level = max_level
+        index._synced_through = synced
+
+        counts = data["link_counts"].tolist()
+        targets = data["link_targets"].tolist()
+        pos = 0
+        k = 0
+        for level in index._levels:
+            links: List[List[int]] = []
+            for _ in range(level + 1):
+                c = counts[k]
+                links.append(targets[pos:pos + c])
+                pos += c
+                k += 1
+            index._links.append(links)
+
+        return index
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.db import _is_sqlite
+
+
+# -------------------------------------------------------------------
+# claim_embedding_job queue (0010_embedding_jobs.sql)
+# -------------------------------------------------------------------
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_job(db: Session, *, claim_text: str, top_k: int) -> int:
+    """
+    Record a duplicate check to be processed by a worker. Commits.
+    """
+    row = db.execute(
+        text(
+            """
+            INSERT INTO claim_embedding_job (claim_text, top_k)
+            VALUES (:t, :k)
+            RETURNING job_id
+            """
+        ),
+        {"t": claim_text, "k": top_k},
+    ).fetchone()
+    db.commit()
+    return int(row[0])
+
+
+def claim_jobs(
+    db: Session,
+    *,
+    limit: int,
+    lease_seconds: int,
+    max_attempts: int,
+) -> List[Dict[str, Any]]:
+    """
+    Lease up to limit jobs for this worker: queued jobs, plus 'running'
+    jobs whose lease expired (their worker died). Commits, so the lease is
+    visible to other workers while the batch is processed.
+
+    On Postgres concurrent workers skip each other's rows via
+    FOR UPDATE SKIP LOCKED instead of blocking on them.
+    """
+    now = _now()
+    stale_before = now - timedelta(seconds=lease_seconds)
+
+    # Jobs that keep killing their worker would otherwise be leased forever.
+    db.execute(
+        text(
+            """
+            UPDATE claim_embedding_job
+            SET status = 'failed', error = 'lease expired', updated_tms = :now
+            WHERE status = 'running'
+              AND locked_tms < :stale_before
+              AND attempts >= :max_attempts
+            """
+        ),
+        {"now": now, "stale_before": stale_before, "max_attempts": max_attempts},
+    )
+
+    lock = "" if _is_sqlite(db) else "FOR UPDATE SKIP LOCKED"
+    rows = db.execute(
+        text(
+            f"""
+            UPDATE claim_embedding_job
+            SET status = 'running',
+                attempts = attempts + 1,
+                locked_tms = :now,
+                updated_tms = :now
+            WHERE job_id IN (
+              SELECT job_id
+              FROM claim_embedding_job
+              WHERE status = 'queued'
+                 OR (status = 'running' AND locked_tms < :stale_before)
+              ORDER BY job_id
+              LIMIT :limit
+              {lock}
+            )
+            RETURNING job_id, claim_text, top_k, attempts
+            """
+        ),
+        {"now": now, "stale_before": stale_before, "limit": limit},
+    ).fetchall()
+    db.commit()
+
+    return sorted(
+        (
+            {"job_id": int(r[0]), "claim_text": r[1], "top_k": int(r[2]), "attempts": int(r[3])}
+            for r in rows
+        ),
+        key=lambda j: j["job_id"],
+    )
+
+
+def complete_jobs(db: Session, results: Sequence[Dict[str, Any]]) -> None:
+    """
+    Store results: [{"job_id", "result"}] where result is the
+    /claims/check-duplicate payload. Commits.
+    """
+    if not results:
+        return
+
+    result_sql = ":result" if _is_sqlite(db) else "CAST(:result AS JSONB)"
+    now = _now()
+    db.execute(
+        text(
+            f"""
+            UPDATE claim_embedding_job
+            SET status = 'done',
+                claim_id = :claim_id,
+                result = {result_sql},
+                error = NULL,
+                updated_tms = :now
+            WHERE job_id = :job_id
+            """
+        ),
+        [
+            {
+                "job_id": r["job_id"],
+                "claim_id": r["result"]["claim_id"],
+                "result": json.dumps(r["result"]),
+                "now": now,
+            }
+            for r in results
+        ],
+    )
+    db.commit()
+
+
+def fail_jobs(db: Session, job_ids: Sequence[int], error: str, *, max_attempts: int) -> None:
+    """
+    Requeue jobs for another attempt, or mark them failed once they have
+    used max_attempts. Commits.
+    """
+    if not job_ids:
+        return
+
+    db.execute(
+        text(
+            """
+            UPDATE claim_embedding_job
+            SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END,
+                error = :error,
+                locked_tms = NULL,
+                updated_tms = :now
+            WHERE job_id IN :ids
+            """
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(job_ids), "error": error, "max_attempts": max_attempts, "now": _now()},
+    )
+    db.commit()
+
+
+def fetch_job(db: Session, job_id: int) -> Optional[Dict[str, Any]]:
+    row = db.execute(
+        text(
+            """
+            SELECT job_id, status, attempts, claim_id, result, error
+            FROM claim_embedding_job
+            WHERE job_id = :id
+            """
+        ),
+        {"id": job_id},
+    ).fetchone()
+    if not row:
+        return None
+
+    result = row[4]
+    if isinstance(result, str):
+        result = json.loads(result)
+
+    return {
+        "job_id": int(row[0]),
+        "status": row[1],
+        "attempts": int(row[2]),
+        "claim_id": int(row[3]) if row[3] is not None else None,
+        "result": result,
+        "error": row[5],
+    }
@@ -0,0 +1,189 @@
+"""
+Lexical near-duplicate detection for the LEXICAL_PREFILTER path
+(0015_claim_minhash.sql).
+
+Text is normalized like content_hash (normalize_text) and split into
+overlapping character shingles, so a typo, an inserted "the" or swapped
+words only change the shingles around the edit.
+
+Candidates come from MinHash LSH: the NUM_PERM-slot signature is cut into
+BANDS bands of ROWS slots, each hashed to a bucket, and claims sharing any
+bucket are candidates (pairs at Jaccard 0.9 collide with probability
+> 0.999, pairs at 0.5 with ~0.06). Candidates are then verified with the
+exact shingle Jaccard, since the MinHash estimate is too noisy (+-0.03 at
+128 slots) near the threshold.
+
+Lexical similarity cannot see meaning, so two texts whose negation words
+or numbers differ are never similar ("is safe" / "is not safe",
+"rose 5%" / "rose 6%"). Beyond that, the words themselves must match up
+to reordering and a budget of TOKEN_EDIT_BUDGET small edits (a
+one-character typo in a word of 4+ letters, an added or dropped article):
+a single substituted word ("increased" / "decreased") changes few
+shingles of a long claim but is never a near-duplicate.
+
+Because one edit costs a short claim more shingles, in proportion, than a
+long one, match() scales the Jaccard threshold with the claim's length.
+
+Signature parameters are part of the stored data: changing them requires
+python -m app.lexical_backfill --rebuild.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from typing import FrozenSet, List, Optional, Set
+
+import numpy as np
+
+from app.hashing import normalize_text
+
+SHINGLE_CHARS = 3
+NUM_PERM = 128
+TOKEN_EDIT_BUDGET = 2
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Universal hashing (a * x + b) mod P over 32-bit shingle hashes. P is a
+# prime above 2^32, and a * x + b stays below 2^64.
+_P = np.uint64(4294967311)
+
+_NEGATIONS = frozenset(
+    """
+    not no never nor none nobody nothing neither nowhere without cannot
+    cant dont doesnt didnt isnt arent wasnt werent wont wouldnt shouldnt
+    couldnt hasnt havent hadnt aint
+    """.split()
+)
+
+_ARTICLES = frozenset(("a", "an", "the"))
+
+
+def _coefficients(name: str) -> np.ndarray:
+    return np.array(
+        [
+            int.from_bytes(hashlib.blake2b(f"{name}{i}".encode(), digest_size=4).digest(), "big") or 1
+            for i in range(NUM_PERM)
+        ],
+        dtype=np.uint64,
+    )
+
+
+_A = _coefficients("minhash-a-")
+_B = _coefficients("minhash-b-")
+
+
+def shingles(text: str) -> Set[str]:
+    normalized = normalize_text(text)
+    if len(normalized) <= SHINGLE_CHARS:
+        return {normalized}
+    return {normalized[i : i + SHINGLE_CHARS] for i in range(len(normalized) - SHINGLE_CHARS + 1)}
+
+
+def minhash(text: str) -> np.ndarray:
+    """
+    NUM_PERM-slot MinHash signature (uint32) of text's shingle set.
+    """
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+            for s in shingles(text)
+        ),
+        dtype=np.uint64,
+    )
+    slots = (np.outer(_A, hashes) + _B[:, None]) % _P
+    return slots.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(text: str) -> List[int]:
+    """
+    One signed 64-bit LSH bucket key per band of text's signature. The band
+    index is part of the key, so all bands share one index.
+    """
+    sig = minhash(text).astype("<u4")
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + sig[band * ROWS : (band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            "big",
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def _meaning_tokens(text: str) -> FrozenSet[str]:
+    return frozenset(
+        w for w in normalize_text(text).split() if w in _NEGATIONS or any(c.isdigit() for c in w)
+    )
+
+
+def _is_typo(a: str, b: str) -> bool:
+    """
+    a and b (4+ letters) are one substitution, insertion, deletion or
+    adjacent transposition apart.
+    """
+    if min(len(a), len(b)) < 4 or abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+    return (a[i + 1:] == b[i:]) if len(a) > len(b) else (a[i:] == b[i + 1:])
+
+
+def token_edits(a: str, b: str) -> Optional[int]:
+    """
+    Small edits (typos, added or dropped articles) that turn a's words into
+    b's, ignoring word order; None if any other word differs or the edits
+    exceed TOKEN_EDIT_BUDGET.
+    """
+    wa, wb = Counter(normalize_text(a).split()), Counter(normalize_text(b).split())
+    only_a, only_b = list((wa - wb).elements()), list((wb - wa).elements())
+
+    edits = sum(w in _ARTICLES for w in only_a) + sum(w in _ARTICLES for w in only_b)
+    only_b = [w for w in only_b if w not in _ARTICLES]
+    for w in only_a:
+        if w in _ARTICLES:
+            continue
+        typo = next((j for j, v in enumerate(only_b) if _is_typo(w, v)), None)
+        if typo is None:
+            return None
+        del only_b[typo]
+        edits += 1
+    if only_b or edits > TOKEN_EDIT_BUDGET:
+        return None
+    return edits
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    Exact shingle Jaccard of a and b; 0.0 if their negation words or
+    numbers differ, or their words differ by more than token_edits()
+    allows.
+    """
+    if _meaning_tokens(a) != _meaning_tokens(b) or token_edits(a, b) is None:
+        return 0.0
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb) if sa or sb else 1.0
+
+
+def match(a: str, b: str, min_similarity: float) -> float:
+    """
+    similarity(a, b) if b is a near-duplicate of a, else 0.0.
+
+    The threshold is min_similarity, lowered for short texts to what the
+    allowed edits can cost: one edit changes up to SHINGLE_CHARS shingles,
+    so with n shingles and e edits the Jaccard can drop to
+    (n - SHINGLE_CHARS * e) / (n + SHINGLE_CHARS * e). A pure reordering
+    (e = 0) must still reach min_similarity.
+    """
+    edits = token_edits(a, b)
+    if edits is None or _meaning_tokens(a) != _meaning_tokens(b):
+        return 0.0
+    sa, sb = shingles(a), shingles(b)
+    sim = len(sa & sb) / len(sa | sb) if sa or sb else 1.0
+
+    n = min(len(sa), len(sb))
+    cost = SHINGLE_CHARS * edits
+    floor = (n - cost) / (n + cost) if edits else min_similarity
+    return sim if sim >= min(min_similarity, floor) else 0.0
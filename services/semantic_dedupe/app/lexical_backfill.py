@@ -0,0 +1,84 @@
+"""
+Backfill MinHash LSH buckets (claim_minhash_band, see
+0015_claim_minhash.sql) for claims stored before LEXICAL_PREFILTER was
+enabled.
+
+Runs in small keyset-paginated batches, each in its own short transaction,
+so it is safe to run against a live database and to interrupt/resume.
+--rebuild first deletes every bucket (needed after changing the
+signature parameters in app/lexical.py).
+
+Usage:
+  python -m app.lexical_backfill [--batch-size 1000] [--rebuild]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db import _get_session_factory, insert_minhash_buckets
+
+
+def backfill_batch(db: Session, *, after: int, batch_size: int) -> list[int]:
+    """
+    Bucket the next batch of claims with claim_id > after that have an
+    embedding but no buckets. Returns the claim_ids bucketed (empty when
+    done).
+    """
+    rows = db.execute(
+        text(
+            """
+            SELECT c.claim_id, c.claim_text
+            FROM claim c
+            JOIN claim_embedding e ON e.claim_id = c.claim_id
+            WHERE c.claim_id > :after
+              AND NOT EXISTS (SELECT 1 FROM claim_minhash_band b WHERE b.claim_id = c.claim_id)
+            ORDER BY c.claim_id
+            LIMIT :batch_size
+            """
+        ),
+        {"after": after, "batch_size": batch_size},
+    ).fetchall()
+    insert_minhash_buckets(db, [(int(cid), str(t)) for cid, t in rows])
+    db.commit()
+    return [int(r[0]) for r in rows]
+
+
+def run(*, batch_size: int, rebuild: bool) -> int:
+    SessionLocal = _get_session_factory()
+    total = 0
+    after = 0
+    t0 = time.time()
+
+    with SessionLocal() as db:
+        if rebuild:
+            db.execute(text("DELETE FROM claim_minhash_band"))
+            db.commit()
+
+        while True:
+            ids = backfill_batch(db, after=after, batch_size=batch_size)
+            if not ids:
+                break
+            after = max(ids)
+            total += len(ids)
+            rate = total / max(time.time() - t0, 1e-9)
+            print(f"bucketed {total} claims (last claim_id={after}, {rate:.0f} claims/s)", flush=True)
+
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    total = run(batch_size=args.batch_size, rebuild=args.rebuild)
+    print(f"done: {total} claims bucketed")
+
+
+if __name__ == "__main__":
+    main()
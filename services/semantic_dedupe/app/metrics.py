@@ -0,0 +1,291 @@
+"""
+Prometheus metrics, served at GET /metrics.
+
+Per-stage latency is observed inline with stage(); request latency and
+in-flight requests by RequestMetricsMiddleware. Counters the
+service already keeps in-process (embedding cache, cluster cache,
+single-flight, micro-batcher) and the DB pools are read at scrape time by
+PipelineCollector instead of being mirrored.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+# Stages run from sub-millisecond cache/index reads to multi-second
+# embeddings API calls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "semantic_dedupe_stage_seconds",
+    "Time spent in each dedupe pipeline stage.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "semantic_dedupe_stage_errors",
+    "Pipeline stages that raised; stage=embed counts embedding provider errors.",
+    ["stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "semantic_dedupe_request_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "semantic_dedupe_requests_in_flight",
+    "HTTP requests currently being handled.",
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Observe the enclosed block in semantic_dedupe_stage_seconds{stage=name}
+    and count it in semantic_dedupe_stage_errors if it raises. Usable
+    around awaits; cancellation is timed but not counted as an error.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(name).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - t0)
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    if route is None:
+        # Plain starlette Routes (raw ASGI endpoints) only set "endpoint"
+        endpoint = scope.get("endpoint")
+        router = getattr(scope.get("app"), "router", None)
+        for candidate in getattr(router, "routes", ()):
+            if endpoint is not None and getattr(candidate, "endpoint", None) is endpoint:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware for semantic_dedupe_requests_in_flight and
+    semantic_dedupe_request_seconds. A request finishes when its last body
+    message (more_body=False) has been sent, or when the app returns or
+    raises without one, so streaming responses are counted and timed for
+    their whole duration. receive is passed through untouched.
+    """
+
+    def __init__(self, app: Callable[..., Any], *, skip_paths: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        status = 500
+        finished = False
+
+        def finish() -> None:
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            IN_FLIGHT.dec()
+            REQUEST_SECONDS.labels(scope["method"], _route_template(scope), str(status)).observe(
+                time.perf_counter() - t0
+            )
+
+        async def observed_send(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            try:
+                await send(message)
+            finally:
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    finish()
+
+        try:
+            await self.app(scope, receive, observed_send)
+        finally:
+            finish()
+
+
+# ---------------------------------------------------------------------
+# Scrape-time collector
+# ---------------------------------------------------------------------
+
+def _cumulative(snapshot: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """
+    microbatch._Histogram snapshot (per-bucket counts, le_<bound>... inf)
+    -> Prometheus cumulative buckets.
+    """
+    out, total = [], 0
+    for label, n in snapshot["buckets"].items():
+        total += n
+        out.append(("+Inf" if label == "inf" else label[len("le_"):], total))
+    return out
+
+
+class PipelineCollector:
+    """
+    Reads the in-process stats at scrape time. get_embedder returns the
+    current (outermost) embedding provider; flights maps a name to each
+    SingleFlight instance.
+    """
+
+    def __init__(self, get_embedder: Callable[[], Any], flights: Dict[str, Any]):
+        self.get_embedder = get_embedder
+        self.flights = flights
+
+    def collect(self):
+        yield from self._embedding()
+        yield from self._cluster_cache()
+        yield from self._singleflight()
+        yield from self._pools()
+
+    def _embedding(self):
+        cache = CounterMetricFamily(
+            "semantic_dedupe_embedding_cache_lookups",
+            "Embedding cache lookups by result (memory_hits, disk_hits, misses).",
+            labels=["result"],
+        )
+        pending = GaugeMetricFamily(
+            "semantic_dedupe_embedding_microbatch_pending",
+            "aembed() calls waiting for the next micro-batch.",
+        )
+        families: List[Any] = []
+
+        provider = self.get_embedder()
+        while provider is not None:
+            stats = getattr(provider, "stats", None)
+            if stats is not None:
+                s = stats()
+                if "misses" in s:
+                    for result, n in s.items():
+                        cache.add_metric([result], n)
+                if "batch_size" in s:
+                    pending.add_metric([], s["pending"])
+                    for name, key, help_ in (
+                        ("semantic_dedupe_embedding_microbatch_size", "batch_size", "Inputs per micro-batch."),
+                        (
+                            "semantic_dedupe_embedding_microbatch_queue_delay_ms",
+                            "queue_delay_ms",
+                            "Time an aembed() call waited for its micro-batch (ms).",
+                        ),
+                    ):
+                        h = HistogramMetricFamily(name, help_)
+                        h.add_metric([], _cumulative(s[key]), s[key]["sum"])
+                        families.append(h)
+            provider = getattr(provider, "inner", None)
+
+        yield cache
+        if families:
+            yield pending
+            yield from families
+
+    def _cluster_cache(self):
+        from app.cluster_cache import all_cluster_caches
+
+        lookups = CounterMetricFamily(
+            "semantic_dedupe_cluster_cache_lookups",
+            "Cluster cache lookups by result.",
+            labels=["result"],
+        )
+        entries = GaugeMetricFamily(
+            "semantic_dedupe_cluster_cache_entries",
+            "Cluster cache entries by kind.",
+            labels=["kind"],
+        )
+        totals: Dict[str, int] = {"hits": 0, "misses": 0, "claims": 0, "clusters": 0, "texts": 0}
+        for cache in all_cluster_caches():
+            for k, v in cache.stats().items():
+                totals[k] = totals.get(k, 0) + v
+        for result in ("hits", "misses"):
+            lookups.add_metric([result], totals.pop(result))
+        for kind, n in totals.items():
+            entries.add_metric([kind], n)
+        yield lookups
+        yield entries
+
+    def _singleflight(self):
+        calls = CounterMetricFamily(
+            "semantic_dedupe_singleflight_calls",
+            "Single-flight calls that ran the work (leaders) or shared another's result.",
+            labels=["flight", "role"],
+        )
+        in_flight = GaugeMetricFamily(
+            "semantic_dedupe_singleflight_in_flight",
+            "Keys with work currently in flight.",
+            labels=["flight"],
+        )
+        for name, flight in self.flights.items():
+            s = flight.stats()
+            calls.add_metric([name, "leader"], s["leaders"])
+            calls.add_metric([name, "shared"], s["shared"])
+            in_flight.add_metric([name], s["in_flight"])
+        yield calls
+        yield in_flight
+
+    def _pools(self):
+        from app import db
+
+        checked_out = GaugeMetricFamily(
+            "semantic_dedupe_db_pool_checked_out",
+            "Connections currently checked out of the pool.",
+            labels=["engine"],
+        )
+        size = GaugeMetricFamily(
+            "semantic_dedupe_db_pool_size",
+            "Configured pool size (DB_POOL_SIZE).",
+            labels=["engine"],
+        )
+        overflow = GaugeMetricFamily(
+            "semantic_dedupe_db_pool_overflow",
+            "Connections open beyond the pool size (negative: unopened pool slots).",
+            labels=["engine"],
+        )
+        engines = {
+            "sync": db._engine,
+            "async": db._async_engine.sync_engine if db._async_engine is not None else None,
+        }
+        for name, engine in engines.items():
+            # QueuePool only; SQLite's default pools don't track checkouts.
+            pool = getattr(engine, "pool", None)
+            if pool is None or not hasattr(pool, "checkedout"):
+                continue
+            checked_out.add_metric([name], pool.checkedout())
+            size.add_metric([name], pool.size())
+            overflow.add_metric([name], pool.overflow())
+        yield checked_out
+        yield size
+        yield overflow
+
+
+_collector: Optional[PipelineCollector] = None
+
+
+def register_collector(get_embedder: Callable[[], Any], flights: Dict[str, Any]) -> PipelineCollector:
+    """
+    Register (once per process) the scrape-time collector.
+    """
+    global _collector
+    if _collector is None:
+        _collector = PipelineCollector(get_embedder, flights)
+        REGISTRY.register(_collector)
+    return _collector
+
+
+def render() -> bytes:
+    return generate_latest(REGISTRY)
@@ -0,0 +1,417 @@
+"""
+Rebuild claim_cluster / claim_cluster_member offline from the stored
+embeddings (see 0013_cluster_rebuild.sql).
+
+The online path assigns each claim once, greedily, to the cluster of its
+best match at check time, so the result depends on arrival order. This job
+recomputes the whole layout instead:
+
+  1. load every active-model embedding (keyset pagination, or the local
+     segment store with --from-store) into one float32 matrix, optionally
+     truncated to --dims leading components and re-normalized
+  2. link every pair with cosine >= --threshold using blocked upper-
+     triangular matrix products (memory bounded by --block-rows^2)
+  3. clusters = connected components (vectorized union-find)
+  4. canonical = medoid, the member most similar to the rest
+  5. write the layout to the staged tables, then swap it in with a
+     single transaction and bump claim_cluster_epoch
+
+Components are single-linkage: a chain of near-duplicates ends up in one
+cluster even when its ends are below the threshold.
+
+Claims clustered by the service after the load keep their cluster
+(re-attached to their old canonical's new cluster). Replicas drop their
+cached topology within CLUSTER_CACHE_EPOCH_CHECK_SECONDS of the swap.
+
+Sizing: 1M x 1024 float32 is 4 GB resident; the pair scan is ~n^2 * D / 2
+multiply-adds, so use --dims to trade precision for time on large corpora.
+
+--centroids-only leaves the layout alone and recomputes the cluster
+centroids used by PGVECTOR_SEARCH_MODE=centroid (0014_cluster_centroids.sql)
+from the member rows, e.g. after promoting a new embedding model.
+
+Usage:
+  python -m app.recluster [--threshold 0.85] [--dims 1024] [--block-rows 4096]
+                          [--from-store] [--dry-run]
+  python -m app.recluster --centroids-only
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.clustering import component_medoids, threshold_components
+from app.config import EMBEDDINGS_MODEL, NEAR_DUPLICATE_THRESHOLD
+from app.db import _get_session_factory, _is_sqlite, decode_embedding, refresh_centroids
+
+# (cluster_key, canonical_claim_id), (claim_id, cluster_key, similarity)
+StagedCluster = Tuple[int, int]
+StagedMember = Tuple[int, int, float]
+
+
+# -------------------------------------------------------------------
+# Load
+# -------------------------------------------------------------------
+
+def _truncate(vectors: np.ndarray, dims: Optional[int]) -> np.ndarray:
+    if dims and dims < vectors.shape[1]:
+        vectors = np.ascontiguousarray(vectors[:, :dims])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+def load_embeddings(
+    db: Session,
+    *,
+    model: str = EMBEDDINGS_MODEL,
+    dims: Optional[int] = None,
+    page_size: int = 5000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (claim_ids, unit vectors) for every claim embedded with model, in
+    claim_id order. Each page is its own short read; nothing is held open
+    between pages.
+    """
+    ids = np.empty(0, dtype=np.int64)
+    matrix: Optional[np.ndarray] = None
+    n = 0
+    after = 0
+    while True:
+        rows = db.execute(
+            text(
+                """
+                SELECT claim_id, embedding
+                FROM claim_embedding
+                WHERE claim_id > :after
+                  AND embedding_model = :model
+                ORDER BY claim_id
+                LIMIT :limit
+                """
+            ),
+            {"after": after, "model": model, "limit": page_size},
+        ).fetchall()
+        db.commit()
+        if not rows:
+            break
+        after = int(rows[-1][0])
+
+        page = [(int(cid), decode_embedding(db, emb)) for cid, emb in rows]
+        page = [(cid, vec) for cid, vec in page if vec]
+        if not page:
+            continue
+        width = min(len(page[0][1]), dims) if dims else len(page[0][1])
+        if matrix is None:
+            matrix = np.empty((max(page_size, len(page)), width), dtype=np.float32)
+            ids = np.empty(len(matrix), dtype=np.int64)
+        while n + len(page) > len(matrix):
+            matrix = np.concatenate([matrix, np.empty_like(matrix)])
+            ids = np.concatenate([ids, np.empty_like(ids)])
+        for i, (cid, vec) in enumerate(page):
+            ids[n + i] = cid
+            matrix[n + i] = vec[:width]
+        n += len(page)
+
+    if matrix is None:
+        return ids, np.empty((0, dims or 0), dtype=np.float32)
+    return ids[:n], _truncate(matrix[:n], dims)
+
+
+def load_from_store(store, db: Session, *, dims: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Same as load_embeddings, from the local segment store (already decoded
+    unit vectors) after catching it up with claim_embedding.
+    """
+    store.reconcile(db)
+    db.commit()
+    blocks = store.blocks()
+    if not blocks:
+        return np.empty(0, dtype=np.int64), np.empty((0, dims or 0), dtype=np.float32)
+    width = min(store.dims, dims) if dims else store.dims
+    ids = np.concatenate([block_ids for block_ids, _ in blocks]).astype(np.int64)
+    vectors = np.concatenate([block[:, :width] for _, block in blocks]).astype(np.float32)
+    # Drop rows superseded by a later row for the same claim
+    live = ids >= 0
+    return ids[live], _truncate(vectors[live], dims)
+
+
+# -------------------------------------------------------------------
+# Cluster
+# -------------------------------------------------------------------
+
+def build_clusters(
+    claim_ids: np.ndarray,
+    vectors: np.ndarray,
+    *,
+    threshold: float,
+    block_rows: int = 4096,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[List[StagedCluster], List[StagedMember]]:
+    """
+    Cluster layout for claim_ids: every claim in exactly one cluster
+    (singletons included, as the service does), keyed by the canonical's
+    claim_id. Member similarity is to the canonical.
+    """
+    if not len(claim_ids):
+        return [], []
+
+    labels = threshold_components(vectors, threshold, block_rows=block_rows, progress=progress)
+    medoids = component_medoids(vectors, labels)
+
+    canonical_row = np.empty(len(claim_ids), dtype=np.int64)
+    for label, row in medoids.items():
+        canonical_row[label] = row
+    member_canonical = canonical_row[labels]
+    sims = np.einsum("ij,ij->i", vectors, vectors[member_canonical])
+
+    canonical_ids = claim_ids[member_canonical]
+    clusters = [(int(claim_ids[row]), int(claim_ids[row])) for row in sorted(medoids.values())]
+    members = [
+        (int(cid), int(key), 1.0 if cid == key else float(min(sim, 1.0)))
+        for cid, key, sim in zip(claim_ids, canonical_ids, sims)
+    ]
+    return clusters, members
+
+
+# -------------------------------------------------------------------
+# Write
+# -------------------------------------------------------------------
+
+def stage(
+    db: Session,
+    clusters: List[StagedCluster],
+    members: List[StagedMember],
+    *,
+    batch_size: int = 10000,
+) -> None:
+    """
+    Replace the staged layout. Committed in batches; the service never
+    reads these tables.
+    """
+    db.execute(text("DELETE FROM claim_cluster_member_staged"))
+    db.execute(text("DELETE FROM claim_cluster_staged"))
+    db.commit()
+
+    for i in range(0, len(clusters), batch_size):
+        db.execute(
+            text("INSERT INTO claim_cluster_staged (cluster_key, canonical_claim_id) VALUES (:k, :c)"),
+            [{"k": k, "c": c} for k, c in clusters[i : i + batch_size]],
+        )
+        db.commit()
+    for i in range(0, len(members), batch_size):
+        db.execute(
+            text(
+                "INSERT INTO claim_cluster_member_staged (claim_id, cluster_key, similarity) "
+                "VALUES (:id, :k, :s)"
+            ),
+            [{"id": cid, "k": k, "s": s} for cid, k, s in members[i : i + batch_size]],
+        )
+        db.commit()
+
+
+def swap(db: Session) -> Dict[str, int]:
+    """
+    Replace claim_cluster / claim_cluster_member with the staged layout in
+    one transaction (readers see the old layout until commit; concurrent
+    assignments wait on the table locks).
+
+    Members the staged layout does not cover (claims clustered after the
+    load) join the new cluster of their old canonical, or keep a cluster
+    around that canonical if it was not covered either.
+    """
+    try:
+        if not _is_sqlite(db):
+            db.execute(text("LOCK TABLE claim_cluster, claim_cluster_member IN SHARE ROW EXCLUSIVE MODE"))
+
+        carried = db.execute(
+            text(
+                """
+                SELECT m.claim_id, m.similarity, c.canonical_claim_id
+                FROM claim_cluster_member m
+                JOIN claim_cluster c ON c.cluster_id = m.cluster_id
+                WHERE NOT EXISTS (
+                  SELECT 1 FROM claim_cluster_member_staged s WHERE s.claim_id = m.claim_id
+                )
+                ORDER BY m.claim_id
+                """
+            )
+        ).fetchall()
+
+        db.execute(text("DELETE FROM claim_cluster_member"))
+        db.execute(text("DELETE FROM claim_cluster"))
+        db.execute(
+            text(
+                """
+                INSERT INTO claim_cluster (canonical_claim_id)
+                SELECT canonical_claim_id FROM claim_cluster_staged ORDER BY cluster_key
+                """
+            )
+        )
+        db.execute(
+            text(
+                """
+                INSERT INTO claim_cluster_member (cluster_id, claim_id, similarity)
+                SELECT c.cluster_id, s.claim_id, s.similarity
+                FROM claim_cluster_member_staged s
+                JOIN claim_cluster_staged k ON k.cluster_key = s.cluster_key
+                JOIN claim_cluster c ON c.canonical_claim_id = k.canonical_claim_id
+                """
+            )
+        )
+
+        if carried:
+            canonicals = sorted({int(r[2]) for r in carried})
+            cluster_of = dict(
+                db.execute(
+                    text(
+                        "SELECT claim_id, cluster_id FROM claim_cluster_member WHERE claim_id IN :ids"
+                    ).bindparams(bindparam("ids", expanding=True)),
+                    {"ids": canonicals},
+                ).fetchall()
+            )
+            for canonical in canonicals:
+                if canonical not in cluster_of:
+                    cluster_of[canonical] = int(
+                        db.execute(
+                            text(
+                                "INSERT INTO claim_cluster (canonical_claim_id) VALUES (:c) RETURNING cluster_id"
+                            ),
+                            {"c": canonical},
+                        ).scalar()
+                    )
+            db.execute(
+                text(
+                    "INSERT INTO claim_cluster_member (cluster_id, claim_id, similarity) VALUES (:k, :id, :s)"
+                ),
+                [
+                    {"k": cluster_of[int(canonical)], "id": int(cid), "s": float(sim)}
+                    for cid, sim, canonical in carried
+                ],
+            )
+
+        # Publish complete centroids with the new layout rather than leaving
+        # every carried member queued for the background fold (0017).
+        refresh_centroids(db)
+
+        epoch = db.execute(
+            text(
+                """
+                UPDATE claim_cluster_epoch
+                SET epoch = epoch + 1, updated_tms = CURRENT_TIMESTAMP
+                RETURNING epoch
+                """
+            )
+        ).scalar()
+        stats = {
+            "clusters": int(db.execute(text("SELECT COUNT(*) FROM claim_cluster")).scalar()),
+            "members": int(db.execute(text("SELECT COUNT(*) FROM claim_cluster_member")).scalar()),
+            "carried": len(carried),
+            "epoch": int(epoch or 0),
+        }
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    db.execute(text("DELETE FROM claim_cluster_member_staged"))
+    db.execute(text("DELETE FROM claim_cluster_staged"))
+    db.commit()
+    return stats
+
+
+# -------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------
+
+def run(
+    db: Session,
+    *,
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+    dims: Optional[int] = None,
+    block_rows: int = 4096,
+    page_size: int = 5000,
+    store=None,
+    dry_run: bool = False,
+    log: Callable[[str], None] = lambda msg: None,
+) -> Dict[str, Any]:
+    t0 = time.time()
+    if store is not None:
+        claim_ids, vectors = load_from_store(store, db, dims=dims)
+    else:
+        claim_ids, vectors = load_embeddings(db, dims=dims, page_size=page_size)
+    log(f"loaded {len(claim_ids)} embeddings ({vectors.shape[1] if vectors.ndim == 2 else 0} dims) "
+        f"in {time.time() - t0:.1f}s")
+
+    t1 = time.time()
+
+    def progress(done: int, total: int) -> None:
+        log(f"scanned {done}/{total} rows ({time.time() - t1:.1f}s)")
+
+    clusters, members = build_clusters(
+        claim_ids, vectors, threshold=threshold, block_rows=block_rows, progress=progress
+    )
+    summary: Dict[str, Any] = {
+        "claims": len(members),
+        "clusters": len(clusters),
+        "multi_member_clusters": len({key for cid, key, _ in members if cid != key}),
+    }
+    log(f"{summary['clusters']} clusters ({summary['multi_member_clusters']} with duplicates) "
+        f"in {time.time() - t1:.1f}s")
+    if dry_run:
+        return summary
+
+    stage(db, clusters, members)
+    summary.update(swap(db))
+    log(f"swapped in {summary['clusters']} clusters, epoch {summary['epoch']}")
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    parser.add_argument("--dims", type=int, default=0, help="truncate vectors to this many components (0: all)")
+    parser.add_argument("--block-rows", type=int, default=4096)
+    parser.add_argument("--page-size", type=int, default=5000)
+    parser.add_argument("--from-store", action="store_true", help="load vectors from EMBEDDING_STORE_PATH")
+    parser.add_argument("--dry-run", action="store_true", help="compute and report, write nothing")
+    parser.add_argument("--centroids-only", action="store_true", help="only recompute cluster centroids")
+    args = parser.parse_args()
+
+    if args.centroids_only:
+        with _get_session_factory()() as db:
+            clusters = refresh_centroids(db)
+            db.commit()
+        print(f"done: recomputed centroids of {clusters} clusters")
+        return
+
+    store = None
+    if args.from_store:
+        from app.segment_store import get_segment_store
+
+        store = get_segment_store()
+        if store is None:
+            parser.error("--from-store needs EMBEDDING_STORE_PATH")
+
+    SessionLocal = _get_session_factory()
+    with SessionLocal() as db:
+        summary = run(
+            db,
+            threshold=args.threshold,
+            dims=args.dims or None,
+            block_rows=args.block_rows,
+            page_size=args.page_size,
+            store=store,
+            dry_run=args.dry_run,
+            log=lambda msg: print(msg, flush=True),
+        )
+    print(f"done: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+"""
+Re-embed the corpus with a new embedding model, without downtime or a
+wipe of claim_embedding (see 0012_embedding_model_migration.sql).
+
+  backfill  stream claims whose vector is from another model (keyset
+            pagination), embed them with concurrent, rate-limited batched
+            provider calls and stage the vectors in claim_embedding_staged.
+            Progress is checkpointed in claim_embedding_backfill, so an
+            interrupted run resumes where it stopped.
+  promote   copy staged vectors into claim_embedding in short batches.
+  status    staged rows, claim_embedding rows per model and the checkpoint.
+
+Search only compares vectors of the query's own model, so replicas keep
+serving while rows flip over. Rollout:
+
+  1. backfill --model NEW            (service still on the old model)
+  2. promote --model NEW, and deploy EMBEDDINGS_MODEL=NEW
+  3. backfill + promote again for claims written by old replicas during
+     the rollout (claims checked by new replicas are re-embedded on demand)
+  4. python -m app.recluster --centroids-only, if cluster centroids are
+     searched (PGVECTOR_SEARCH_MODE=centroid)
+
+In-process search deployments must restart after promoting. The segment
+store keeps one directory per model under EMBEDDING_STORE_PATH and the
+HNSW_INDEX_PATH file records its model, so both are rebuilt for NEW on
+the first start; the old model's directory can be removed afterwards.
+
+Usage:
+  python -m app.reembed backfill --model M [--page-size 5000] [--batch-size 256]
+                                 [--concurrency 8] [--max-rps 20]
+  python -m app.reembed promote --model M [--batch-size 1000]
+  python -m app.reembed status --model M
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import EMBEDDINGS_MODEL, EMBEDDINGS_PROVIDER, EMBEDDING_SHADOW_DIMS
+from app.db import (
+    _REPLACE_STALE_EMBEDDING,
+    _get_session_factory,
+    _is_sqlite,
+    _multirow_values,
+    _vector_casts,
+    _vector_param,
+)
+from app.embedding.base import EmbeddingProvider
+from app.similarity import l2_normalize
+
+
+# -------------------------------------------------------------------
+# Checkpoint (claim_embedding_backfill)
+# -------------------------------------------------------------------
+
+def load_checkpoint(db: Session, model: str) -> int:
+    row = db.execute(
+        text("SELECT last_claim_id FROM claim_embedding_backfill WHERE embedding_model = :m"),
+        {"m": model},
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _save_checkpoint(db: Session, model: str, *, last_claim_id: Optional[int], rows: int = 0) -> None:
+    """
+    Add rows to the model's counter and move its checkpoint to
+    last_claim_id (None: leave it where it is). Does not commit.
+    """
+    db.execute(
+        text(
+            """
+            INSERT INTO claim_embedding_backfill (embedding_model, last_claim_id, rows_embedded)
+            VALUES (:m, COALESCE(CAST(:last AS BIGINT), 0), :rows)
+            ON CONFLICT (embedding_model) DO UPDATE SET
+              last_claim_id = COALESCE(CAST(:last AS BIGINT), claim_embedding_backfill.last_claim_id),
+              rows_embedded = claim_embedding_backfill.rows_embedded + EXCLUDED.rows_embedded,
+              updated_tms = CURRENT_TIMESTAMP
+            """
+        ),
+        {"m": model, "last": last_claim_id, "rows": rows},
+    )
+
+
+# -------------------------------------------------------------------
+# Backfill
+# -------------------------------------------------------------------
+
+def fetch_pending_claims(db: Session, *, model: str, after: int, limit: int) -> List[Tuple[int, str]]:
+    """
+    Next page of (claim_id, claim_text) with claim_id > after whose stored
+    embedding is from another model and that isn't staged yet.
+    """
+    rows = db.execute(
+        text(
+            """
+            SELECT c.claim_id, c.claim_text
+            FROM claim_embedding e
+            JOIN claim c ON c.claim_id = e.claim_id
+            WHERE e.claim_id > :after
+              AND e.embedding_model <> :m
+              AND NOT EXISTS (
+                SELECT 1
+                FROM claim_embedding_staged s
+                WHERE s.embedding_model = :m
+                  AND s.claim_id = e.claim_id
+              )
+            ORDER BY e.claim_id
+            LIMIT :limit
+            """
+        ),
+        {"m": model, "after": after, "limit": limit},
+    ).fetchall()
+    return [(int(cid), str(t)) for cid, t in rows]
+
+
+def stage_embeddings(
+    db: Session,
+    *,
+    model: str,
+    rows: Sequence[Tuple[int, List[float]]],
+    checkpoint: Optional[int] = None,
+) -> int:
+    """
+    Store unit-normalized (claim_id, embedding) rows for model and, if
+    given, move the checkpoint to claim_id checkpoint, in one transaction.
+    Commits. Returns rows staged.
+    """
+    staged = []
+    for claim_id, embedding in rows:
+        if not embedding:
+            raise RuntimeError(f"Embedding provider returned empty embedding for claim_id={claim_id}")
+        unit, norm = l2_normalize(embedding)
+        staged.append(
+            {
+                "m": model,
+                "id": claim_id,
+                "vec": _vector_param(db, unit),
+                "norm": norm,
+            }
+        )
+
+    if staged:
+        values, params = _multirow_values(staged, ("m", "id", "vec", "norm"), _vector_casts(db, "vec"))
+        db.execute(
+            text(
+                f"""
+                INSERT INTO claim_embedding_staged (embedding_model, claim_id, embedding, embedding_norm)
+                VALUES {values}
+                ON CONFLICT (embedding_model, claim_id) DO UPDATE SET
+                  embedding = EXCLUDED.embedding,
+                  embedding_norm = EXCLUDED.embedding_norm
+                """
+            ),
+            params,
+        )
+    _save_checkpoint(db, model, last_claim_id=checkpoint, rows=len(staged))
+    db.commit()
+    return len(staged)
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart (rate <= 0: unlimited).
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        at = max(now, self._next)
+        self._next = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+async def backfill(
+    db: Session,
+    provider: EmbeddingProvider,
+    *,
+    model: str,
+    page_size: int = 5000,
+    batch_size: int = 256,
+    concurrency: int = 8,
+    max_rps: float = 0.0,
+    max_attempts: int = 3,
+    log: Callable[[str], None] = lambda msg: None,
+) -> int:
+    """
+    Stage model embeddings for every claim that needs one. Returns the
+    number of claims embedded.
+
+    Up to concurrency aembed_many(batch) calls are in flight, started at
+    most max_rps per second; a failed call is retried with backoff up to
+    max_attempts times before the run stops. Batches finish out of order,
+    so the checkpoint only moves past a batch once every earlier batch is
+    staged. A completed pass resets the checkpoint to 0, so the next run
+    rescans for claims added in the meantime.
+    """
+    after = load_checkpoint(db, model)
+    db.commit()
+
+    limiter = RateLimiter(max_rps)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    tasks: Set[asyncio.Task] = set()
+    failures: List[BaseException] = []
+    outstanding: List[int] = []  # last claim_id of each started batch, in order
+    finished: Set[int] = set()
+    total = 0
+    t0 = time.time()
+
+    async def embed(batch: List[Tuple[int, str]]) -> List[List[float]]:
+        attempt = 1
+        while True:
+            await limiter.wait()
+            try:
+                vectors = await provider.aembed_many([t for _, t in batch])
+                if len(vectors) != len(batch):
+                    raise RuntimeError("Embedding provider returned wrong number of embeddings")
+                return vectors
+            except Exception as e:
+                if attempt >= max_attempts:
+                    raise
+                log(f"batch ending at claim_id={batch[-1][0]} failed ({e}); retry {attempt}")
+                await asyncio.sleep(min(2.0**attempt, 30.0))
+                attempt += 1
+
+    async def run(batch: List[Tuple[int, str]]) -> None:
+        nonlocal total
+        try:
+            vectors = await embed(batch)
+
+            # From here to the commit nothing awaits, so the checkpoint
+            # and the staged rows it covers are written together.
+            finished.add(batch[-1][0])
+            checkpoint = None
+            while outstanding and outstanding[0] in finished:
+                checkpoint = outstanding.pop(0)
+                finished.discard(checkpoint)
+
+            stage_embeddings(
+                db,
+                model=model,
+                rows=[(cid, vec) for (cid, _), vec in zip(batch, vectors)],
+                checkpoint=checkpoint,
+            )
+            total += len(batch)
+            log(f"staged {total} claims ({total / max(time.time() - t0, 1e-9):.0f}/s)")
+        except Exception as e:
+            failures.append(e)
+        finally:
+            slots.release()
+
+    try:
+        while not failures:
+            page = fetch_pending_claims(db, model=model, after=after, limit=page_size)
+            db.commit()
+            if not page:
+                break
+            for i in range(0, len(page), batch_size):
+                await slots.acquire()
+                if failures:
+                    slots.release()
+                    break
+                batch = page[i : i + batch_size]
+                outstanding.append(batch[-1][0])
+                task = asyncio.create_task(run(batch))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            after = page[-1][0]
+
+        await asyncio.gather(*list(tasks))
+    finally:
+        for task in list(tasks):
+            task.cancel()
+        await asyncio.gather(*list(tasks), return_exceptions=True)
+
+    if failures:
+        raise failures[0]
+
+    _save_checkpoint(db, model, last_claim_id=0)
+    db.commit()
+    return total
+
+
+# -------------------------------------------------------------------
+# Promote
+# -------------------------------------------------------------------
+
+def promote_batch(db: Session, *, model: str, after: int, batch_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Move the next batch_size staged rows (claim_id > after) into
+    claim_embedding, replacing vectors of other models, and drop them from
+    the staging table. One short transaction. Returns (last claim_id
+    covered, rows promoted), or None once nothing is left.
+    """
+    upto = db.execute(
+        text(
+            """
+            SELECT MAX(claim_id)
+            FROM (
+              SELECT claim_id
+              FROM claim_embedding_staged
+              WHERE embedding_model = :m AND claim_id > :after
+              ORDER BY claim_id
+              LIMIT :limit
+            ) batch
+            """
+        ),
+        {"m": model, "after": after, "limit": batch_size},
+    ).scalar()
+    if upto is None:
+        db.commit()
+        return None
+
+    shadow = EMBEDDING_SHADOW_DIMS > 0 and not _is_sqlite(db)
+    params: Dict[str, Any] = {"m": model, "after": after, "upto": int(upto)}
+    if shadow:
+        params["dims"] = EMBEDDING_SHADOW_DIMS
+
+    # Only claims that already have an embedding row: a bare claim row is
+    # a reservation whose owner will insert the embedding itself.
+    rows = db.execute(
+        text(
+            f"""
+            INSERT INTO claim_embedding
+              (claim_id, embedding_model, embedding, embedding_norm, is_normalized
+               {", embedding_short" if shadow else ""})
+            SELECT s.claim_id, s.embedding_model, s.embedding, s.embedding_norm, TRUE
+                   {", l2_normalize(subvector(s.embedding, 1, :dims))" if shadow else ""}
+            FROM claim_embedding_staged s
+            JOIN claim_embedding e ON e.claim_id = s.claim_id
+            WHERE s.embedding_model = :m
+              AND s.claim_id > :after
+              AND s.claim_id <= :upto
+            {_REPLACE_STALE_EMBEDDING.format(short=", embedding_short = EXCLUDED.embedding_short" if shadow else "")}
+            RETURNING claim_id
+            """
+        ),
+        params,
+    ).fetchall()
+    db.execute(
+        text(
+            """
+            DELETE FROM claim_embedding_staged
+            WHERE embedding_model = :m
+              AND claim_id > :after
+              AND claim_id <= :upto
+            """
+        ),
+        {"m": model, "after": after, "upto": int(upto)},
+    )
+    db.commit()
+    return int(upto), len(rows)
+
+
+def promote(
+    db: Session,
+    *,
+    model: str,
+    batch_size: int = 1000,
+    log: Callable[[str], None] = lambda msg: None,
+) -> int:
+    """
+    Promote every staged row of model. Returns rows written.
+    """
+    total = 0
+    after = 0
+    while True:
+        step = promote_batch(db, model=model, after=after, batch_size=batch_size)
+        if step is None:
+            return total
+        after, n = step
+        total += n
+        log(f"promoted {total} rows (last claim_id={after})")
+
+
+def status(db: Session, *, model: str) -> Dict[str, Any]:
+    by_model = db.execute(
+        text("SELECT embedding_model, COUNT(*) FROM claim_embedding GROUP BY embedding_model")
+    ).fetchall()
+    staged = db.execute(
+        text("SELECT COUNT(*) FROM claim_embedding_staged WHERE embedding_model = :m"),
+        {"m": model},
+    ).scalar()
+    checkpoint = db.execute(
+        text(
+            """
+            SELECT last_claim_id, rows_embedded
+            FROM claim_embedding_backfill
+            WHERE embedding_model = :m
+            """
+        ),
+        {"m": model},
+    ).fetchone()
+    db.commit()
+    return {
+        "model": model,
+        "claim_embedding": {str(m): int(n) for m, n in by_model},
+        "staged": int(staged or 0),
+        "checkpoint": int(checkpoint[0]) if checkpoint else 0,
+        "rows_embedded": int(checkpoint[1]) if checkpoint else 0,
+    }
+
+
+# -------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------
+
+def make_provider(model: str, batch_size: int) -> EmbeddingProvider:
+    # No cache or micro-batching: every claim is embedded once, in
+    # batches that map to one provider request each.
+    if EMBEDDINGS_PROVIDER == "stub":
+        from app.embedding.stub_provider import StubEmbeddingProvider
+
+        return StubEmbeddingProvider(model_name=model)
+
+    from app.embedding.openai_provider import OpenAIEmbeddingProvider
+
+    return OpenAIEmbeddingProvider(model=model, batch_size=batch_size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("backfill")
+    p.add_argument("--model", default=EMBEDDINGS_MODEL)
+    p.add_argument("--page-size", type=int, default=5000)
+    p.add_argument("--batch-size", type=int, default=256)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--max-rps", type=float, default=0.0, help="provider requests per second (0: unlimited)")
+
+    p = sub.add_parser("promote")
+    p.add_argument("--model", default=EMBEDDINGS_MODEL)
+    p.add_argument("--batch-size", type=int, default=1000)
+
+    p = sub.add_parser("status")
+    p.add_argument("--model", default=EMBEDDINGS_MODEL)
+
+    args = parser.parse_args()
+    SessionLocal = _get_session_factory()
+
+    def log(msg: str) -> None:
+        print(msg, flush=True)
+
+    with SessionLocal() as db:
+        if args.command == "backfill":
+            total = asyncio.run(
+                backfill(
+                    db,
+                    make_provider(args.model, args.batch_size),
+                    model=args.model,
+                    page_size=args.page_size,
+                    batch_size=args.batch_size,
+                    concurrency=args.concurrency,
+                    max_rps=args.max_rps,
+                    log=log,
+                )
+            )
+            print(f"done: {total} claims embedded with {args.model}")
+        elif args.command == "promote":
+            total = promote(db, model=args.model, batch_size=args.batch_size, log=log)
+            print(f"done: {total} rows promoted to {args.model}")
+        else:
+            print(status(db, model=args.model))
+
+
+if __name__ == "__main__":
+    main()
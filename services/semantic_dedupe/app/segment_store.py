@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import fcntl
+import glob
+import json
+import os
+import re
+import threading
+import uuid
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import EMBEDDINGS_MODEL, EMBEDDING_STORE_PATH, EMBEDDING_STORE_SEGMENT_ROWS
+from app.db import decode_embedding
+
+
+# -------------------------------------------------------------------
+# Append-only, memory-mapped embedding store
+# -------------------------------------------------------------------
+
+class SegmentStore:
+    """
+    Local on-disk copy of claim_embedding for the in-process search path.
+
+    Layout (one directory per embedding model):
+      meta.json          {"model": M, "dims": D, "synced_seq": S, "generation": G}
+      seg-000000.f32     unit vectors, float32, row-major (rows x D)
+      seg-000000.ids     claim_id per row, int64
+      ...
+
+    Segments are append-only and hold at most segment_rows rows. Readers
+    map them read-only with mmap, so worker processes on the same host
+    share one copy in the OS page cache and a restart does not decode the
+    corpus from the database again. Appends are serialized across
+    processes with flock on a lock file.
+
+    A claim rewritten in claim_embedding is appended again; the latest
+    row wins and blocks() reports earlier ones with claim_id -1. A store
+    written for another model or dimensionality is cleared and rebuilt.
+
+    Vectors are written before their ids, so a torn append (crash between
+    the two writes) only leaves unreferenced vector bytes, which the next
+    append truncates.
+    """
+
+    def __init__(self, path: str, *, model: str = EMBEDDINGS_MODEL, segment_rows: int = 65536):
+        self.path = path
+        self.model = model
+        self.segment_rows = max(1, int(segment_rows))
+        self._lock = threading.RLock()
+
+        os.makedirs(path, exist_ok=True)
+        self._lock_path = os.path.join(path, ".lock")
+
+        self._clear_state()
+        self.refresh()
+
+    def _clear_state(self) -> None:
+        # New for every rebuild, so other processes notice a reset
+        self._generation: Optional[str] = None
+        self._dims: Optional[int] = None
+        # (ids, vectors) per segment, both mapped read-only
+        self._segments: List[Tuple[np.ndarray, np.ndarray]] = []
+        # claim_id -> (segment, row) of its latest row
+        self._where: Dict[int, Tuple[int, int]] = {}
+        # segment -> rows superseded by a later row for the same claim
+        self._stale: Dict[int, Set[int]] = {}
+        self._max_claim_id = 0
+        self._synced_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, claim_id: int) -> bool:
+        return int(claim_id) in self._where
+
+    @property
+    def dims(self) -> Optional[int]:
+        return self._dims
+
+    @property
+    def max_claim_id(self) -> int:
+        return self._max_claim_id
+
+    @property
+    def synced_seq(self) -> int:
+        """claim_embedding.embedding_seq the store is current through."""
+        return self._synced_seq
+
+    def blocks(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (claim_ids, vectors) per segment. vectors are read-only mmaps;
+        superseded rows have claim_id -1 (ids is then a copy).
+        """
+        with self._lock:
+            out = []
+            for n, (ids, vectors) in enumerate(self._segments):
+                if not len(ids):
+                    continue
+                stale = self._stale.get(n)
+                if stale:
+                    ids = np.array(ids)
+                    ids[sorted(stale)] = -1
+                out.append((ids, vectors))
+            return out
+
+    # ---------------------------------------------------------------
+    # Files
+    # ---------------------------------------------------------------
+
+    def _segment_paths(self, n: int) -> Tuple[str, str]:
+        base = os.path.join(self.path, f"seg-{n:06d}")
+        return f"{base}.f32", f"{base}.ids"
+
+    def _segment_count(self) -> int:
+        n = 0
+        while os.path.exists(self._segment_paths(n)[1]):
+            n += 1
+        return n
+
+    def _rows_in(self, n: int) -> int:
+        vec_path, ids_path = self._segment_paths(n)
+        if not (os.path.exists(vec_path) and os.path.exists(ids_path)):
+            return 0
+        return min(
+            os.path.getsize(vec_path) // (4 * self._dims),
+            os.path.getsize(ids_path) // 8,
+        )
+
+    def _read_meta(self) -> Optional[dict]:
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, dims: int, synced_seq: int) -> None:
+        meta_path = os.path.join(self.path, "meta.json")
+        tmp = f"{meta_path}.tmp"
+        with open(tmp, "w") as f:
+            if self._generation is None:
+                self._generation = uuid.uuid4().hex
+            json.dump(
+                {"model": self.model, "dims": dims, "synced_seq": synced_seq, "generation": self._generation},
+                f,
+            )
+        os.replace(tmp, meta_path)
+        self._dims = dims
+        self._synced_seq = synced_seq
+
+    def _reset(self) -> None:
+        """
+        Remove every segment and meta.json (caller holds the flock).
+        """
+        for name in glob.glob(os.path.join(self.path, "seg-*")) + [os.path.join(self.path, "meta.json")]:
+            if os.path.exists(name):
+                os.remove(name)
+        self._clear_state()
+
+    def refresh(self) -> None:
+        """
+        Pick up rows appended since the last refresh (by this or another
+        process). Only the last, still-growing segment is re-mapped.
+        """
+        with self._lock:
+            meta = self._read_meta()
+            if meta is None or meta.get("model") != self.model or meta.get("generation") != self._generation:
+                if self._generation is not None:
+                    # Cleared or rebuilt by another process
+                    self._clear_state()
+                if meta is None or meta.get("model") != self.model:
+                    # No store yet, or another model's (the next append
+                    # replaces it)
+                    return
+                self._generation = meta.get("generation")
+            self._dims = int(meta["dims"])
+            self._synced_seq = max(self._synced_seq, int(meta.get("synced_seq", 0)))
+
+            count = self._segment_count()
+            start = max(0, len(self._segments) - 1)
+            # Rows already indexed keep their place; ids files only grow.
+            seen = len(self._segments[start][0]) if self._segments else 0
+            del self._segments[start:]
+
+            # self._segments[n] always describes seg-n (empty arrays for a
+            # segment with no complete rows yet; mmap cannot map 0 bytes).
+            for n in range(start, count):
+                rows = self._rows_in(n)
+                if rows == 0:
+                    self._segments.append(
+                        (np.empty(0, dtype=np.int64), np.empty((0, self._dims), dtype=np.float32))
+                    )
+                    continue
+                vec_path, ids_path = self._segment_paths(n)
+                ids = np.memmap(ids_path, dtype=np.int64, mode="r", shape=(rows,))
+                vectors = np.memmap(vec_path, dtype=np.float32, mode="r", shape=(rows, self._dims))
+                self._segments.append((ids, vectors))
+
+                first = seen if n == start else 0
+                for row, cid in enumerate(ids[first:].tolist(), start=first):
+                    old = self._where.get(cid)
+                    if old is not None:
+                        self._stale.setdefault(old[0], set()).add(old[1])
+                    self._where[cid] = (n, row)
+                self._max_claim_id = max(self._max_claim_id, int(ids.max()))
+
+    # ---------------------------------------------------------------
+    # Writes
+    # ---------------------------------------------------------------
+
+    def append(
+        self,
+        rows: Iterable[Tuple[int, Sequence[float]]],
+        *,
+        synced_seq: Optional[int] = None,
+        replace: bool = False,
+    ) -> int:
+        """
+        Append (claim_id, unit_vector) rows. Rows already in the store are
+        skipped unless replace is set, and even then when the stored vector
+        is unchanged; rows with another dimensionality than the store's are
+        skipped. Returns rows written.
+
+        synced_seq, if given, is recorded in meta.json once the rows are
+        written (reconcile() resumes from it); a batch the store already
+        covers is not written again.
+        """
+        rows = list(rows)
+        if not rows and synced_seq is None:
+            return 0
+
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                meta = self._read_meta()
+                if self._dims is None and meta is not None:
+                    # Another model's store at this path
+                    self._reset()
+                if synced_seq is not None and synced_seq <= self._synced_seq:
+                    return 0
+                if self._dims is None:
+                    if not rows:
+                        return 0
+                    self._write_meta(len(rows[0][1]), 0)
+
+                fresh = {}
+                for cid, vec in rows:
+                    cid = int(cid)
+                    if len(vec) != self._dims:
+                        continue
+                    where = self._where.get(cid)
+                    if where is None or (replace and not self._same_vector(where, vec)):
+                        fresh[cid] = vec
+                if not fresh:
+                    if synced_seq is not None and synced_seq > self._synced_seq:
+                        self._write_meta(self._dims, synced_seq)
+                    return 0
+
+                ids = np.fromiter(fresh.keys(), dtype=np.int64, count=len(fresh))
+                vectors = np.asarray(list(fresh.values()), dtype=np.float32)
+
+                n = max(0, self._segment_count() - 1)
+                written = 0
+                while written < len(ids):
+                    have = self._rows_in(n)
+                    room = self.segment_rows - have
+                    if room <= 0:
+                        n += 1
+                        continue
+
+                    vec_path, ids_path = self._segment_paths(n)
+                    chunk = slice(written, written + room)
+                    with open(vec_path, "ab") as f:
+                        f.truncate(have * 4 * self._dims)
+                        f.write(vectors[chunk].tobytes())
+                    with open(ids_path, "ab") as f:
+                        f.truncate(have * 8)
+                        f.write(ids[chunk].tobytes())
+                    written += len(ids[chunk])
+
+                if synced_seq is not None and synced_seq > self._synced_seq:
+                    self._write_meta(self._dims, synced_seq)
+                self.refresh()
+                return written
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _same_vector(self, where: Tuple[int, int], vec: Sequence[float]) -> bool:
+        segment, row = where
+        # Live appends store the vector as computed; reconcile re-reads the
+        # float4 copy from the database, so allow for rounding.
+        return bool(np.allclose(self._segments[segment][1][row], np.asarray(vec, dtype=np.float32), atol=1e-6))
+
+    def reconcile(self, db: Session, *, batch_size: int = 5000) -> int:
+        """
+        Catch up with claim_embedding: copy rows written since the store's
+        synced_seq, in keyset-paginated batches of embedding_seq. Returns
+        rows appended.
+
+        embedding_seq is stamped in commit order (0016_claim_embedding_seq),
+        unlike claim_id, which is reserved before the embedding commits and
+        is kept by rows that app.reembed rewrites in place. Rewritten rows
+        of the store's model replace the stored vector; rows the store
+        already holds (appended live since the last reconcile) are skipped.
+
+        If the database embeddings no longer match the store's
+        dimensionality (the model now returns another width), the store is
+        cleared and rebuilt from the start.
+        """
+        appended = 0
+        after = self.synced_seq
+        rebuilt = False
+        while True:
+            rows = db.execute(
+                text(
+                    """
+                    SELECT claim_id, embedding_model, embedding, embedding_seq
+                    FROM claim_embedding
+                    WHERE embedding_seq > :after
+                    ORDER BY embedding_seq
+                    LIMIT :limit
+                    """
+                ),
+                {"after": after, "limit": batch_size},
+            ).fetchall()
+            if not rows:
+                return appended
+
+            batch = []
+            for cid, model, emb, _ in rows:
+                if model != self.model:
+                    continue
+                vec = decode_embedding(db, emb)
+                if vec:
+                    v = np.asarray(vec, dtype=np.float32)
+                    norm = float(np.linalg.norm(v))
+                    batch.append((int(cid), v / norm if norm > 0.0 else v))
+
+            if batch and not rebuilt and self._dims is not None and len(batch[0][1]) != self._dims:
+                with self._lock, open(self._lock_path, "a") as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        self._reset()
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                appended, after, rebuilt = 0, 0, True
+                continue
+
+            after = int(rows[-1][3])
+            appended += self.append(batch, synced_seq=after, replace=True)
+
+
+# -------------------------------------------------------------------
+# Process-wide store (EMBEDDING_STORE_PATH)
+# -------------------------------------------------------------------
+
+_store: Optional[SegmentStore] = None
+_store_lock = threading.Lock()
+
+
+def store_path(root: str, model: str) -> str:
+    """
+    Per-model directory under root, so replicas on either side of a model
+    rollout never warm-start from each other's vectors.
+    """
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9._-]", "_", model))
+
+
+def get_segment_store() -> Optional[SegmentStore]:
+    """
+    The configured store for EMBEDDINGS_MODEL, or None if
+    EMBEDDING_STORE_PATH is unset.
+    """
+    global _store
+    if not EMBEDDING_STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SegmentStore(
+                store_path(EMBEDDING_STORE_PATH, EMBEDDINGS_MODEL),
+                model=EMBEDDINGS_MODEL,
+                segment_rows=EMBEDDING_STORE_SEGMENT_ROWS,
+            )
+        return _store
@@ -0,0 +1,82 @@
+"""
+Backfill claim_embedding.embedding_short for rows written before shadow
+embeddings were enabled (see 0009_embedding_shadow.sql).
+
+Runs in small keyset-paginated batches, each in its own short transaction,
+so it is safe to run against a live database and to interrupt/resume.
+
+Usage:
+  python -m app.shadow_backfill [--batch-size 1000] [--dims 1024]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import EMBEDDING_SHADOW_DIMS
+from app.db import _get_session_factory
+
+
+def backfill_batch(db: Session, *, after: int, batch_size: int, dims: int) -> list[int]:
+    """
+    Fill embedding_short for the next batch of rows with claim_id > after.
+    Returns the claim_ids updated (empty when done).
+    """
+    rows = db.execute(
+        text(
+            """
+            WITH batch AS (
+              SELECT claim_id
+              FROM claim_embedding
+              WHERE claim_id > :after
+                AND embedding_short IS NULL
+              ORDER BY claim_id
+              LIMIT :batch_size
+            )
+            UPDATE claim_embedding e
+            SET embedding_short = l2_normalize(subvector(e.embedding, 1, :dims))
+            FROM batch
+            WHERE e.claim_id = batch.claim_id
+            RETURNING e.claim_id
+            """
+        ),
+        {"after": after, "batch_size": batch_size, "dims": dims},
+    ).fetchall()
+    db.commit()
+    return [int(r[0]) for r in rows]
+
+
+def run(*, batch_size: int, dims: int) -> int:
+    SessionLocal = _get_session_factory()
+    total = 0
+    after = 0
+    t0 = time.time()
+
+    with SessionLocal() as db:
+        while True:
+            ids = backfill_batch(db, after=after, batch_size=batch_size, dims=dims)
+            if not ids:
+                break
+            after = max(ids)
+            total += len(ids)
+            rate = total / max(time.time() - t0, 1e-9)
+            print(f"backfilled {total} rows (last claim_id={after}, {rate:.0f} rows/s)", flush=True)
+
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dims", type=int, default=EMBEDDING_SHADOW_DIMS or 1024)
+    args = parser.parse_args()
+
+    total = run(batch_size=args.batch_size, dims=args.dims)
+    print(f"done: {total} rows backfilled")
+
+
+if __name__ == "__main__":
+    main()
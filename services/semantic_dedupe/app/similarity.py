@@ -1,3 +1,5 @@
+from typing import List, Tuple
+
 import numpy as np
 
 def cosine_similarity(a, b) -> float:
@@ -11,3 +13,27 @@ def cosine_similarity(a, b) -> float:
 
     return float(np.dot(a, b) / (na * nb))
 
+def l2_normalize(v) -> Tuple[List[float], float]:
+    """
+    Returns (unit_vector, original_norm).
+    A zero vector is returned unchanged with norm 0.0.
+    """
+    a = np.array(v, dtype=np.float64)
+    n = float(np.linalg.norm(a))
+    if n == 0.0:
+        return a.tolist(), 0.0
+    return (a / n).tolist(), n
+
+def dot_similarity(a, b) -> float:
+    """
+    Cosine similarity for vectors that are already unit-normalized.
+    """
+    return float(np.dot(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)))
+
+def shadow_embedding(unit, dims: int) -> List[float]:
+    """
+    Reduced-dimension copy of an embedding: the first dims components,
+    re-normalized. For text-embedding-3 models this matches requesting
+    `dimensions=dims` from the API.
+    """
+    return l2_normalize(list(unit)[:dims])[0]
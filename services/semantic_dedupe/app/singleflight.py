@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent async work by key (e.g. content_hash): the first
+    caller runs it, callers arriving while it is in flight await the same
+    result (or exception). Nothing is cached once the call completes.
+
+    The work runs in its own task, so a waiter being cancelled does not
+    cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "shared": 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def _in_flight(self, key: Hashable, loop: asyncio.AbstractEventLoop):
+        fut = self._calls.get(key)
+        if fut is not None and fut.get_loop() is loop and not fut.done():
+            return fut
+        return None
+
+    def _register(self, key: Hashable, fut: asyncio.Future) -> None:
+        self._calls[key] = fut
+
+        def release(_):
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+
+        fut.add_done_callback(release)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Returns (result, shared); shared is True if another caller ran fn.
+        """
+        loop = asyncio.get_running_loop()
+        fut = self._in_flight(key, loop)
+        if fut is not None:
+            self._count("shared")
+            return await asyncio.shield(fut), True
+
+        self._count("leaders")
+        task = loop.create_task(fn())
+        self._register(key, task)
+        return await asyncio.shield(task), False
+
+    async def do_many(
+        self,
+        keys: Sequence[Hashable],
+        fn: Callable[[List[Hashable]], Awaitable[Sequence[T]]],
+    ) -> List[T]:
+        """
+        Batched do(): keys already in flight are awaited, the rest are
+        computed with a single fn(keys_to_compute) call (which must return
+        one result per key, in order) and published for later callers.
+        """
+        loop = asyncio.get_running_loop()
+        waits: Dict[Hashable, asyncio.Future] = {}
+        own: List[Hashable] = []
+        for key in dict.fromkeys(keys):
+            fut = self._in_flight(key, loop)
+            if fut is not None:
+                waits[key] = fut
+            else:
+                own.append(key)
+
+        if waits:
+            self._count("shared", len(waits))
+        if own:
+            self._count("leaders", len(own))
+            futs = {key: loop.create_future() for key in own}
+            for key, fut in futs.items():
+                self._register(key, fut)
+
+            async def run() -> None:
+                try:
+                    results = list(await fn(own))
+                    if len(results) != len(own):
+                        raise RuntimeError(f"expected {len(own)} results, got {len(results)}")
+                except asyncio.CancelledError:
+                    for fut in futs.values():
+                        fut.cancel()
+                    raise
+                except Exception as e:
+                    for fut in futs.values():
+                        if not fut.done():
+                            fut.set_exception(e)
+                            fut.exception()  # raised to awaiters; don't log as unretrieved
+                    return
+                for key, value in zip(own, results):
+                    futs[key].set_result(value)
+
+            task = loop.create_task(run())
+            await asyncio.shield(task)
+            waits.update(futs)
+
+        out = {key: await asyncio.shield(fut) for key, fut in waits.items()}
+        return [out[key] for key in keys]
@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import (
+    EMBEDDINGS_MODEL,
+    PYTHON_SEARCH_BACKEND,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_INDEX_PATH,
+)
+from app.db import decode_embedding
+from app.segment_store import SegmentStore, get_segment_store
+
+
+# -------------------------------------------------------------------
+# In-process vector indexes (non-pgvector search path)
+# -------------------------------------------------------------------
+
+class VectorIndex(ABC):
+    """
+    Top-k interface shared by the in-process search backends.
+
+    Vectors are compared by cosine similarity. Implementations keep rows
+    keyed by claim_id and are kept current with claim_embedding by sync().
+    """
+
+    def __init__(self):
+        self._synced_through = 0
+        self._lock = threading.RLock()
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def __contains__(self, claim_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    def add(self, claim_id: int, embedding: Sequence[float]) -> bool:
+        """
+        Insert one row. Returns False if claim_id is already present or the
+        vector does not match the index dimensionality.
+        """
+
+    @abstractmethod
+    def discard(self, claim_ids: Iterable[int]) -> int:
+        """
+        Remove rows (e.g. claims whose insert was rolled back).
+        """
+
+    @abstractmethod
+    def search_many(
+        self,
+        queries: Sequence[Sequence[float]],
+        top_k: int,
+        *,
+        excludes: Optional[Sequence[Iterable[int]]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Batched search(): excludes[i] lists claim_ids hidden from queries[i].
+        """
+
+    @property
+    def synced_through(self) -> int:
+        """Highest claim_embedding.embedding_seq read by sync()."""
+        return self._synced_through
+
+    def add_many(self, rows: Iterable[Tuple[int, Sequence[float]]]) -> int:
+        added = 0
+        with self._lock:
+            for claim_id, embedding in rows:
+                if self.add(claim_id, embedding):
+                    added += 1
+        return added
+
+    def search(
+        self,
+        query: Sequence[float],
+        top_k: int,
+        *,
+        exclude: Iterable[int] = (),
+    ) -> List[Tuple[int, float]]:
+        """
+        Return up to top_k (claim_id, cosine_similarity) pairs, best first.
+        """
+        return self.search_many([query], top_k, excludes=[exclude])[0]
+
+    def load_segments(self, store: SegmentStore) -> int:
+        """
+        Bulk-load rows from a local segment store instead of decoding them
+        from the database; sync() then resumes after the store's
+        synced_seq.
+        """
+        added = 0
+        with self._lock:
+            for ids, vectors in store.blocks():
+                for cid, vec in zip(ids.tolist(), vectors):
+                    if cid >= 0 and cid not in self and self.add(cid, vec):
+                        added += 1
+            self._synced_through = max(self._synced_through, store.synced_seq)
+        return added
+
+    def sync(self, db: Session) -> int:
+        """
+        Append claim_embedding rows written since the last sync.
+
+        Rows are read by embedding_seq, which is stamped in commit order
+        (0016_claim_embedding_seq), so an embedding that commits after a
+        higher claim_id, or one rewritten by app.reembed, is still picked
+        up. The first call loads the whole corpus; afterwards this is an
+        index range scan that usually returns zero or one row. Rows already
+        added directly via add() are skipped, and so are rows embedded
+        with a model other than EMBEDDINGS_MODEL.
+        """
+        with self._lock:
+            rows = db.execute(
+                text(
+                    """
+                    SELECT claim_id, embedding_model, embedding, embedding_seq
+                    FROM claim_embedding
+                    WHERE embedding_seq > :after
+                    ORDER BY embedding_seq
+                    """
+                ),
+                {"after": self._synced_through},
+            ).fetchall()
+
+            added = 0
+            for cid, model, emb, seq in rows:
+                self._synced_through = max(self._synced_through, int(seq))
+                if model != EMBEDDINGS_MODEL or int(cid) in self:
+                    continue
+                vec = decode_embedding(db, emb)
+                if vec and self.add(int(cid), vec):
+                    added += 1
+            return added
+
+
+class EmbeddingMatrix(VectorIndex):
+    """
+    Contiguous float32 embedding matrix with a parallel claim_id array.
+
+    Rows are stored unit-normalized, so top-k is a single matrix-vector
+    product followed by argpartition. Storage grows by doubling, so
+    appending a row is amortized O(dims) and the corpus is decoded from
+    the database only once per process.
+
+    After load_segments() the rows of a SegmentStore are searched in place
+    through their read-only mmaps (rows 0..n_base-1); rows added afterwards
+    go to the private, growable tail.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        super().__init__()
+        self._initial_capacity = max(1, int(initial_capacity))
+        self._dims: Optional[int] = None
+        self._size = 0
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._row_of: Dict[int, int] = {}
+
+        self._base_vectors: List[np.ndarray] = []
+        self._base_ids = np.empty(0, dtype=np.int64)
+        # Base rows removed by discard() or superseded in the store; the
+        # mmaps themselves are read-only.
+        self._masked: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._base_ids) - len(self._masked) + self._size
+
+    def __contains__(self, claim_id: int) -> bool:
+        return int(claim_id) in self._row_of
+
+    @property
+    def dims(self) -> Optional[int]:
+        return self._dims
+
+    def _reserve(self, n: int) -> None:
+        capacity = self._vectors.shape[0]
+        if n <= capacity:
+            return
+
+        new_capacity = max(capacity * 2, self._initial_capacity, n)
+        vectors = np.zeros((new_capacity, self._dims), dtype=np.float32)
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        if self._size:
+            vectors[: self._size] = self._vectors[: self._size]
+            ids[: self._size] = self._ids[: self._size]
+        self._vectors = vectors
+        self._ids = ids
+
+    def add(self, claim_id: int, embedding: Sequence[float]) -> bool:
+        claim_id = int(claim_id)
+        vec = np.asarray(embedding, dtype=np.float32)
+
+        with self._lock:
+            if claim_id in self._row_of:
+                return False
+            if self._dims is None:
+                self._dims = int(vec.shape[0])
+            if vec.ndim != 1 or vec.shape[0] != self._dims:
+                return False
+
+            norm = float(np.linalg.norm(vec))
+            if norm > 0.0:
+                vec = vec / norm
+
+            self._reserve(self._size + 1)
+            self._vectors[self._size] = vec
+            self._ids[self._size] = claim_id
+            self._row_of[claim_id] = len(self._base_ids) + self._size
+            self._size += 1
+            return True
+
+    def load_segments(self, store: SegmentStore) -> int:
+        with self._lock:
+            if self._size or len(self._base_ids) or store.dims is None:
+                return super().load_segments(store)
+
+            blocks = store.blocks()
+            self._dims = store.dims
+            self._base_vectors = [vectors for _, vectors in blocks]
+            self._base_ids = (
+                np.concatenate([ids for ids, _ in blocks]) if blocks else np.empty(0, dtype=np.int64)
+            )
+            self._row_of = {cid: row for row, cid in enumerate(self._base_ids.tolist()) if cid >= 0}
+            # Rows superseded by a later row for the same claim
+            self._masked = set(np.flatnonzero(self._base_ids < 0).tolist())
+            self._synced_through = max(self._synced_through, store.synced_seq)
+            return len(self._row_of)
+
+    def discard(self, claim_ids: Iterable[int]) -> int:
+        # The last tail row is moved into the hole, so this is O(dims) per row.
+        removed = 0
+        with self._lock:
+            n_base = len(self._base_ids)
+            for claim_id in claim_ids:
+                row = self._row_of.pop(int(claim_id), None)
+                if row is None:
+                    continue
+                removed += 1
+                if row < n_base:
+                    self._masked.add(row)
+                    continue
+                row -= n_base
+                last = self._size - 1
+                if row != last:
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = self._ids[last]
+                    self._row_of[int(self._ids[row])] = n_base + row
+                self._size = last
+        return removed
+
+    def search_many(
+        self,
+        queries: Sequence[Sequence[float]],
+        top_k: int,
+        *,
+        excludes: Optional[Sequence[Iterable[int]]] = None,
+        block_size: int = 64,
+    ) -> List[List[Tuple[int, float]]]:
+        # One matrix-matrix product per block of queries.
+        if not len(queries):
+            return []
+        if excludes is None:
+            excludes = [()] * len(queries)
+
+        Q = np.asarray(queries, dtype=np.float32)
+
+        with self._lock:
+            n = len(self._base_ids) + self._size
+            if top_k <= 0 or n == 0 or Q.ndim != 2 or Q.shape[1] != self._dims:
+                return [[] for _ in range(len(Q))]
+
+            norms = np.linalg.norm(Q, axis=1, keepdims=True)
+            norms[norms == 0.0] = np.inf
+            Q = Q / norms
+
+            blocks = list(self._base_vectors)
+            if self._size:
+                blocks.append(self._vectors[: self._size])
+            ids = np.concatenate([self._base_ids, self._ids[: self._size]])
+            masked = np.fromiter(self._masked, dtype=np.int64, count=len(self._masked))
+            k = min(int(top_k), n)
+            out: List[List[Tuple[int, float]]] = []
+
+            for start in range(0, len(Q), block_size):
+                q = Q[start:start + block_size]
+                scores = np.concatenate([q @ b.T for b in blocks], axis=1)
+                scores[:, masked] = -np.inf
+                for j, row_scores in enumerate(scores):
+                    for claim_id in excludes[start + j]:
+                        row = self._row_of.get(int(claim_id))
+                        if row is not None:
+                            row_scores[row] = -np.inf
+
+                    if k < n:
+                        cand = np.argpartition(-row_scores, k - 1)[:k]
+                    else:
+                        cand = np.arange(n)
+                    cand = cand[np.argsort(-row_scores[cand], kind="stable")]
+                    out.append(
+                        [
+                            (int(ids[i]), float(row_scores[i]))
+                            for i in cand
+                            if np.isfinite(row_scores[i]) and norms[start + j, 0] != np.inf
+                        ]
+                    )
+            return out
+
+
+# -------------------------------------------------------------------
+# Per-engine registry
+# -------------------------------------------------------------------
+
+_indexes: "weakref.WeakKeyDictionary[Engine, VectorIndex]" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def _make_index() -> VectorIndex:
+    if PYTHON_SEARCH_BACKEND == "hnsw":
+        from app.hnsw import HNSWIndex
+
+        if HNSW_INDEX_PATH and os.path.exists(HNSW_INDEX_PATH):
+            index = HNSWIndex.load(HNSW_INDEX_PATH)
+            # Built from another model's vectors: rebuild (the next save
+            # overwrites the file).
+            if index.model == EMBEDDINGS_MODEL:
+                return index
+        return HNSWIndex(
+            M=HNSW_M,
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            ef_search=HNSW_EF_SEARCH,
+            path=HNSW_INDEX_PATH or None,
+        )
+    return EmbeddingMatrix()
+
+
+def get_vector_index(db: Session) -> VectorIndex:
+    """
+    Process-wide index for the database behind db (one per engine).
+    The backend is chosen by PYTHON_SEARCH_BACKEND.
+
+    With EMBEDDING_STORE_PATH set, a new index is warm-started from the
+    local segment store (after reconciling it with claim_embedding), so
+    only rows newer than the store are read from the database.
+    """
+    engine = db.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(engine)
+        if index is None:
+            index = _make_index()
+            store = get_segment_store()
+            if store is not None:
+                store.reconcile(db)
+                index.load_segments(store)
+            _indexes[engine] = index
+        return index
+
+
+def save_vector_indexes() -> None:
+    """
+    Persist indexes that support it (called on shutdown).
+    """
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        save = getattr(index, "save", None)
+        if save is not None:
+            save()
+
+
+def maintain_vector_indexes() -> None:
+    """
+    Periodic upkeep (compaction, checkpoints) for indexes that need it.
+    Blocking; run from a background thread or an idle loop.
+    """
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        maintain = getattr(index, "maintain", None)
+        if maintain is not None:
+            maintain()
@@ -0,0 +1,125 @@
+"""
+Embedding worker for accept-then-process duplicate checks.
+
+Leases batches of jobs from claim_embedding_job (see
+0010_embedding_jobs.sql), runs them through compute_batch (one
+embed_many call, one batched search, bulk cluster assignment) and stores
+each job's result. Run as many workers as needed; they coordinate through
+FOR UPDATE SKIP LOCKED.
+
+Usage:
+  python worker.py [--batch-size 64] [--poll-seconds 0.5] [--once]
+"""
+from __future__ import annotations
+
+import argparse
+import signal
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Session
+
+from app import api
+from app.config import (
+    EMBEDDING_JOB_BATCH_SIZE,
+    EMBEDDING_JOB_POLL_SECONDS,
+    EMBEDDING_JOB_LEASE_SECONDS,
+    EMBEDDING_JOB_MAX_ATTEMPTS,
+)
+from app.db import _get_session_factory
+from app.jobs import claim_jobs, complete_jobs, fail_jobs
+from app.vector_index import maintain_vector_indexes, save_vector_indexes
+
+
+def _run(db: Session, jobs: List[Dict[str, Any]]) -> None:
+    # One top_k for the batch; each job keeps its own prefix of "similar".
+    top_k = max(j["top_k"] for j in jobs)
+    results = api.compute_batch(db, [j["claim_text"] for j in jobs], top_k)
+    complete_jobs(
+        db,
+        [
+            {"job_id": j["job_id"], "result": {**r, "similar": r["similar"][: j["top_k"]]}}
+            for j, r in zip(jobs, results)
+        ],
+    )
+
+
+def process_jobs(
+    db: Session,
+    *,
+    batch_size: int = EMBEDDING_JOB_BATCH_SIZE,
+    lease_seconds: int = EMBEDDING_JOB_LEASE_SECONDS,
+    max_attempts: int = EMBEDDING_JOB_MAX_ATTEMPTS,
+) -> int:
+    """
+    Lease and process one batch. Returns the number of jobs leased.
+
+    If the batch fails as a whole, its jobs are retried one at a time so a
+    single bad input can't fail (or endlessly requeue) its neighbours.
+    Each failure rolls back first, so the failed attempt's partial writes
+    are never committed along with the requeue.
+    """
+    jobs = claim_jobs(db, limit=batch_size, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    if not jobs:
+        return 0
+
+    try:
+        _run(db, jobs)
+        return len(jobs)
+    except Exception as e:
+        db.rollback()
+        if len(jobs) == 1:
+            fail_jobs(db, [jobs[0]["job_id"]], str(e), max_attempts=max_attempts)
+            return 1
+
+    for job in jobs:
+        try:
+            _run(db, [job])
+        except Exception as e:
+            db.rollback()
+            fail_jobs(db, [job["job_id"]], str(e), max_attempts=max_attempts)
+    return len(jobs)
+
+
+def run(*, batch_size: int, poll_seconds: float, once: bool = False) -> int:
+    SessionLocal = _get_session_factory()
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    total = 0
+    with SessionLocal() as db:
+        while not stopping:
+            t0 = time.time()
+            n = process_jobs(db, batch_size=batch_size)
+            total += n
+            if n:
+                print(f"processed {n} jobs in {time.time() - t0:.2f}s (total {total})", flush=True)
+            elif once:
+                break
+            else:
+                maintain_vector_indexes()
+                time.sleep(poll_seconds)
+
+    save_vector_indexes()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_JOB_BATCH_SIZE)
+    parser.add_argument("--poll-seconds", type=float, default=EMBEDDING_JOB_POLL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    args = parser.parse_args()
+
+    total = run(batch_size=args.batch_size, poll_seconds=args.poll_seconds, once=args.once)
+    print(f"done: {total} jobs processed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+"""
+Latency/throughput benchmarks for the dedupe pipeline.
+
+Seeds a synthetic corpus through compute_batch, growing it to each of
+--sizes in turn, and at every size measures:
+
+  compute_one    single check, as run by POST /claims/check-duplicate
+  search         the corpus top-k alone (python_topk on SQLite,
+                 pgvector_topk on Postgres)
+  batch          POST /claims/check-duplicate-batch handler, per request
+  concurrency    check_duplicate handler under N concurrent requests
+
+Embeddings come from the stub provider (SyntheticProvider below groups
+claims into topics so searches find duplicates, near-duplicates and new
+claims), so timings cover database and search work, not the embeddings
+API.
+
+Without --database-url a throwaway SQLite file is used (the test schema,
+tests/conftest.py). For pgvector, point --database-url at a scratch
+database with the migrations applied (e.g. the compose postgres after
+make migrate); it must have no claims, or pass --reset to TRUNCATE them.
+pgvector is vector(3072), so --dims only applies to SQLite. SQLite
+serializes writers, so its concurrency numbers mostly measure lock waits.
+
+Results are written as JSON (--output); compare two runs with --compare.
+
+Usage (from services/semantic_dedupe):
+  python -m benchmarks.latency [--sizes 1000,10000,100000] [--output bench.json]
+  python -m benchmarks.latency --database-url postgresql://... --reset
+  python -m benchmarks.latency --compare before.json after.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# app.api builds its embedder on import; the benchmark replaces it with
+# SyntheticProvider, so never require provider credentials.
+os.environ.setdefault("EMBEDDINGS_PROVIDER", "stub")
+
+import app.api as api  # noqa: E402
+from app import config  # noqa: E402
+from app.db import _async_url, decode_embedding  # noqa: E402
+from app.embedding.stub_provider import StubEmbeddingProvider  # noqa: E402
+
+# Noise weight per claim; with centred vectors a claim's similarity to its
+# topic's other claims is about 1 / (1 + w^2): duplicate, duplicate,
+# near-duplicate, new.
+_NOISE_WEIGHTS = (0.1, 0.2, 0.4, 1.5)
+
+
+class SyntheticProvider(StubEmbeddingProvider):
+    """
+    Claims sharing a first word (their topic) get nearby embeddings; how
+    nearby depends on the claim text.
+    """
+
+    def embed(self, text_: str) -> List[float]:
+        base = super().embed(text_.split()[0])
+        noise = super().embed(text_)
+        w = _NOISE_WEIGHTS[int(noise[0] * len(_NOISE_WEIGHTS))]
+        return [(b - 0.5) + w * (n - 0.5) for b, n in zip(base, noise)]
+
+
+def claim_text(i: int, topics: int, prefix: str = "claim") -> str:
+    return f"topic{(i * 7919) % topics} synthetic {prefix} number {i}"
+
+
+def summarize(latencies_ms: List[float], elapsed_s: Optional[float] = None) -> Dict[str, Any]:
+    a = np.asarray(latencies_ms, dtype=np.float64)
+    if not len(a):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    out = {
+        "count": int(len(a)),
+        "mean_ms": round(float(a.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(a.max()), 3),
+    }
+    if elapsed_s is not None:
+        out["throughput_per_s"] = round(len(a) / max(elapsed_s, 1e-9), 1)
+    return out
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+# ---------------------------------------------------------------------
+# Database setup
+# ---------------------------------------------------------------------
+
+def _sqlite_url(path: str) -> str:
+    return f"sqlite+pysqlite:///{path}"
+
+
+def open_database(url: Optional[str], workdir: str, *, reset: bool) -> Engine:
+    if url is None:
+        # Imported lazily: only the SQLite backend needs the test schema.
+        from tests.conftest import _create_schema
+
+        engine = create_engine(
+            _sqlite_url(os.path.join(workdir, "bench.db")), future=True, connect_args={"timeout": 60}
+        )
+        with engine.begin() as conn:
+            conn.execute(text("PRAGMA journal_mode=WAL"))
+            _create_schema(conn)
+        return engine
+
+    engine = create_engine(url, future=True, pool_pre_ping=True)
+    with engine.begin() as conn:
+        if reset:
+            conn.execute(text("TRUNCATE claim, claim_cluster RESTART IDENTITY CASCADE"))
+        elif conn.execute(text("SELECT EXISTS (SELECT 1 FROM claim)")).scalar():
+            raise SystemExit("benchmark database already has claims; use a scratch database or pass --reset")
+    return engine
+
+
+def async_factory(engine: Engine) -> async_sessionmaker:
+    url = engine.url
+    kwargs: Dict[str, Any] = {}
+    if url.get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"timeout": 60}
+    else:
+        kwargs["pool_size"] = 64
+        kwargs["max_overflow"] = 0
+    async_engine = create_async_engine(_async_url(url.render_as_string(hide_password=False)), **kwargs)
+    return async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+# ---------------------------------------------------------------------
+# Phases
+# ---------------------------------------------------------------------
+
+def seed(
+    SessionLocal: sessionmaker, start: int, stop: int, *, topics: int, batch_size: int, top_k: int
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        for lo in range(start, stop, batch_size):
+            api.compute_batch(db, [claim_text(i, topics) for i in range(lo, min(lo + batch_size, stop))], top_k)
+    elapsed = time.perf_counter() - t0
+    return {
+        "claims": stop - start,
+        "seconds": round(elapsed, 2),
+        "claims_per_s": round((stop - start) / max(elapsed, 1e-9), 1),
+    }
+
+
+def bench_compute_one(SessionLocal: sessionmaker, texts: List[str], top_k: int) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {"new": [], "existing": []}
+    classes: Dict[str, int] = {}
+    with SessionLocal() as db:
+        for t in texts:
+            t0 = time.perf_counter()
+            r = api.compute_one(db, t, top_k)
+            db.commit()
+            latencies["new" if r["created"] else "existing"].append((time.perf_counter() - t0) * 1000)
+            classes[r["classification"]] = classes.get(r["classification"], 0) + 1
+
+    return {
+        **summarize(latencies["new"] + latencies["existing"]),
+        "new": summarize(latencies["new"]),
+        "existing": summarize(latencies["existing"]),
+        "classifications": classes,
+    }
+
+
+def bench_search(SessionLocal: sessionmaker, claim_ids: List[int], top_k: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    with SessionLocal() as db:
+        postgres = db.bind.dialect.name == "postgresql"
+        for cid in claim_ids:
+            if postgres:
+                latencies.append(_timed(lambda: api.pgvector_topk(db, cid, top_k)))
+            else:
+                row = db.execute(text("SELECT embedding FROM claim_embedding WHERE claim_id = :id"), {"id": cid}).one()
+                emb = decode_embedding(db, row[0])
+                latencies.append(_timed(lambda: api.python_topk(db, cid, emb, top_k)))
+            db.rollback()
+    return {"function": "pgvector_topk" if postgres else "python_topk", **summarize(latencies)}
+
+
+async def _warm_up(AsyncSessionLocal: async_sessionmaker, claim: str, top_k: int) -> None:
+    # Untimed: the first check on an engine loads its vector index.
+    async with AsyncSessionLocal() as db:
+        await api.check_duplicate(api.CheckDuplicateRequest(claim_text=claim, top_k=top_k), db)
+
+
+def bench_batch(
+    AsyncSessionLocal: async_sessionmaker, batches: List[List[str]], top_k: int, *, warm_up: str
+) -> Dict[str, Any]:
+    async def run() -> List[float]:
+        latencies = []
+        try:
+            await _warm_up(AsyncSessionLocal, warm_up, top_k)
+            for claims in batches:
+                async with AsyncSessionLocal() as db:
+                    t0 = time.perf_counter()
+                    await api.check_duplicate_batch(api.BatchCheckDuplicateRequest(claims=claims, top_k=top_k), db)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+        finally:
+            await AsyncSessionLocal.kw["bind"].dispose()
+        return latencies
+
+    latencies = asyncio.run(run())
+    size = len(batches[0]) if batches else 0
+    return {
+        "batch_size": size,
+        **summarize(latencies),
+        "per_claim_p50_ms": round(float(np.percentile(latencies, 50)) / max(size, 1), 3) if latencies else None,
+    }
+
+
+def bench_concurrency(
+    AsyncSessionLocal: async_sessionmaker, texts: List[str], concurrency: int, top_k: int, *, warm_up: str
+) -> Dict[str, Any]:
+    async def run():
+        pending = iter(texts)
+        latencies: List[float] = []
+        errors = 0
+
+        async def worker() -> None:
+            nonlocal errors
+            for t in pending:
+                async with AsyncSessionLocal() as db:
+                    t0 = time.perf_counter()
+                    try:
+                        await api.check_duplicate(api.CheckDuplicateRequest(claim_text=t, top_k=top_k), db)
+                    except HTTPException:
+                        errors += 1
+                        continue
+                    latencies.append((time.perf_counter() - t0) * 1000)
+
+        await _warm_up(AsyncSessionLocal, warm_up, top_k)
+        t0 = time.perf_counter()
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            await AsyncSessionLocal.kw["bind"].dispose()
+        return latencies, errors, time.perf_counter() - t0
+
+    latencies, errors, elapsed = asyncio.run(run())
+    return {"concurrency": concurrency, "errors": errors, **summarize(latencies, elapsed)}
+
+
+# ---------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    *,
+    database_url: Optional[str],
+    sizes: List[int],
+    dims: int,
+    top_k: int,
+    queries: int,
+    resubmit_ratio: float,
+    batch_size: int,
+    batch_rounds: int,
+    concurrency: List[int],
+    seed_batch_size: int,
+    reset: bool,
+    log: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    rng = random.Random(0)
+    topics = max(max(sizes) // 10, 1)
+    api.embedder = SyntheticProvider(dims=dims, model_name=config.EMBEDDINGS_MODEL)
+
+    with tempfile.TemporaryDirectory(prefix="dedupe-bench-") as workdir:
+        engine = open_database(database_url, workdir, reset=reset)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+        report: Dict[str, Any] = {
+            "meta": {
+                "commit": _git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "backend": engine.dialect.name,
+                "python": platform.python_version(),
+                "dims": dims,
+                "top_k": top_k,
+                "queries": queries,
+                "resubmit_ratio": resubmit_ratio,
+                "config": {
+                    "PGVECTOR_SEARCH_MODE": config.PGVECTOR_SEARCH_MODE,
+                    "DEDUPE_SQL_FUNCTION": config.DEDUPE_SQL_FUNCTION,
+                    "LEXICAL_PREFILTER": config.LEXICAL_PREFILTER,
+                    "DUPLICATE_THRESHOLD": config.DUPLICATE_THRESHOLD,
+                    "NEAR_DUPLICATE_THRESHOLD": config.NEAR_DUPLICATE_THRESHOLD,
+                },
+            },
+            "results": [],
+        }
+
+        seeded = 0
+        fresh = 0
+
+        def fresh_texts(n: int) -> List[str]:
+            # Never-seen claims in existing topics, plus resubmissions of
+            # seeded ones
+            nonlocal fresh
+            out = []
+            for _ in range(n):
+                if rng.random() < resubmit_ratio:
+                    out.append(claim_text(rng.randrange(seeded), topics))
+                else:
+                    out.append(claim_text(fresh, topics, prefix="query"))
+                    fresh += 1
+            return out
+
+        try:
+            for size in sorted(sizes):
+                log(f"seeding {seeded} -> {size} claims")
+                seed_stats = seed(SessionLocal, seeded, size, topics=topics, batch_size=seed_batch_size, top_k=top_k)
+                seeded = size
+                result: Dict[str, Any] = {"corpus_size": size, "seed": seed_stats}
+
+                log(f"[{size}] compute_one x{queries}")
+                result["compute_one"] = bench_compute_one(SessionLocal, fresh_texts(queries), top_k)
+
+                with SessionLocal() as db:
+                    ids = [int(r[0]) for r in db.execute(text("SELECT claim_id FROM claim")).fetchall()]
+                log(f"[{size}] search x{queries}")
+                result["search"] = bench_search(SessionLocal, rng.sample(ids, min(queries, len(ids))), top_k)
+
+                log(f"[{size}] batch of {batch_size} x{batch_rounds}")
+                result["batch"] = bench_batch(
+                    async_factory(engine),
+                    [fresh_texts(batch_size) for _ in range(batch_rounds)],
+                    top_k,
+                    warm_up=claim_text(0, topics),
+                )
+
+                result["concurrency"] = []
+                for c in concurrency:
+                    log(f"[{size}] concurrency {c} x{queries}")
+                    result["concurrency"].append(
+                        bench_concurrency(
+                            async_factory(engine), fresh_texts(queries), c, top_k, warm_up=claim_text(0, topics)
+                        )
+                    )
+
+                report["results"].append(result)
+        finally:
+            engine.dispose()
+
+    return report
+
+
+# ---------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------
+
+def _flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for r in report["results"]:
+        n = r["corpus_size"]
+        for name in ("compute_one", "search", "batch"):
+            for p in ("p50_ms", "p95_ms", "p99_ms"):
+                if p in r[name]:
+                    out[f"{n} {name} {p}"] = r[name][p]
+        for c in r["concurrency"]:
+            for p in ("p50_ms", "p99_ms", "throughput_per_s"):
+                if p in c:
+                    out[f"{n} concurrency={c['concurrency']} {p}"] = c[p]
+    return out
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """
+    One line per metric present in both reports, with the relative change.
+    """
+    a, b = _flatten(before), _flatten(after)
+    lines = [f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}"]
+    for key in a:
+        if key in b:
+            change = (b[key] - a[key]) / a[key] * 100 if a[key] else 0.0
+            lines.append(f"{key:<40} {a[key]:>10.2f} {b[key]:>10.2f} {change:>+8.1f}%")
+    return lines
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Postgres URL; default: temporary SQLite file")
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE existing claims first (Postgres)")
+    parser.add_argument("--sizes", type=_int_list, default=[1000, 10000, 100000])
+    parser.add_argument("--dims", type=int, default=None, help="embedding dims (SQLite only; default 256)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--resubmit-ratio", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--batch-rounds", type=int, default=20)
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32])
+    parser.add_argument("--seed-batch-size", type=int, default=500)
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        print("\n".join(compare(before, after)))
+        return
+
+    if args.database_url is None:
+        dims = args.dims or 256
+    else:
+        if args.dims not in (None, 3072):
+            parser.error("--dims must be 3072 with Postgres (vector(3072))")
+        dims = 3072
+        if make_url(args.database_url).get_backend_name() != "postgresql":
+            parser.error("--database-url must be a Postgres URL")
+
+    report = run(
+        database_url=args.database_url,
+        sizes=args.sizes,
+        dims=dims,
+        top_k=args.top_k,
+        queries=args.queries,
+        resubmit_ratio=args.resubmit_ratio,
+        batch_size=args.batch_size,
+        batch_rounds=args.batch_rounds,
+        concurrency=args.concurrency,
+        seed_batch_size=args.seed_batch_size,
+        reset=args.reset,
+        log=lambda msg: print(msg, file=sys.stderr, flush=True),
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pytest
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.embedding.stub_provider import StubEmbeddingProvider
 
@@ -10,39 +12,193 @@ def embedder():
     return StubEmbeddingProvider()
 
 
-@pytest.fixture()
-def db_session():
+def _create_schema(conn):
+    """
+    Minimal tables matching the service schema.
+    """
+    # SQLite doesn't have pgvector; store embedding as TEXT.
+    conn.execute(text("""
+        CREATE TABLE claim (
+          claim_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+          claim_text    TEXT NOT NULL,
+          content_hash  TEXT NOT NULL UNIQUE,
+          created_tms   TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE claim_embedding (
+          claim_id         INTEGER PRIMARY KEY,
+          embedding_model  TEXT NOT NULL,
+          embedding        TEXT NOT NULL,
+          embedding_norm   REAL,
+          is_normalized    INTEGER NOT NULL DEFAULT 0,
+          updated_tms      TEXT NOT NULL DEFAULT (datetime('now')),
+          embedding_seq    INTEGER,
+          FOREIGN KEY (claim_id) REFERENCES claim(claim_id) ON DELETE CASCADE
+        );
+    """))
+    # Stand-in for the deferred trigger in 0016_claim_embedding_seq.sql;
+    # SQLite has a single writer, so stamping at write time is commit order.
+    for name, event in (("ins", "INSERT"), ("upd", "UPDATE OF embedding, embedding_model")):
+        conn.execute(text(f"""
+            CREATE TRIGGER trg_claim_embedding_seq_{name}
+            AFTER {event} ON claim_embedding
+            BEGIN
+              UPDATE claim_embedding
+              SET embedding_seq = (SELECT COALESCE(MAX(embedding_seq), 0) + 1 FROM claim_embedding)
+              WHERE claim_id = NEW.claim_id;
+            END;
+        """))
+    conn.execute(text("CREATE INDEX idx_claim_embedding_seq ON claim_embedding (embedding_seq)"))
+
+    conn.execute(text("""
+        CREATE TABLE claim_cluster (
+          cluster_id          INTEGER PRIMARY KEY AUTOINCREMENT,
+          canonical_claim_id  INTEGER NOT NULL,
+          centroid_sum        TEXT,
+          member_count        INTEGER NOT NULL DEFAULT 0,
+          created_tms         TEXT NOT NULL DEFAULT (datetime('now')),
+          FOREIGN KEY (canonical_claim_id) REFERENCES claim(claim_id)
+        );
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE claim_cluster_member (
+          cluster_id   INTEGER NOT NULL,
+          claim_id     INTEGER NOT NULL,
+          similarity   REAL NOT NULL,
+          created_tms  TEXT NOT NULL DEFAULT (datetime('now')),
+          PRIMARY KEY (cluster_id, claim_id),
+          FOREIGN KEY (cluster_id) REFERENCES claim_cluster(cluster_id) ON DELETE CASCADE,
+          FOREIGN KEY (claim_id) REFERENCES claim(claim_id) ON DELETE CASCADE
+        );
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE claim_embedding_job (
+          job_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+          claim_text   TEXT NOT NULL,
+          top_k        INTEGER NOT NULL DEFAULT 5,
+          status       TEXT NOT NULL DEFAULT 'queued',
+          attempts     INTEGER NOT NULL DEFAULT 0,
+          claim_id     INTEGER,
+          result       TEXT,
+          error        TEXT,
+          locked_tms   TEXT,
+          created_tms  TEXT NOT NULL DEFAULT (datetime('now')),
+          updated_tms  TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE claim_embedding_staged (
+          embedding_model  TEXT NOT NULL,
+          claim_id         INTEGER NOT NULL,
+          embedding        TEXT NOT NULL,
+          embedding_norm   REAL NOT NULL,
+          created_tms      TEXT NOT NULL DEFAULT (datetime('now')),
+          PRIMARY KEY (embedding_model, claim_id),
+          FOREIGN KEY (claim_id) REFERENCES claim(claim_id) ON DELETE CASCADE
+        );
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE claim_embedding_backfill (
+          embedding_model  TEXT PRIMARY KEY,
+          last_claim_id    INTEGER NOT NULL DEFAULT 0,
+          rows_embedded    INTEGER NOT NULL DEFAULT 0,
+          started_tms      TEXT NOT NULL DEFAULT (datetime('now')),
+          updated_tms      TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE claim_cluster_staged (
+          cluster_key         INTEGER PRIMARY KEY,
+          canonical_claim_id  INTEGER NOT NULL UNIQUE,
+          FOREIGN KEY (canonical_claim_id) REFERENCES claim(claim_id) ON DELETE CASCADE
+        );
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE claim_cluster_member_staged (
+          claim_id     INTEGER PRIMARY KEY,
+          cluster_key  INTEGER NOT NULL,
+          similarity   REAL NOT NULL,
+          FOREIGN KEY (claim_id) REFERENCES claim(claim_id) ON DELETE CASCADE
+        );
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE claim_cluster_epoch (
+          singleton    INTEGER PRIMARY KEY DEFAULT 1 CHECK (singleton = 1),
+          epoch        INTEGER NOT NULL DEFAULT 1,
+          updated_tms  TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+    """))
+    conn.execute(text("INSERT INTO claim_cluster_epoch (singleton) VALUES (1)"))
+
+    conn.execute(text("""
+        CREATE TABLE claim_minhash_band (
+          bucket    INTEGER NOT NULL,
+          claim_id  INTEGER NOT NULL,
+          PRIMARY KEY (bucket, claim_id),
+          FOREIGN KEY (claim_id) REFERENCES claim(claim_id) ON DELETE CASCADE
+        );
+    """))
+
+
+def _make_sqlite_session():
     """
     Use an in-memory SQLite DB for unit tests.
-    We create minimal tables matching the service schema.
     """
     engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
     SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
     with engine.begin() as conn:
-        # SQLite doesn't have pgvector; store embedding as TEXT.
-        conn.execute(text("""
-            CREATE TABLE claim (
-              claim_id      INTEGER PRIMARY KEY AUTOINCREMENT,
-              claim_text    TEXT NOT NULL,
-              content_hash  TEXT NOT NULL UNIQUE,
-              created_tms   TEXT NOT NULL DEFAULT (datetime('now'))
-            );
-        """))
+        _create_schema(conn)
 
-        conn.execute(text("""
-            CREATE TABLE claim_embedding (
-              claim_id         INTEGER PRIMARY KEY,
-              embedding_model  TEXT NOT NULL,
-              embedding        TEXT NOT NULL,
-              updated_tms      TEXT NOT NULL DEFAULT (datetime('now')),
-              FOREIGN KEY (claim_id) REFERENCES claim(claim_id) ON DELETE CASCADE
-            );
-        """))
+    return SessionLocal()
+
+
+@pytest.fixture()
+def make_db_session():
+    """
+    Factory for additional, independent in-memory databases.
+    """
+    sessions = []
 
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
+    def make():
+        db = _make_sqlite_session()
+        sessions.append(db)
+        return db
+
+    yield make
+    for db in sessions:
         db.close()
 
+
+@pytest.fixture()
+def make_async_db_session():
+    """
+    Factory for in-memory databases behind an AsyncSession (aiosqlite).
+    Await it inside the test's own event loop, and dispose of db.bind
+    there when done. make(bind=db.bind) opens another session on the same
+    database, e.g. one per simulated request.
+    """
+    async def make(bind=None):
+        engine = bind
+        if engine is None:
+            engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(_create_schema)
+        return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+
+    return make
+
+
+@pytest.fixture()
+def db_session(make_db_session):
+    return make_db_session()
+
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.hashing import content_hash
+from test_batch import CLAIMS, ClusteredStubProvider
+
+
+class AsyncOnlyProvider(ClusteredStubProvider):
+    """
+    Fails on any synchronous embedding call.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.async_calls = 0
+
+    def embed_many(self, texts):
+        raise AssertionError("sync embedding call on the async path")
+
+    async def aembed_many(self, texts):
+        self.async_calls += 1
+        return [self.embed(t) for t in texts]
+
+
+def test_async_handlers_match_sync(make_db_session, make_async_db_session, monkeypatch):
+    import app.api as api
+
+    provider = AsyncOnlyProvider()
+    monkeypatch.setattr(api, "embedder", provider)
+
+    async def run():
+        db = await make_async_db_session()
+        try:
+            one = await api.check_duplicate(
+                api.CheckDuplicateRequest(claim_text=CLAIMS[0], top_k=3), db
+            )
+            batch = await api.check_duplicate_batch(
+                api.BatchCheckDuplicateRequest(claims=CLAIMS[1:], top_k=3), db
+            )
+            again = await api.check_duplicate(
+                api.CheckDuplicateRequest(claim_text=CLAIMS[0], top_k=3), db
+            )
+        finally:
+            await db.close()
+            await db.bind.dispose()
+        return [one, *batch["results"]], again
+
+    results, again = asyncio.run(run())
+    assert provider.async_calls == 2  # the repeat needs no embedding
+    assert again["created"] is False
+
+    monkeypatch.setattr(api, "embedder", ClusteredStubProvider())
+    seq_db = make_db_session()
+    sequential = [api.compute_one(seq_db, t, 3) for t in CLAIMS]
+
+    for a, s in zip(results, sequential):
+        assert a["claim_id"] == s["claim_id"]
+        assert a["created"] == s["created"]
+        assert a["classification"] == s["classification"]
+        assert a["cluster_id"] == s["cluster_id"]
+        assert a["canonical_claim"] == s["canonical_claim"]
+
+
+class SlowSyncProvider(ClusteredStubProvider):
+    def embed(self, text):
+        time.sleep(0.2)
+        return super().embed(text)
+
+
+def test_run_sync_compute_does_not_block_the_loop(make_async_db_session, monkeypatch):
+    import app.api as api
+    import app.db as db_module
+
+    monkeypatch.setattr(api, "embedder", SlowSyncProvider())
+    monkeypatch.setattr(db_module, "CLAIM_LOCK_TIMEOUT_MS", 200)
+
+    async def run():
+        db = await make_async_db_session()
+        ticks = 0
+        done = asyncio.Event()
+
+        async def heartbeat():
+            nonlocal ticks
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            # Sync provider fallback (no prefetched embedding)
+            result = await db.run_sync(api.compute_one, CLAIMS[0], 3)
+            embed_ticks = ticks
+            # Waiting on a claim another writer reserved but never embedded
+            await db.run_sync(
+                lambda s: s.execute(
+                    text("INSERT INTO claim (claim_text, content_hash) VALUES ('x', :h)"),
+                    {"h": content_hash(CLAIMS[1])},
+                )
+            )
+            await db.commit()
+            await db.run_sync(api.compute_one, CLAIMS[1], 3)
+            wait_ticks = ticks - embed_ticks
+        finally:
+            done.set()
+            await beat
+            await db.close()
+            await db.bind.dispose()
+        return result, embed_ticks, wait_ticks
+
+    result, embed_ticks, wait_ticks = asyncio.run(run())
+    assert result["created"] is True
+    assert embed_ticks >= 5
+    assert wait_ticks >= 10
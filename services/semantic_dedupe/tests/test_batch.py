@@ -0,0 +1,77 @@
+import pytest
+
+from app.embedding.stub_provider import StubEmbeddingProvider
+
+
+class ClusteredStubProvider(StubEmbeddingProvider):
+    """
+    Claims sharing a first word get near-identical embeddings, so batches
+    exercise the duplicate / near-duplicate / cluster-join paths.
+    """
+
+    def embed(self, text):
+        base = super().embed(text.split()[0].lower())
+        noise = super().embed(text)
+        return [b + 0.05 * n for b, n in zip(base, noise)]
+
+
+CLAIMS = [
+    "Vaccines cause immunity.",
+    "Nuclear power is safe.",
+    "vaccines cause lasting immunity",
+    "Nuclear power is safe!",
+    "Coffee improves focus.",
+    "nuclear plants are clean",
+    "Vaccines cause immunity.",
+]
+
+
+@pytest.fixture()
+def clustered(monkeypatch):
+    import app.api as api
+
+    monkeypatch.setattr(api, "embedder", ClusteredStubProvider())
+    return api
+
+
+def _strip(results):
+    return [
+        {k: v for k, v in r.items() if k != "timing_ms"}
+        for r in results
+    ]
+
+
+def test_batch_matches_sequential(db_session, make_db_session, clustered):
+    batch = clustered.compute_batch(db_session, CLAIMS[:4], top_k=3)
+    batch += clustered.compute_batch(db_session, CLAIMS[4:], top_k=3)
+
+    # Replay the same claims one at a time on a fresh database.
+    seq_db = make_db_session()
+    sequential = [clustered.compute_one(seq_db, t, 3) for t in CLAIMS]
+
+    for b, s in zip(_strip(batch), _strip(sequential)):
+        assert b["claim_id"] == s["claim_id"]
+        assert b["created"] == s["created"]
+        assert b["classification"] == s["classification"]
+        assert b["cluster_id"] == s["cluster_id"]
+        assert b["canonical_claim"] == s["canonical_claim"]
+        assert [x["claim_id"] for x in b["similar"]] == [x["claim_id"] for x in s["similar"]]
+        assert b["max_similarity"] == pytest.approx(s["max_similarity"], abs=1e-5)
+
+
+def test_batch_clusters_near_duplicates(db_session, clustered):
+    results = clustered.compute_batch(db_session, CLAIMS, top_k=3)
+
+    assert results[0]["canonical_claim"]["claim_id"] == results[0]["claim_id"]
+    assert results[2]["cluster_id"] == results[0]["cluster_id"]
+    assert results[6]["claim_id"] == results[0]["claim_id"]
+    assert results[6]["created"] is False
+    assert results[4]["classification"] == "new"
+
+
+def test_batch_of_existing_claims(db_session, clustered):
+    first = clustered.compute_batch(db_session, CLAIMS, top_k=3)
+    again = clustered.compute_batch(db_session, CLAIMS[:3], top_k=3)
+
+    assert [r["claim_id"] for r in again] == [r["claim_id"] for r in first[:3]]
+    assert not any(r["created"] for r in again)
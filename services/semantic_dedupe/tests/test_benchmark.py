@@ -0,0 +1,34 @@
+from benchmarks import latency
+
+
+def test_benchmark_smoke(monkeypatch):
+    import app.api as api
+
+    # run() swaps in its own embedder
+    monkeypatch.setattr(api, "embedder", api.embedder)
+
+    report = latency.run(
+        database_url=None,
+        sizes=[40, 20],
+        dims=16,
+        top_k=3,
+        queries=5,
+        resubmit_ratio=0.4,
+        batch_size=4,
+        batch_rounds=2,
+        concurrency=[1, 2],
+        seed_batch_size=8,
+        reset=False,
+        log=lambda msg: None,
+    )
+
+    assert [r["corpus_size"] for r in report["results"]] == [20, 40]
+    for r in report["results"]:
+        assert r["compute_one"]["count"] == 5
+        assert r["search"]["function"] == "python_topk"
+        assert r["batch"]["count"] == 2
+        assert [c["errors"] for c in r["concurrency"]] == [0, 0]
+        assert all(c["count"] == 5 for c in r["concurrency"])
+
+    lines = latency.compare(report, report)
+    assert len(lines) > 1 and all(line.endswith("+0.0%") for line in lines[1:])
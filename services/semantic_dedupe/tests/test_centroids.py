@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from app.db import refresh_centroids
+from test_batch import CLAIMS, clustered  # noqa: F401
+
+
+def _centroids(db):
+    rows = db.execute(text("SELECT cluster_id, centroid_sum, member_count FROM claim_cluster")).fetchall()
+    return {int(k): (np.asarray(json.loads(s)) if s else None, int(n)) for k, s, n in rows}
+
+
+def _expected(db):
+    rows = db.execute(
+        text(
+            """
+            SELECT m.cluster_id, e.embedding
+            FROM claim_cluster_member m JOIN claim_embedding e ON e.claim_id = m.claim_id
+            """
+        )
+    ).fetchall()
+    out = {}
+    for k, emb in rows:
+        total, n = out.get(int(k), (0.0, 0))
+        out[int(k)] = (total + np.asarray(json.loads(emb)), n + 1)
+    return out
+
+
+def _assert_maintained(db):
+    got, expected = _centroids(db), _expected(db)
+    assert got.keys() == expected.keys()
+    for k, (total, n) in expected.items():
+        assert got[k][1] == n
+        assert got[k][0] == pytest.approx(total, abs=1e-6)
+
+
+def test_single_checks_maintain_centroids(db_session, clustered):  # noqa: F811
+    for claim in CLAIMS:
+        clustered.compute_one(db_session, claim, 3)
+
+    _assert_maintained(db_session)
+    assert max(n for _, n in _centroids(db_session).values()) > 1
+
+
+def test_batch_checks_maintain_centroids(db_session, clustered):  # noqa: F811
+    clustered.compute_batch(db_session, CLAIMS[:4], top_k=3)
+    clustered.compute_batch(db_session, CLAIMS[4:], top_k=3)
+
+    _assert_maintained(db_session)
+
+
+def test_refresh_recomputes_from_members(db_session, clustered):  # noqa: F811
+    clustered.compute_batch(db_session, CLAIMS, top_k=3)
+    db_session.execute(text("UPDATE claim_cluster SET centroid_sum = NULL, member_count = 0"))
+
+    assert refresh_centroids(db_session) == len(_expected(db_session))
+    _assert_maintained(db_session)
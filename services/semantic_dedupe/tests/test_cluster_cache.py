@@ -0,0 +1,125 @@
+from sqlalchemy import event, text
+
+from app.cluster_cache import ClusterCache, get_cluster_cache
+from app.db import assign_claim_to_cluster, fetch_claim_text
+
+
+def _claim(db, claim_id, claim_text):
+    db.execute(
+        text("INSERT INTO claim (claim_id, claim_text, content_hash) VALUES (:id, :t, :h)"),
+        {"id": claim_id, "t": claim_text, "h": f"h{claim_id}"},
+    )
+    db.commit()
+
+
+def _count_queries(db):
+    seen = []
+
+    def before(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith(("SELECT", "INSERT")):
+            seen.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", before)
+    return seen
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ClusterCache(2)
+    cache.remember(claim_id=1, cluster_id=10)
+    cache.remember(claim_id=2, cluster_id=20)
+    assert cache.cluster_of(1) == 10  # 1 is now most recent
+    cache.remember(claim_id=3, cluster_id=30)
+
+    assert cache.cluster_of(2) is None
+    assert cache.cluster_of(1) == 10
+    assert cache.cluster_of(3) == 30
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ClusterCache(0)
+    cache.remember(claim_id=1, cluster_id=10, canonical_claim_id=1)
+    cache.remember_text(1, "a")
+    assert cache.cluster_of(1) is None
+    assert cache.text_of(1) is None
+
+
+def test_repeat_assignment_and_canonical_text_need_no_queries(db_session):
+    _claim(db_session, 1, "Canonical claim.")
+    _claim(db_session, 2, "Near duplicate claim.")
+
+    first = assign_claim_to_cluster(
+        db_session,
+        claim_id=1,
+        best_match_claim_id=None,
+        best_match_similarity=0.0,
+        join_threshold=0.8,
+    )
+    assert fetch_claim_text(db_session, first["canonical_claim_id"]) == "Canonical claim."
+
+    queries = _count_queries(db_session)
+
+    # Joining a known cluster: claim 2's own membership check, then the
+    # member row insert.
+    joined = assign_claim_to_cluster(
+        db_session,
+        claim_id=2,
+        best_match_claim_id=1,
+        best_match_similarity=0.9,
+        join_threshold=0.8,
+    )
+    assert joined["cluster_id"] == first["cluster_id"]
+    assert [q.lstrip().split()[0].upper() for q in queries] == ["SELECT", "INSERT"]
+
+    del queries[:]
+    again = assign_claim_to_cluster(
+        db_session,
+        claim_id=2,
+        best_match_claim_id=1,
+        best_match_similarity=0.9,
+        join_threshold=0.8,
+    )
+    assert again == {**joined, "assigned": False}
+    assert fetch_claim_text(db_session, again["canonical_claim_id"]) == "Canonical claim."
+    assert queries == []
+
+
+def test_facts_from_an_older_epoch_are_not_cached():
+    cache = ClusterCache(10)
+    cache.set_epoch(1)
+    cache.remember(claim_id=1, cluster_id=10, epoch=1)
+
+    # A rebuild is noticed while a read from the old layout is in flight.
+    cache.set_epoch(2)
+    cache.remember(claim_id=2, cluster_id=20, epoch=1)
+    assert cache.cluster_of(1) is None
+    assert cache.cluster_of(2) is None
+
+    # A read that already saw a newer epoch moves the cache forward.
+    cache.remember(claim_id=3, cluster_id=30, epoch=3)
+    assert cache.epoch == 3 and cache.cluster_of(3) == 30
+
+
+def test_assignment_reads_tag_the_epoch(db_session):
+    _claim(db_session, 1, "Canonical claim.")
+    cache = get_cluster_cache(db_session)
+    db_session.execute(text("UPDATE claim_cluster_epoch SET epoch = 5"))
+    db_session.commit()
+
+    # The cache hasn't polled yet, but the assignment read saw epoch 5.
+    assign_claim_to_cluster(
+        db_session, claim_id=1, best_match_claim_id=None, best_match_similarity=0.0, join_threshold=0.8
+    )
+    assert cache.epoch == 5 and cache.cluster_of(1) is not None
+
+
+def test_works_without_the_epoch_table(db_session):
+    db_session.execute(text("DROP TABLE claim_cluster_epoch"))
+    db_session.commit()
+    _claim(db_session, 1, "Canonical claim.")
+
+    first = assign_claim_to_cluster(
+        db_session, claim_id=1, best_match_claim_id=None, best_match_similarity=0.0, join_threshold=0.8
+    )
+    cache = get_cluster_cache(db_session)
+    assert cache.epoch is None
+    assert cache.cluster_of(1) == first["cluster_id"]
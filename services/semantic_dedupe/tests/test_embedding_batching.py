@@ -0,0 +1,47 @@
+from app.db import get_or_create_claim_with_embedding, get_or_create_claims_bulk
+from app.embedding.openai_provider import chunk_inputs
+from app.embedding.stub_provider import StubEmbeddingProvider
+from app.hashing import content_hash
+
+
+class CountingProvider(StubEmbeddingProvider):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def embed_many(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_many(texts)
+
+
+def test_chunk_inputs_respects_item_and_token_limits():
+    texts = ["x" * 30] * 7
+    assert [len(c) for c in chunk_inputs(texts, max_items=3, max_tokens=10_000)] == [3, 3, 1]
+    assert [len(c) for c in chunk_inputs(texts, max_items=100, max_tokens=25)] == [2, 2, 2, 1]
+
+
+def test_chunk_inputs_oversized_text_gets_own_chunk():
+    chunks = list(chunk_inputs(["a", "b" * 300, "c"], max_items=10, max_tokens=5))
+    assert chunks == [["a"], ["b" * 300], ["c"]]
+
+
+def test_stub_embed_many_matches_embed(embedder):
+    texts = ["one", "two", "three"]
+    assert embedder.embed_many(texts) == [embedder.embed(t) for t in texts]
+
+
+def test_bulk_create_embeds_only_new_claims_once(db_session):
+    provider = CountingProvider()
+    known_id, _ = get_or_create_claim_with_embedding(db_session, claim_text="Known claim.", embedder=provider)
+
+    out = get_or_create_claims_bulk(
+        db_session,
+        claim_texts=["known claim", "New claim A", "new claim a!", "New claim B"],
+        embedder=provider,
+    )
+
+    assert provider.calls == [["New claim A", "New claim B"]]
+    assert [c["created"] for c in out] == [False, True, False, True]
+    assert out[0]["claim_id"] == known_id
+    assert out[1]["claim_id"] == out[2]["claim_id"]
+    assert out[1]["hash"] == content_hash("New claim A")
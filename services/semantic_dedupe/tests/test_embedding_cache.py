@@ -0,0 +1,133 @@
+import numpy as np
+
+from app.embedding.cache import CachedEmbeddingProvider, DiskEmbeddingCache, LRUEmbeddingCache
+from app.embedding.stub_provider import StubEmbeddingProvider
+
+
+class CountingProvider(StubEmbeddingProvider):
+    def __init__(self):
+        super().__init__(dims=8)
+        self.embedded = []
+
+    def embed(self, text):
+        self.embedded.append(text)
+        return super().embed(text)
+
+
+def test_memory_tier_hits_on_normalized_text():
+    inner = CountingProvider()
+    cached = CachedEmbeddingProvider(inner, memory=LRUEmbeddingCache(1 << 20))
+
+    a = cached.embed("Nuclear energy is safe.")
+    b = cached.embed("nuclear energy is safe")
+
+    assert np.allclose(a, b)  # the memory tier keeps float32
+    assert inner.embedded == ["Nuclear energy is safe."]
+    assert cached.stats() == {"memory_hits": 1, "disk_hits": 0, "misses": 1}
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    inner = CountingProvider()
+
+    first = CachedEmbeddingProvider(inner, disk=DiskEmbeddingCache(path, 1 << 20))
+    vec = first.embed("Water is wet.")
+    first.disk.close()
+
+    second = CachedEmbeddingProvider(inner, disk=DiskEmbeddingCache(path, 1 << 20))
+    again = second.embed("Water is wet.")
+
+    assert inner.embedded == ["Water is wet."]
+    assert second.stats()["disk_hits"] == 1
+    assert all(abs(x - y) < 1e-6 for x, y in zip(vec, again))
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    disk = DiskEmbeddingCache(str(tmp_path / "cache.sqlite3"), max_bytes=3 * 32)
+    for i in range(3):
+        disk.put(f"k{i}", [float(i)] * 8)
+    disk.get("k0")
+    disk.put("k3", [3.0] * 8)
+
+    assert disk.total_bytes <= 3 * 32
+    assert disk.get("k1") is None
+    assert disk.get("k0") is not None
+    assert disk.get("k3") is not None
+
+
+def test_embed_many_only_embeds_misses_once():
+    inner = CountingProvider()
+    cached = CachedEmbeddingProvider(inner, memory=LRUEmbeddingCache(1 << 20))
+    cached.embed("a")
+
+    out = cached.embed_many(["a", "b", "B!", "c"])
+
+    assert inner.embedded == ["a", "b", "c"]
+    assert out[1] == out[2]
+    assert cached.stats() == {"memory_hits": 1, "disk_hits": 0, "misses": 3}
+
+
+def test_disk_tier_cap_is_shared_by_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    a = DiskEmbeddingCache(path, max_bytes=4 * 32)
+    b = DiskEmbeddingCache(path, max_bytes=4 * 32)
+    for i in range(3):
+        a.put(f"a{i}", [float(i)] * 8)
+    for i in range(3):
+        b.put(f"b{i}", [float(i)] * 8)
+
+    # Each process wrote under the cap, together they were over it.
+    assert a.total_bytes == b.total_bytes <= 4 * 32
+    assert a.get("a0") is None
+    assert b.get("b2") is not None
+
+
+def test_disk_tier_batches_access_times(tmp_path):
+    disk = DiskEmbeddingCache(str(tmp_path / "cache.sqlite3"), max_bytes=1 << 20)
+    disk.put("k", [1.0] * 8)
+    statements = []
+    disk._conn.set_trace_callback(statements.append)
+    for _ in range(10):
+        assert disk.get("k") is not None
+    assert not [s for s in statements if s.lstrip().upper().startswith("UPDATE")]
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    cache = LRUEmbeddingCache(max_bytes=3 * 32)
+    for i in range(4):
+        cache.put(f"k{i}", [float(i)] * 8)
+
+    assert len(cache) == 3 and cache.total_bytes == 3 * 32
+    assert cache.get("k0") is None
+    assert cache.get("k3") == [3.0] * 8
+
+
+def test_async_disk_io_runs_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+
+    threads = []
+
+    class RecordingDisk(DiskEmbeddingCache):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def put(self, key, vec):
+            threads.append(threading.get_ident())
+            super().put(key, vec)
+
+    cached = CachedEmbeddingProvider(
+        CountingProvider(), disk=RecordingDisk(str(tmp_path / "cache.sqlite3"), 1 << 20)
+    )
+
+    async def run():
+        loop_thread = threading.get_ident()
+        await cached.aembed("a")
+        await cached.aembed_many(["a", "b"])
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 5  # get a, put a, get a, get b, put b
+    assert loop_thread not in threads
+    assert cached.stats() == {"memory_hits": 0, "disk_hits": 1, "misses": 2}
@@ -0,0 +1,83 @@
+import numpy as np
+
+from app.hnsw import HNSWIndex
+from app.vector_index import EmbeddingMatrix
+
+
+def _random_unit(n, dims, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, dims)).astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def test_hnsw_recall_against_bruteforce():
+    X = _random_unit(600, 32)
+    exact = EmbeddingMatrix()
+    index = HNSWIndex(M=8, ef_construction=64, ef_search=64)
+    for cid, vec in enumerate(X, start=1):
+        exact.add(cid, vec)
+        index.add(cid, vec)
+
+    queries = _random_unit(50, 32, seed=1)
+    truth = exact.search_many(queries, 10)
+    approx = index.search_many(queries, 10)
+
+    hits = sum(len({c for c, _ in t} & {c for c, _ in a}) for t, a in zip(truth, approx))
+    assert hits / (50 * 10) >= 0.9
+
+
+def test_hnsw_exclude_and_discard():
+    X = _random_unit(50, 8)
+    index = HNSWIndex(M=4, ef_construction=32, ef_search=16)
+    for cid, vec in enumerate(X, start=1):
+        index.add(cid, vec)
+
+    assert index.search(X[0], 1)[0][0] == 1
+    assert 1 not in [c for c, _ in index.search(X[0], 5, exclude=(1,))]
+
+    assert index.discard([1]) == 1
+    assert 1 not in index and len(index) == 49
+    assert 1 not in [c for c, _ in index.search(X[0], 5)]
+
+
+def test_hnsw_save_load_roundtrip(tmp_path):
+    X = _random_unit(100, 16)
+    path = str(tmp_path / "index.npz")
+    index = HNSWIndex(M=6, ef_construction=32, ef_search=32, path=path)
+    for cid, vec in enumerate(X, start=1):
+        index.add(cid, vec)
+    index.discard([5])
+    index.save()
+
+    loaded = HNSWIndex.load(path)
+    assert loaded.model == index.model
+    assert len(loaded) == len(index)
+    assert 5 not in loaded
+    queries = _random_unit(10, 16, seed=2)
+    assert loaded.search_many(queries, 5) == index.search_many(queries, 5)
+
+    assert loaded.add(101, X[0]) is True
+    assert loaded.search(X[0], 2)[0][0] in (1, 101)
+
+
+def test_hnsw_compacts_tombstones_and_saves_off_the_insert_path(tmp_path, monkeypatch):
+    import app.hnsw as hnsw
+
+    monkeypatch.setattr(hnsw, "HNSW_SAVE_EVERY", 10)
+    X = _random_unit(60, 16, seed=3)
+    path = str(tmp_path / "index.npz")
+    index = HNSWIndex(M=6, ef_construction=32, ef_search=16, path=path)
+    for cid, vec in enumerate(X, start=1):
+        index.add(cid, vec)
+    # Inserts never write the file themselves
+    assert not list(tmp_path.iterdir())
+
+    index.discard(range(1, 31))
+    index.maintain()
+    assert index._deleted == set() and index._size == 30 and len(index) == 30
+    assert index.search(X[40], 1)[0][0] == 41
+    assert all(cid > 30 for cid, _ in index.search(X[0], 10))
+
+    # Checkpointed once, through a unique temp file that is gone afterwards
+    assert [p.name for p in tmp_path.iterdir()] == ["index.npz"]
+    assert len(HNSWIndex.load(path)) == 30
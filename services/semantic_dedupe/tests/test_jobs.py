@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import text
+
+from app.jobs import claim_jobs, enqueue_job, fetch_job
+from app.worker import process_jobs
+from test_batch import CLAIMS, ClusteredStubProvider
+
+
+@pytest.fixture()
+def clustered(monkeypatch):
+    import app.api as api
+
+    monkeypatch.setattr(api, "embedder", ClusteredStubProvider())
+    return api
+
+
+def test_worker_results_match_sync(db_session, make_db_session, clustered):
+    job_ids = [enqueue_job(db_session, claim_text=t, top_k=2) for t in CLAIMS]
+    assert fetch_job(db_session, job_ids[0])["status"] == "queued"
+
+    assert process_jobs(db_session, batch_size=4) == 4
+    assert process_jobs(db_session, batch_size=4) == 3
+    assert process_jobs(db_session, batch_size=4) == 0
+
+    seq_db = make_db_session()
+    for job_id, t in zip(job_ids, CLAIMS):
+        job = fetch_job(db_session, job_id)
+        expected = clustered.compute_one(seq_db, t, 2)
+        assert job["status"] == "done" and job["attempts"] == 1
+        assert job["claim_id"] == expected["claim_id"]
+        assert job["result"]["classification"] == expected["classification"]
+        assert job["result"]["cluster_id"] == expected["cluster_id"]
+        assert len(job["result"]["similar"]) <= 2
+
+
+def test_failed_jobs_are_retried_then_failed(db_session, monkeypatch):
+    import app.api as api
+
+    class Failing(ClusteredStubProvider):
+        def embed(self, text):
+            if "poison" in text:
+                raise RuntimeError("provider rejected input")
+            return super().embed(text)
+
+    monkeypatch.setattr(api, "embedder", Failing())
+    good = enqueue_job(db_session, claim_text="Coffee improves focus.", top_k=3)
+    bad = enqueue_job(db_session, claim_text="poison pill", top_k=3)
+
+    # The bad job must not take its batch neighbour down with it.
+    process_jobs(db_session, batch_size=10, max_attempts=2)
+    assert fetch_job(db_session, good)["status"] == "done"
+    assert fetch_job(db_session, bad)["status"] == "queued"
+
+    process_jobs(db_session, batch_size=10, max_attempts=2)
+    job = fetch_job(db_session, bad)
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert "provider rejected input" in job["error"]
+
+
+def test_expired_leases_are_reclaimed(db_session):
+    job_id = enqueue_job(db_session, claim_text="x", top_k=1)
+    assert [j["job_id"] for j in claim_jobs(db_session, limit=5, lease_seconds=300, max_attempts=3)] == [job_id]
+    assert claim_jobs(db_session, limit=5, lease_seconds=300, max_attempts=3) == []
+
+    reclaimed = claim_jobs(db_session, limit=5, lease_seconds=0, max_attempts=3)
+    assert [(j["job_id"], j["attempts"]) for j in reclaimed] == [(job_id, 2)]
+
+
+def test_failed_completion_is_rolled_back(db_session, clustered, monkeypatch):
+    import app.worker as worker
+
+    good = enqueue_job(db_session, claim_text="Coffee improves focus.", top_k=3)
+    bad = enqueue_job(db_session, claim_text="Exercise helps sleep.", top_k=3)
+
+    def complete_jobs(db, results):
+        if any(r["job_id"] == bad for r in results):
+            # Half-written before the failure, e.g. a lost connection on commit
+            db.execute(
+                text("UPDATE claim_embedding_job SET result = '{\"partial\": true}' WHERE job_id = :id"),
+                {"id": bad},
+            )
+            raise RuntimeError("connection lost")
+        real_complete_jobs(db, results)
+
+    real_complete_jobs = worker.complete_jobs
+    monkeypatch.setattr(worker, "complete_jobs", complete_jobs)
+
+    assert process_jobs(db_session, batch_size=10, max_attempts=2) == 2
+    assert fetch_job(db_session, good)["status"] == "done"
+    job = fetch_job(db_session, bad)
+    assert job["status"] == "queued" and job["result"] is None
+    assert "connection lost" in job["error"]
@@ -0,0 +1,192 @@
+import pytest
+from sqlalchemy import text
+
+from app import lexical
+from app.hashing import content_hash
+from app.embedding.stub_provider import StubEmbeddingProvider
+
+ORIGINAL = "The city council approved the new public transit budget for the next fiscal year on Tuesday."
+TYPO = "The city counsil approved the new public transit budget for the next fiscal year on Tuesday."
+SWAPPED = "On Tuesday the city council approved the new public transit budget for the next fiscal year."
+NEGATED = "The city council did not approve the new public transit budget for the next fiscal year on Tuesday."
+OTHER = "Coffee improves focus during long meetings."
+REPORT = (
+    "Average household energy consumption in the northern region increased significantly "
+    "over the last decade, according to the regional utility commission's annual report."
+)
+FLIPPED = REPORT.replace("increased", "decreased")
+
+
+class CountingProvider(StubEmbeddingProvider):
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def embed(self, text):
+        self.texts.append(text)
+        return super().embed(text)
+
+    def embed_many(self, texts):
+        self.texts.extend(texts)
+        return [super(CountingProvider, self).embed(t) for t in texts]
+
+
+@pytest.fixture()
+def prefiltered(monkeypatch):
+    import app.api as api
+    import app.db as db
+
+    monkeypatch.setattr(api, "LEXICAL_PREFILTER", True)
+    monkeypatch.setattr(db, "LEXICAL_PREFILTER", True)
+    provider = CountingProvider()
+    monkeypatch.setattr(api, "embedder", provider)
+    return api, provider
+
+
+def test_similarity_catches_variants_but_not_meaning_changes():
+    assert lexical.similarity(ORIGINAL, TYPO) >= 0.92
+    assert lexical.similarity(ORIGINAL, SWAPPED) >= 0.92
+    assert lexical.similarity(ORIGINAL, NEGATED) == 0.0
+    assert lexical.similarity("Unemployment rose 5 percent.", "Unemployment rose 6 percent.") == 0.0
+    assert lexical.similarity(ORIGINAL, OTHER) < 0.2
+    # One substituted word in a long claim changes few shingles but is not
+    # a typo.
+    assert len(REPORT) > 160
+    assert lexical.similarity(REPORT, FLIPPED) == 0.0
+    assert lexical.match(REPORT, FLIPPED, 0.5) == 0.0
+
+    # A typo in a short claim costs more of its shingles; the threshold
+    # scales with length. A short reordering still has to clear it.
+    assert lexical.similarity("Vaccines cause immunity.", "Vacines cause immunity.") < 0.92
+    assert lexical.match("Vaccines cause immunity.", "Vacines cause immunity.", 0.92) > 0.0
+    assert lexical.match("Dog bites man.", "Man bites dog.", 0.92) == 0.0
+    assert lexical.token_edits(ORIGINAL, "The city council approved new public transit budget for next fiscal year on Tuesday.") == 2
+
+    # Near-duplicates share LSH buckets; unrelated claims don't.
+    assert set(lexical.band_buckets(ORIGINAL)) & set(lexical.band_buckets(TYPO))
+    assert not set(lexical.band_buckets(ORIGINAL)) & set(lexical.band_buckets(OTHER))
+
+
+def test_variant_is_answered_without_embedding(db_session, prefiltered):
+    api, provider = prefiltered
+    first = api.compute_one(db_session, ORIGINAL, 3)
+    assert provider.texts == [ORIGINAL]
+
+    hit = api.compute_one(db_session, TYPO, 3)
+    assert provider.texts == [ORIGINAL]
+    assert hit["match"] == "lexical"
+    assert hit["classification"] == "duplicate"
+    assert hit["hash"] == content_hash(TYPO) and hit["claim_id"] is None
+    assert hit["duplicate_of"]["claim_id"] == first["claim_id"]
+    assert hit["duplicate_of"]["hash"] == first["hash"]
+    assert hit["created"] is False
+    assert hit["cluster_id"] == first["cluster_id"]
+    assert hit["canonical_claim"] == first["canonical_claim"]
+    assert hit["similar"][0]["text"] == ORIGINAL
+    # The variant itself is not stored
+    assert db_session.execute(text("SELECT COUNT(*) FROM claim")).scalar() == 1
+
+    # Exact resubmission and meaning changes take the normal path.
+    again = api.compute_one(db_session, ORIGINAL, 3)
+    assert "match" not in again and again["claim_id"] == first["claim_id"]
+    negated = api.compute_one(db_session, NEGATED, 3)
+    assert "match" not in negated and negated["created"] is True
+    assert provider.texts == [ORIGINAL, NEGATED]
+
+
+def test_antonym_flip_is_not_a_lexical_duplicate(db_session, prefiltered):
+    api, provider = prefiltered
+    api.compute_one(db_session, REPORT, 3)
+    # Shares LSH buckets with REPORT, but must go through the embedding path
+    assert set(lexical.band_buckets(REPORT)) & set(lexical.band_buckets(FLIPPED))
+
+    flipped = api.compute_one(db_session, FLIPPED, 3)
+    assert "match" not in flipped and flipped["created"] is True
+    assert provider.texts == [REPORT, FLIPPED]
+
+
+def test_batch_embeds_only_claims_without_lexical_match(db_session, prefiltered):
+    api, provider = prefiltered
+    api.compute_batch(db_session, [ORIGINAL], top_k=3)
+    del provider.texts[:]
+
+    results = api.compute_batch(db_session, [OTHER, SWAPPED, TYPO, OTHER], top_k=3)
+
+    assert provider.texts == [OTHER]
+    assert [r.get("match") for r in results] == [None, "lexical", "lexical", None]
+    assert results[1]["duplicate_of"]["claim_id"] == results[2]["duplicate_of"]["claim_id"]
+    assert results[0]["created"] is True and results[3]["created"] is False
+
+
+def test_backfill_buckets_existing_claims(db_session, embedder):
+    from app.db import find_lexical_duplicates, get_or_create_claim_with_embedding, assign_claim_to_cluster
+    from app.lexical_backfill import backfill_batch
+
+    claim_id, _ = get_or_create_claim_with_embedding(db_session, claim_text=ORIGINAL, embedder=embedder)
+    assign_claim_to_cluster(
+        db_session, claim_id=claim_id, best_match_claim_id=None, best_match_similarity=0.0, join_threshold=0.85
+    )
+    assert find_lexical_duplicates(db_session, [TYPO], min_similarity=0.92) == {}
+
+    assert backfill_batch(db_session, after=0, batch_size=10) == [claim_id]
+    assert backfill_batch(db_session, after=claim_id, batch_size=10) == []
+
+    match = find_lexical_duplicates(db_session, [TYPO], min_similarity=0.92)
+    assert [m["claim_id"] for m in match.values()] == [claim_id]
+
+
+def test_texts_are_verified_only_against_their_own_buckets(db_session, prefiltered, monkeypatch):
+    from app.db import find_lexical_duplicates
+
+    api, _ = prefiltered
+    api.compute_batch(db_session, [ORIGINAL, OTHER], top_k=3)
+    other_typo = OTHER.replace("during", "durng")
+    assert set(lexical.band_buckets(OTHER)) & set(lexical.band_buckets(other_typo))
+
+    compared = []
+    match = lexical.match
+
+    def recording_match(a, b, min_similarity):
+        compared.append((a, b))
+        return match(a, b, min_similarity)
+
+    monkeypatch.setattr(lexical, "match", recording_match)
+    found = find_lexical_duplicates(db_session, [TYPO, other_typo], min_similarity=0.5)
+
+    assert sorted(compared) == sorted([(TYPO, ORIGINAL), (other_typo, OTHER)])
+    assert found[content_hash(TYPO)]["text"] == ORIGINAL
+    assert found[content_hash(other_typo)]["text"] == OTHER
+
+
+def test_async_checks_run_the_prefilter_once(make_async_db_session, prefiltered, monkeypatch):
+    import asyncio
+
+    api, provider = prefiltered
+    calls = []
+    find = api.find_lexical_duplicates
+
+    def counting_find(db, claim_texts, **kwargs):
+        calls.append(list(claim_texts))
+        return find(db, claim_texts, **kwargs)
+
+    monkeypatch.setattr(api, "find_lexical_duplicates", counting_find)
+
+    async def run():
+        db = await make_async_db_session()
+        try:
+            await api.check_duplicate(api.CheckDuplicateRequest(claim_text=ORIGINAL, top_k=3), db)
+            hit = await api.check_duplicate(api.CheckDuplicateRequest(claim_text=TYPO, top_k=3), db)
+            batch = await api.check_duplicate_batch(
+                api.BatchCheckDuplicateRequest(claims=[SWAPPED, OTHER], top_k=3), db
+            )
+            return hit, batch["results"]
+        finally:
+            await db.close()
+            await db.bind.dispose()
+
+    hit, results = asyncio.run(run())
+    assert hit["match"] == "lexical"
+    assert [r.get("match") for r in results] == ["lexical", None]
+    assert provider.texts == [ORIGINAL, OTHER]
+    # One prefilter run per request
+    assert calls == [[ORIGINAL], [TYPO], [SWAPPED, OTHER]]
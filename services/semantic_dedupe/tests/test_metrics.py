@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import create_engine
+
+from app.embedding.cache import CachedEmbeddingProvider, LRUEmbeddingCache
+from app.embedding.microbatch import MicroBatchingProvider
+from app.embedding.stub_provider import StubEmbeddingProvider
+
+STAGES = ("hash_lookup", "embed", "search", "cluster_assign", "canonical_fetch")
+
+
+def _stage_counts(name="semantic_dedupe_stage_seconds_count"):
+    return {s: REGISTRY.get_sample_value(name, {"stage": s}) or 0.0 for s in STAGES}
+
+
+class FailingProvider(StubEmbeddingProvider):
+    def embed(self, text):
+        raise RuntimeError("provider down")
+
+
+def test_compute_one_observes_each_stage(db_session, embedder, monkeypatch):
+    import app.api as api
+
+    monkeypatch.setattr(api, "embedder", embedder)
+
+    before = _stage_counts()
+    api.compute_one(db_session, "Vaccines cause immunity.", 3)
+    after_new = _stage_counts()
+    assert all(after_new[s] > before[s] for s in STAGES)
+
+    # A resubmission is answered by the hash lookup: no embedding
+    api.compute_one(db_session, "Vaccines cause immunity.", 3)
+    after_existing = _stage_counts()
+    assert after_existing["embed"] == after_new["embed"]
+    assert after_existing["hash_lookup"] > after_new["hash_lookup"]
+
+
+def test_provider_errors_are_counted(db_session, monkeypatch):
+    import app.api as api
+
+    monkeypatch.setattr(api, "embedder", FailingProvider())
+
+    before = _stage_counts("semantic_dedupe_stage_errors_total")
+    with pytest.raises(RuntimeError, match="provider down"):
+        api.compute_one(db_session, "Nuclear power is safe.", 3)
+    after = _stage_counts("semantic_dedupe_stage_errors_total")
+
+    assert after["embed"] == before["embed"] + 1
+    assert after["search"] == before["search"]
+
+
+def test_metrics_endpoint(monkeypatch, tmp_path):
+    import app.api as api
+    import app.db as db
+
+    engine = create_engine(f"sqlite+pysqlite:///{tmp_path / 'pool.db'}", future=True)
+    monkeypatch.setattr(db, "_engine", engine)
+    held = engine.connect()
+
+    provider = CachedEmbeddingProvider(
+        MicroBatchingProvider(StubEmbeddingProvider(), max_items=4, max_wait_ms=1),
+        memory=LRUEmbeddingCache(1 << 20),
+        disk=None,
+    )
+    monkeypatch.setattr(api, "embedder", provider)
+
+    async def embed():
+        await asyncio.gather(*(provider.aembed(f"claim {i}") for i in range(6)))
+        await provider.aembed("claim 0")
+
+    asyncio.run(embed())
+
+    client = TestClient(api.app)
+    assert client.get("/health").status_code == 200
+    resp = client.get("/metrics")
+    held.close()
+    engine.dispose()
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+
+    samples = {
+        (s.name, tuple(sorted(s.labels.items()))): s.value
+        for family in text_string_to_metric_families(resp.text)
+        for s in family.samples
+    }
+    assert samples[
+        ("semantic_dedupe_request_seconds_count", (("method", "GET"), ("route", "/health"), ("status", "200")))
+    ] >= 1
+    assert ("semantic_dedupe_requests_in_flight", ()) in samples
+    assert samples[("semantic_dedupe_embedding_cache_lookups_total", (("result", "memory_hits"),))] == 1
+    assert samples[("semantic_dedupe_embedding_cache_lookups_total", (("result", "misses"),))] == 6
+    assert samples[("semantic_dedupe_embedding_microbatch_size_count", ())] == 2
+    assert samples[("semantic_dedupe_embedding_microbatch_size_bucket", (("le", "+Inf"),))] == 2
+    assert samples[("semantic_dedupe_embedding_microbatch_size_sum", ())] == 6
+    assert samples[("semantic_dedupe_db_pool_checked_out", (("engine", "sync"),))] == 1
+    assert ("semantic_dedupe_cluster_cache_lookups_total", (("result", "hits"),)) in samples
+    assert ("semantic_dedupe_singleflight_calls_total", (("flight", "claims"), ("role", "leader"))) in samples
+
+
+def test_streaming_requests_are_in_flight_until_the_last_chunk():
+    from app.metrics import RequestMetricsMiddleware
+
+    def in_flight():
+        return REGISTRY.get_sample_value("semantic_dedupe_requests_in_flight")
+
+    def seconds():
+        labels = {"method": "POST", "route": "unmatched", "status": "200"}
+        return REGISTRY.get_sample_value("semantic_dedupe_request_seconds_sum", labels) or 0.0
+
+    seen = {}
+
+    async def streaming_app(scope, receive, send):
+        seen["receive"] = receive
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"a", "more_body": True})
+        seen["mid_stream"] = in_flight()
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.body", "body": b"b", "more_body": False})
+        seen["after_last"] = in_flight()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    before, idle = seconds(), in_flight()
+    scope = {"type": "http", "path": "/stream", "method": "POST"}
+    asyncio.run(RequestMetricsMiddleware(streaming_app)(scope, receive, send))
+
+    assert seen["receive"] is receive
+    assert seen["mid_stream"] == idle + 1
+    assert seen["after_last"] == idle
+    assert seconds() - before >= 0.05
+
+
+def test_cancelled_stages_are_not_errors():
+    from app.metrics import stage
+
+    async def cancelled():
+        with stage("embed"):
+            raise asyncio.CancelledError
+
+    before = _stage_counts("semantic_dedupe_stage_errors_total")
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancelled())
+    assert _stage_counts("semantic_dedupe_stage_errors_total") == before
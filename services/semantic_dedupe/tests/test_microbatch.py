@@ -0,0 +1,78 @@
+import asyncio
+
+from app.embedding.microbatch import MicroBatchingProvider
+from app.embedding.stub_provider import StubEmbeddingProvider
+
+
+class RecordingProvider(StubEmbeddingProvider):
+    def __init__(self, fail=False, bad=()):
+        super().__init__(dims=8)
+        self.calls = []
+        self.fail = fail
+        self.bad = set(bad)
+
+    async def aembed_many(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        if self.bad & set(texts):
+            raise RuntimeError("input too long")
+        return self.embed_many(texts)
+
+
+def test_concurrent_calls_are_coalesced():
+    inner = RecordingProvider()
+    batcher = MicroBatchingProvider(inner, max_items=4, max_wait_ms=20)
+    texts = [f"claim {i}" for i in range(6)]
+
+    async def run():
+        return await asyncio.gather(*(batcher.aembed(t) for t in texts))
+
+    vectors = asyncio.run(run())
+    assert vectors == [inner.embed(t) for t in texts]
+    # One flush on reaching max_items, one on the timer for the rest.
+    assert [len(c) for c in inner.calls] == [4, 2]
+
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 2
+    assert stats["batch_size"]["buckets"]["le_4"] == 1
+    assert stats["batch_size"]["buckets"]["le_2"] == 1
+    assert stats["queue_delay_ms"]["count"] == 6
+
+
+def test_errors_fan_out_to_every_caller():
+    inner = RecordingProvider(fail=True)
+    batcher = MicroBatchingProvider(inner, max_items=8, max_wait_ms=1)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.aembed("a"), batcher.aembed("b"), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert inner.calls == [["a", "b"], ["a"], ["b"]]
+
+
+def test_failed_batch_is_bisected_to_the_bad_input():
+    inner = RecordingProvider(bad={"c"})
+    batcher = MicroBatchingProvider(inner, max_items=8, max_wait_ms=1)
+    texts = ["a", "b", "c", "d", "e"]
+
+    async def run():
+        return await asyncio.gather(*(batcher.aembed(t) for t in texts), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert isinstance(results[2], RuntimeError)
+    assert [r for i, r in enumerate(results) if i != 2] == [inner.embed(t) for t in "abde"]
+    assert inner.calls == [texts, ["a", "b"], ["c", "d", "e"], ["c"], ["d", "e"]]
+
+
+def test_large_requests_bypass_the_queue():
+    inner = RecordingProvider()
+    batcher = MicroBatchingProvider(inner, max_items=2, max_wait_ms=50)
+    texts = ["a", "b", "c"]
+    assert asyncio.run(batcher.aembed_many(texts)) == inner.embed_many(texts)
+    assert inner.calls == [texts]
+    assert batcher.stats()["batch_size"]["count"] == 0
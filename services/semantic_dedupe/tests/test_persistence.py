@@ -20,3 +20,182 @@ def test_embedding_reused(db_session, embedder):
     assert created1 is True
     assert created2 is False
 
+
+
+def test_embedding_stored_normalized(db_session, embedder):
+    import json
+    import math
+
+    from sqlalchemy import text as sql
+
+    claim_id, _ = get_or_create_claim_with_embedding(
+        db_session,
+        claim_text="Water boils at 100C at sea level.",
+        embedder=embedder,
+    )
+
+    vec, norm, normalized = db_session.execute(
+        sql("SELECT embedding, embedding_norm, is_normalized FROM claim_embedding WHERE claim_id = :id"),
+        {"id": claim_id},
+    ).fetchone()
+
+    assert normalized
+    assert abs(math.sqrt(sum(x * x for x in json.loads(vec))) - 1.0) < 1e-9
+    raw = embedder.embed("Water boils at 100C at sea level.")
+    assert abs(norm - math.sqrt(sum(x * x for x in raw))) < 1e-9
+
+
+def test_losing_insert_race_returns_winner_without_embedding(db_session, embedder, monkeypatch):
+    import app.db as db_module
+
+    winner_id, _ = get_or_create_claim_with_embedding(
+        db_session,
+        claim_text="Tides are caused by the moon.",
+        embedder=embedder,
+    )
+
+    # The pre-insert lookup misses, as if another replica committed the
+    # claim after we checked.
+    monkeypatch.setattr(db_module, "_lookup_claim_states", _miss_then_real(db_module._lookup_claim_states, 1))
+
+    class NoEmbed:
+        def embed(self, text):
+            raise AssertionError("loser must not call the provider")
+
+    claim_id, created = get_or_create_claim_with_embedding(
+        db_session,
+        claim_text="Tides are caused by the moon",
+        embedder=NoEmbed(),
+    )
+    assert (claim_id, created) == (winner_id, False)
+
+
+def test_embedder_runs_outside_transaction(db_session):
+    class Probe:
+        def __init__(self):
+            self.open = []
+
+        def embed(self, text):
+            self.open.append(db_session.in_transaction())
+            return [1.0, 0.0]
+
+    probe = Probe()
+    get_or_create_claim_with_embedding(db_session, claim_text="Mars has two moons.", embedder=probe)
+    assert probe.open == [False]
+
+
+def test_reserved_claim_waits_for_owner(db_session, embedder, monkeypatch):
+    import app.db as db_module
+
+    claim_id = _reserve(db_session, "Glass is an amorphous solid.")
+
+    # The owner stores its embedding while we poll.
+    def owner_finishes(_seconds):
+        db_module._insert_embeddings(db_session, [(claim_id, [1.0, 0.0], 1.0)])
+        db_session.commit()
+
+    monkeypatch.setattr(db_module.time, "sleep", owner_finishes)
+
+    class NoEmbed:
+        def embed(self, text):
+            raise AssertionError("waiter must not call the provider")
+
+    got = get_or_create_claim_with_embedding(
+        db_session,
+        claim_text="Glass is an amorphous solid.",
+        embedder=NoEmbed(),
+    )
+    assert got == (claim_id, False)
+
+
+def test_stale_reservation_is_taken_over(db_session, embedder, monkeypatch):
+    import app.db as db_module
+
+    claim_id = _reserve(db_session, "Honey never spoils.")
+    monkeypatch.setattr(db_module, "CLAIM_LOCK_TIMEOUT_MS", 0)
+
+    got = get_or_create_claim_with_embedding(db_session, claim_text="Honey never spoils.", embedder=embedder)
+    assert got == (claim_id, True)
+
+
+def test_failed_embedding_releases_reservation(db_session, embedder):
+    import pytest
+    from sqlalchemy import text as sql
+
+    class Failing:
+        def embed(self, text):
+            raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        get_or_create_claim_with_embedding(db_session, claim_text="Bats are mammals.", embedder=Failing())
+    assert db_session.execute(sql("SELECT COUNT(*) FROM claim")).scalar() == 0
+
+    _, created = get_or_create_claim_with_embedding(db_session, claim_text="Bats are mammals.", embedder=embedder)
+    assert created is True
+
+
+def test_bulk_stores_embedding_for_reserved_claim(db_session, embedder):
+    from app.db import get_or_create_claims_bulk
+
+    claim_id = _reserve(db_session, "Sound travels faster in water.")
+    [claim] = get_or_create_claims_bulk(
+        db_session,
+        claim_texts=["Sound travels faster in water."],
+        embedder=embedder,
+    )
+    assert claim["claim_id"] == claim_id
+    assert claim["created"] is True
+    assert claim["embedding"] is not None
+
+
+def _reserve(db, claim_text):
+    """Insert a bare claim row, as a request still embedding it would."""
+    from sqlalchemy import text as sql
+
+    from app.hashing import content_hash
+
+    claim_id = db.execute(
+        sql("INSERT INTO claim (claim_text, content_hash) VALUES (:t, :h) RETURNING claim_id"),
+        {"t": claim_text, "h": content_hash(claim_text)},
+    ).scalar()
+    db.commit()
+    return claim_id
+
+
+def _miss_then_real(lookup, misses):
+    calls = {"n": 0}
+
+    def patched(db, hashes):
+        calls["n"] += 1
+        return {} if calls["n"] <= misses else lookup(db, hashes)
+
+    return patched
+
+
+def test_embedding_insert_binds_text_for_asyncpg(monkeypatch):
+    from types import SimpleNamespace
+
+    from sqlalchemy.dialects.postgresql import asyncpg
+
+    import app.db as db_module
+
+    dialect = asyncpg.dialect()
+    executed = []
+
+    class RecordingSession:
+        bind = SimpleNamespace(dialect=dialect)
+
+        def execute(self, stmt, params):
+            executed.append((stmt, params))
+            return SimpleNamespace(fetchall=lambda: [(1,)])
+
+    monkeypatch.setattr(db_module, "EMBEDDING_SHADOW_DIMS", 2)
+    assert db_module._insert_embeddings(RecordingSession(), [(1, [0.6, 0.8, 0.0], 1.0)]) == [1]
+
+    stmt, params = executed[0]
+    sql = str(stmt.compile(dialect=dialect))
+    # asyncpg has no pgvector codec: vectors go over the wire as text and
+    # are cast server-side.
+    assert "CAST($3 AS vector)" in sql and "CAST($6 AS vector)" in sql
+    assert params["vec_0"] == "[0.6,0.8,0.0]"
+    assert isinstance(params["short_0"], str)
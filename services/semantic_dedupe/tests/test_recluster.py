@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+from sqlalchemy import text
+
+import app.recluster as recluster
+from app.clustering import component_medoids, threshold_components
+from app.cluster_cache import get_cluster_cache
+from app.config import EMBEDDINGS_MODEL
+from app.db import assign_claim_to_cluster
+
+
+def _unit(rows):
+    x = np.asarray(rows, dtype=np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _claim(db, claim_id, vec):
+    db.execute(
+        text("INSERT INTO claim (claim_id, claim_text, content_hash) VALUES (:id, :t, :h)"),
+        {"id": claim_id, "t": f"Claim {claim_id}.", "h": f"h{claim_id}"},
+    )
+    db.execute(
+        text(
+            "INSERT INTO claim_embedding (claim_id, embedding_model, embedding, embedding_norm, is_normalized) "
+            "VALUES (:id, :m, :e, 1.0, 1)"
+        ),
+        {"id": claim_id, "m": EMBEDDINGS_MODEL, "e": json.dumps([float(v) for v in vec])},
+    )
+    db.commit()
+
+
+def _layout(db):
+    rows = db.execute(
+        text(
+            """
+            SELECT m.claim_id, c.canonical_claim_id
+            FROM claim_cluster_member m JOIN claim_cluster c ON c.cluster_id = m.cluster_id
+            """
+        )
+    ).fetchall()
+    return dict(rows)
+
+
+def test_blocked_components_match_brute_force():
+    rng = np.random.default_rng(7)
+    centers = _unit(rng.standard_normal((12, 16)))
+    x = _unit(np.repeat(centers, 5, axis=0) + 0.15 * rng.standard_normal((60, 16)))
+    x = x[rng.permutation(60)]
+
+    sims = x @ x.T
+    expected = np.arange(60)
+    for _ in range(60):  # label propagation to the smallest reachable row
+        expected = np.min(np.where(sims >= 0.8, expected[None, :], 60), axis=1)
+
+    for block_rows in (1, 7, 64):
+        assert threshold_components(x, 0.8, block_rows=block_rows).tolist() == expected.tolist()
+
+
+def test_medoid_is_the_most_central_member():
+    x = _unit([[1.0, 0.30], [1.0, 0.0], [1.0, -0.25], [0.0, 1.0]])
+    labels = np.array([0, 0, 0, 3])
+    assert component_medoids(x, labels) == {0: 1, 3: 3}
+
+
+def test_recluster_replaces_greedy_layout(db_session):
+    # 1 and 3 are both near 2, but not near each other.
+    vecs = {1: [1.0, 0.45, 0.0], 2: [1.0, 0.0, 0.0], 3: [1.0, -0.45, 0.0], 4: [0.0, 0.0, 1.0]}
+    for cid, vec in vecs.items():
+        _claim(db_session, cid, _unit([vec])[0])
+
+    # Arrival order 1, 3, 2 leaves the greedy path with two clusters.
+    for cid, best, sim in [(1, None, 0.0), (3, None, 0.0), (2, 1, 0.9), (4, None, 0.0)]:
+        assign_claim_to_cluster(
+            db_session, claim_id=cid, best_match_claim_id=best, best_match_similarity=sim, join_threshold=0.85
+        )
+    assert _layout(db_session) == {1: 1, 2: 1, 3: 3, 4: 4}
+    cache = get_cluster_cache(db_session)
+    assert cache.canonical_of(cache.cluster_of(3)) == 3
+
+    clusters, members = recluster.build_clusters(
+        *recluster.load_embeddings(db_session, page_size=2), threshold=0.85
+    )
+    assert clusters == [(2, 2), (4, 4)]
+    recluster.stage(db_session, clusters, members, batch_size=2)
+
+    # Clustered by the service after the load: follows its old canonical.
+    _claim(db_session, 5, _unit([[1.0, 0.5, 0.1]])[0])
+    assign_claim_to_cluster(
+        db_session, claim_id=5, best_match_claim_id=3, best_match_similarity=0.9, join_threshold=0.85
+    )
+
+    stats = recluster.swap(db_session)
+    assert _layout(db_session) == {1: 2, 2: 2, 3: 2, 4: 4, 5: 2}
+    assert stats == {"clusters": 2, "members": 5, "carried": 1, "epoch": 2}
+    assert db_session.execute(text("SELECT COUNT(*) FROM claim_cluster_member_staged")).scalar() == 0
+
+    # The next epoch check drops the cached topology.
+    cache.epoch_checked_at = 0.0
+    assert get_cluster_cache(db_session).cluster_of(3) is None
+
+
+def test_dry_run_writes_nothing(db_session):
+    for cid, vec in {1: [1.0, 0.0], 2: [1.0, 0.1]}.items():
+        _claim(db_session, cid, _unit([vec])[0])
+
+    summary = recluster.run(db_session, threshold=0.9, dims=1, dry_run=True)
+    assert summary == {"claims": 2, "clusters": 1, "multi_member_clusters": 1}
+    assert _layout(db_session) == {}
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import text
+
+import app.reembed as reembed
+from app.config import EMBEDDINGS_MODEL
+from app.db import get_or_create_claim_with_embedding
+from app.embedding.stub_provider import StubEmbeddingProvider
+
+NEW_MODEL = "stub-next"
+
+
+class CountingProvider(StubEmbeddingProvider):
+    def __init__(self, fail_on_call=None):
+        super().__init__(model_name=NEW_MODEL)
+        self.calls = 0
+        self.texts = []
+        self.fail_on_call = fail_on_call
+
+    async def aembed_many(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("provider down")
+        self.texts.extend(texts)
+        # Distinct from the active model's vectors
+        return [list(reversed(v)) for v in self.embed_many(texts)]
+
+
+def _seed(db, embedder, n):
+    return [
+        get_or_create_claim_with_embedding(db, claim_text=f"Claim number {i}.", embedder=embedder)[0]
+        for i in range(n)
+    ]
+
+
+def _models(db):
+    return dict(db.execute(text("SELECT claim_id, embedding_model FROM claim_embedding")).fetchall())
+
+
+def test_backfill_and_promote(db_session, embedder):
+    ids = _seed(db_session, embedder, 7)
+    provider = CountingProvider()
+
+    total = asyncio.run(
+        reembed.backfill(db_session, provider, model=NEW_MODEL, page_size=3, batch_size=2, concurrency=3)
+    )
+    assert total == 7
+    assert reembed.status(db_session, model=NEW_MODEL)["staged"] == 7
+    # Serving is untouched until promotion
+    assert set(_models(db_session).values()) == {EMBEDDINGS_MODEL}
+    # A completed pass resets the checkpoint
+    assert reembed.load_checkpoint(db_session, NEW_MODEL) == 0
+
+    assert reembed.promote(db_session, model=NEW_MODEL, batch_size=3) == 7
+    assert _models(db_session) == {cid: NEW_MODEL for cid in ids}
+    assert reembed.status(db_session, model=NEW_MODEL)["staged"] == 0
+
+    vec = json.loads(
+        db_session.execute(text("SELECT embedding FROM claim_embedding WHERE claim_id = :id"), {"id": ids[0]}).scalar()
+    )
+    expected = list(reversed(embedder.embed("Claim number 0.")))
+    assert vec[0] == pytest.approx(expected[0] / sum(x * x for x in expected) ** 0.5)
+
+    # Nothing left to do for this model
+    assert asyncio.run(reembed.backfill(db_session, CountingProvider(), model=NEW_MODEL)) == 0
+
+
+def test_backfill_resumes_after_failure(db_session, embedder):
+    _seed(db_session, embedder, 6)
+
+    failing = CountingProvider(fail_on_call=3)
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            reembed.backfill(
+                db_session,
+                failing,
+                model=NEW_MODEL,
+                batch_size=2,
+                concurrency=1,
+                max_attempts=1,
+            )
+        )
+    checkpoint = reembed.load_checkpoint(db_session, NEW_MODEL)
+    assert checkpoint > 0
+    assert reembed.status(db_session, model=NEW_MODEL)["staged"] == 4
+
+    resumed = CountingProvider()
+    assert asyncio.run(reembed.backfill(db_session, resumed, model=NEW_MODEL, batch_size=2)) == 2
+    assert resumed.texts == ["Claim number 4.", "Claim number 5."]
+
+
+def test_stale_model_vectors_are_not_searched_and_get_replaced(db_session, embedder):
+    from app.vector_index import get_vector_index
+
+    ids = _seed(db_session, embedder, 3)
+    db_session.execute(
+        text("UPDATE claim_embedding SET embedding_model = 'old-model' WHERE claim_id = :id"),
+        {"id": ids[0]},
+    )
+    db_session.commit()
+
+    index = get_vector_index(db_session)
+    index.sync(db_session)
+    assert ids[0] not in index
+    assert ids[1] in index
+
+    # Checking the claim again re-embeds it with the active model.
+    claim_id, created = get_or_create_claim_with_embedding(
+        db_session,
+        claim_text="Claim number 0.",
+        embedder=embedder,
+    )
+    assert (claim_id, created) == (ids[0], True)
+    assert _models(db_session)[ids[0]] == EMBEDDINGS_MODEL
@@ -0,0 +1,170 @@
+import json
+
+import numpy as np
+from sqlalchemy import text
+
+from app.config import EMBEDDINGS_MODEL
+from app.db import get_or_create_claim_with_embedding
+from app.segment_store import SegmentStore, store_path
+from app.similarity import l2_normalize
+from app.vector_index import EmbeddingMatrix
+
+
+def _unit(n, dims, seed=0):
+    X = np.random.default_rng(seed).standard_normal((n, dims)).astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def test_store_appends_across_segments_and_reopens(tmp_path):
+    X = _unit(10, 4)
+    store = SegmentStore(str(tmp_path), segment_rows=4)
+    assert store.append([(cid, X[cid - 1]) for cid in range(1, 8)]) == 7
+    assert store.append([(3, X[2]), (8, X[7])]) == 1
+
+    reopened = SegmentStore(str(tmp_path), segment_rows=4)
+    assert len(reopened) == 8 and reopened.max_claim_id == 8
+    assert [len(ids) for ids, _ in reopened.blocks()] == [4, 4]
+    ids, vectors = reopened.blocks()[1]
+    assert ids.tolist() == [5, 6, 7, 8]
+    assert np.allclose(vectors[0], X[4])
+
+
+def test_store_ignores_torn_append(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    store.append([(1, [1.0, 0.0])])
+    # Vector bytes written without their id
+    with open(tmp_path / "seg-000000.f32", "ab") as f:
+        f.write(np.asarray([0.0, 1.0], dtype=np.float32).tobytes())
+
+    reopened = SegmentStore(str(tmp_path))
+    assert len(reopened) == 1
+    reopened.append([(2, [0.0, 1.0])])
+    assert SegmentStore(str(tmp_path)).blocks()[0][0].tolist() == [1, 2]
+
+
+def test_reconcile_and_warm_start(db_session, embedder, tmp_path):
+    ids = [
+        get_or_create_claim_with_embedding(db_session, claim_text=t, embedder=embedder)[0]
+        for t in ("one", "two", "three")
+    ]
+
+    store = SegmentStore(str(tmp_path))
+    assert store.reconcile(db_session) == 3
+    assert store.reconcile(db_session) == 0
+
+    index = EmbeddingMatrix()
+    assert index.load_segments(store) == 3
+    assert index.synced_through == store.synced_seq > 0
+    assert index.sync(db_session) == 0
+
+    query = embedder.embed("two")
+    assert index.search(query, 1)[0][0] == ids[1]
+
+    # Base (mmap) rows can be discarded; new rows go to the tail.
+    index.discard([ids[1]])
+    assert ids[1] not in [cid for cid, _ in index.search(query, 3)]
+    id4, _ = get_or_create_claim_with_embedding(db_session, claim_text="four", embedder=embedder)
+    assert index.sync(db_session) == 1
+    assert index.search(embedder.embed("four"), 1)[0][0] == id4
+    assert len(index) == 3
+
+
+def _reserve(db, claim_id):
+    db.execute(
+        text("INSERT INTO claim (claim_id, claim_text, content_hash) VALUES (:id, :t, :h)"),
+        {"id": claim_id, "t": f"claim {claim_id}", "h": f"h{claim_id}"},
+    )
+
+
+def _embed(db, claim_id, vec, model=EMBEDDINGS_MODEL):
+    db.execute(
+        text(
+            """
+            INSERT INTO claim_embedding (claim_id, embedding_model, embedding)
+            VALUES (:id, :m, :e)
+            ON CONFLICT (claim_id) DO UPDATE
+            SET embedding_model = excluded.embedding_model, embedding = excluded.embedding
+            """
+        ),
+        {"id": claim_id, "m": model, "e": json.dumps([float(x) for x in vec])},
+    )
+
+
+def test_sync_picks_up_out_of_order_and_rewritten_embeddings(db_session, tmp_path):
+    X = _unit(3, 4, seed=1)
+    for cid in (1, 2, 3):
+        _reserve(db_session, cid)
+    # claim 2 commits first; claim 1 (reserved earlier) commits later, and
+    # claim 3 still carries another model's embedding.
+    _embed(db_session, 2, X[1])
+    _embed(db_session, 3, X[2], model="old-model")
+
+    store = SegmentStore(str(tmp_path))
+    assert store.reconcile(db_session) == 1
+    index = EmbeddingMatrix()
+    index.load_segments(store)
+    assert 2 in index and 1 not in index and 3 not in index
+
+    _embed(db_session, 1, X[0])
+    # Promote-style rewrite of an old row to the current model
+    _embed(db_session, 3, X[2])
+    assert index.sync(db_session) == 2
+    assert 1 in index and 3 in index
+    assert index.search(X[0], 1)[0][0] == 1
+
+    assert store.reconcile(db_session) == 2
+    reopened = SegmentStore(str(tmp_path))
+    assert len(reopened) == 3 and all(cid in reopened for cid in (1, 2, 3))
+
+
+def test_store_is_rebuilt_for_another_model(tmp_path):
+    X = _unit(3, 4)
+    SegmentStore(str(tmp_path), model="old-model").append([(1, X[0]), (2, X[1])])
+
+    store = SegmentStore(str(tmp_path), model="new-model")
+    assert len(store) == 0 and store.dims is None
+    assert store.append([(3, X[2][:2])]) == 1
+    assert store.dims == 2 and [ids.tolist() for ids, _ in store.blocks()] == [[3]]
+    assert store_path("/cache", "org/model:v2") == "/cache/org_model_v2"
+
+
+def test_reconcile_replaces_rewritten_rows(db_session, tmp_path):
+    X = _unit(2, 4, seed=2)
+    _reserve(db_session, 1)
+    _embed(db_session, 1, X[0])
+
+    store = SegmentStore(str(tmp_path), segment_rows=4)
+    assert store.reconcile(db_session) == 1
+
+    # Re-embedded in place under the same claim_id
+    _embed(db_session, 1, X[1])
+    assert store.reconcile(db_session) == 1
+
+    reopened = SegmentStore(str(tmp_path), segment_rows=4)
+    assert len(reopened) == 1
+    assert reopened.blocks()[0][0].tolist() == [-1, 1]
+
+    index = EmbeddingMatrix()
+    assert index.load_segments(reopened) == 1
+    assert len(index) == 1
+    hit = index.search(X[1], 1)[0]
+    assert hit[0] == 1 and np.isclose(hit[1], 1.0)
+
+
+def test_restarts_do_not_duplicate_live_appends(db_session, embedder, tmp_path):
+    store = SegmentStore(str(tmp_path))
+    get_or_create_claim_with_embedding(db_session, claim_text="one", embedder=embedder)
+    store.reconcile(db_session)
+
+    # Written by the service after the reconcile, mirrored without a seq
+    for t in ("two", "three"):
+        cid, _ = get_or_create_claim_with_embedding(db_session, claim_text=t, embedder=embedder)
+        store.append([(cid, l2_normalize(embedder.embed(t))[0])])
+
+    def stored_rows():
+        return sum(len(ids) for ids, _ in store.blocks())
+
+    for _ in range(2):
+        store = SegmentStore(str(tmp_path))
+        assert store.reconcile(db_session) == 0
+        assert stored_rows() == len(store) == 3
@@ -14,3 +14,23 @@ def test_similarity_opposite():
     b = [-1.0, 0.0]
     assert cosine_similarity(a, b) == -1.0
 
+
+def test_normalized_dot_matches_cosine():
+    from app.similarity import dot_similarity, l2_normalize
+
+    a, na = l2_normalize([3.0, 4.0])
+    b, _ = l2_normalize([4.0, 3.0])
+    assert na == 5.0
+    assert abs(dot_similarity(a, b) - cosine_similarity([3.0, 4.0], [4.0, 3.0])) < 1e-12
+
+def test_normalize_zero_vector():
+    from app.similarity import l2_normalize
+
+    assert l2_normalize([0.0, 0.0]) == ([0.0, 0.0], 0.0)
+
+def test_shadow_embedding_is_normalized_prefix():
+    from app.similarity import shadow_embedding
+
+    short = shadow_embedding([0.6, 0.8, 0.0, 5.0], 2)
+    assert short == [0.6, 0.8]
+    assert shadow_embedding([3.0, 4.0, 1.0], 2) == [0.6, 0.8]
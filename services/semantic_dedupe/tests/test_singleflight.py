@@ -0,0 +1,111 @@
+import asyncio
+
+from app.singleflight import SingleFlight
+from test_batch import ClusteredStubProvider
+
+
+def test_do_runs_once_per_key():
+    flights = SingleFlight()
+    calls = []
+
+    async def work(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def run():
+        return await asyncio.gather(
+            flights.do("a", lambda: work("a")),
+            flights.do("a", lambda: work("a")),
+            flights.do("b", lambda: work("b")),
+        )
+
+    results = asyncio.run(run())
+    assert results == [("A", False), ("A", True), ("B", False)]
+    assert calls == ["a", "b"]
+    assert flights.stats() == {"leaders": 2, "shared": 1, "in_flight": 0}
+
+
+def test_do_many_sends_each_key_once():
+    flights = SingleFlight()
+    calls = []
+
+    async def work(keys):
+        calls.append(list(keys))
+        await asyncio.sleep(0.01)
+        return [k * 2 for k in keys]
+
+    async def run():
+        return await asyncio.gather(
+            flights.do_many(["a", "b", "a"], work),
+            flights.do_many(["b", "c"], work),
+        )
+
+    assert asyncio.run(run()) == [["aa", "bb", "aa"], ["bb", "cc"]]
+    assert calls == [["a", "b"], ["c"]]
+
+
+def test_do_many_propagates_errors():
+    flights = SingleFlight()
+
+    async def fail(keys):
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            flights.do_many(["a"], fail),
+            flights.do_many(["a"], fail),
+            return_exceptions=True,
+        )
+
+    assert [str(r) for r in asyncio.run(run())] == ["boom", "boom"]
+
+
+def test_concurrent_identical_checks_share_one_claim(make_async_db_session, monkeypatch):
+    import app.api as api
+
+    class CountingProvider(ClusteredStubProvider):
+        calls = 0
+
+        async def aembed_many(self, texts):
+            CountingProvider.calls += len(texts)
+            await asyncio.sleep(0.01)
+            return self.embed_many(texts)
+
+    monkeypatch.setattr(api, "embedder", CountingProvider())
+    texts = ["Nuclear power is safe.", "nuclear power is safe", "Nuclear  power, is safe!"]
+
+    request_sessions, leader_sessions = [], []
+    prefetch = api.prefetch_embeddings
+
+    async def recording_prefetch(db, claim_texts):
+        leader_sessions.append(db)
+        return await prefetch(db, claim_texts)
+
+    monkeypatch.setattr(api, "prefetch_embeddings", recording_prefetch)
+
+    async def request(engine, claim_text):
+        # One session per request, as get_async_db gives each request
+        db = await make_async_db_session(bind=engine)
+        request_sessions.append(db)
+        try:
+            return await api.check_duplicate(api.CheckDuplicateRequest(claim_text=claim_text, top_k=3), db)
+        finally:
+            await db.close()
+
+    async def run():
+        first = await make_async_db_session()
+        await first.close()
+        try:
+            return await asyncio.gather(*(request(first.bind, t) for t in texts))
+        finally:
+            await first.bind.dispose()
+
+    results = asyncio.run(run())
+    assert len({r["claim_id"] for r in results}) == 1
+    assert [r["created"] for r in results].count(True) == 1
+    assert CountingProvider.calls == 1
+    # The leader works in its own session, not in the request that started it.
+    assert len(leader_sessions) == 1
+    assert all(leader_sessions[0] is not db for db in request_sessions)
+
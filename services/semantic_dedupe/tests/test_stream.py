@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+from test_batch import CLAIMS, ClusteredStubProvider
+
+
+def _body(lines, chunk_size):
+    data = "\n".join(lines).encode()
+    return [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+
+async def _chunks(chunks, consumed=None):
+    for chunk in chunks:
+        if consumed is not None:
+            consumed.append(chunk)
+        yield chunk
+
+
+def _stream(make_async_db_session, chunks, **kwargs):
+    import app.api as api
+
+    async def run():
+        db = await make_async_db_session()
+        try:
+            return [json.loads(line) async for line in api.stream_check_duplicates(db, chunks, 3, **kwargs)]
+        finally:
+            await db.close()
+            await db.bind.dispose()
+
+    return asyncio.run(run())
+
+
+def test_stream_matches_sequential_checks(make_db_session, make_async_db_session, monkeypatch):
+    import app.api as api
+
+    monkeypatch.setattr(api, "embedder", ClusteredStubProvider())
+    lines = [json.dumps({"claim_text": t}) if i % 2 else json.dumps(t) for i, t in enumerate(CLAIMS)]
+    lines.insert(2, "{not json")
+    lines.insert(4, "")
+
+    out = _stream(make_async_db_session, _chunks(_body(lines, 7)), window_size=3)
+
+    summary = out.pop()["summary"]
+    errors = [r for r in out if "error" in r]
+    results = sorted((r for r in out if "error" not in r), key=lambda r: r["line"])
+    assert [e["line"] for e in errors] == [3]
+    assert summary["lines"] == len(lines)
+    assert summary["claims"] == len(CLAIMS)
+    assert summary["errors"] == 1
+    assert summary["windows"] == 3
+
+    seq_db = make_db_session()
+    sequential = [api.compute_one(seq_db, t, 3) for t in CLAIMS]
+    assert summary["created"] == sum(s["created"] for s in sequential)
+    for r, s in zip(results, sequential):
+        assert r["claim_id"] == s["claim_id"]
+        assert r["classification"] == s["classification"]
+        assert r["cluster_id"] == s["cluster_id"]
+
+
+def test_stream_reads_one_window_ahead(make_async_db_session, monkeypatch):
+    import app.api as api
+
+    monkeypatch.setattr(api, "embedder", ClusteredStubProvider())
+    chunks = [(json.dumps(t) + "\n").encode() for t in CLAIMS]
+    consumed = []
+
+    async def run():
+        db = await make_async_db_session()
+        try:
+            stream = api.stream_check_duplicates(db, _chunks(chunks, consumed), 3, window_size=2)
+            first = await stream.__anext__()
+            seen = len(consumed)
+            rest = [line async for line in stream]
+            return first, seen, rest
+        finally:
+            await db.close()
+            await db.bind.dispose()
+
+    first, seen, rest = asyncio.run(run())
+    assert json.loads(first)["line"] == 1
+    assert seen == 2  # only the first window was read before results went out
+    assert len(rest) == len(CLAIMS)  # remaining results + summary
+
+
+def test_overlong_line_ends_stream_with_summary(make_async_db_session, monkeypatch):
+    import app.api as api
+
+    monkeypatch.setattr(api, "embedder", ClusteredStubProvider())
+    lines = [json.dumps(CLAIMS[0]), json.dumps("x" * 200), json.dumps(CLAIMS[1])]
+
+    out = _stream(make_async_db_session, _chunks(_body(lines, 16)), max_line_bytes=64)
+
+    assert [r["line"] for r in out[:-1]] == [1]
+    summary = out[-1]["summary"]
+    assert summary["claims"] == 1
+    assert "line 2" in summary["aborted"]
+
+
+def test_stream_endpoint_over_http(monkeypatch):
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import StaticPool
+
+    import app.api as api
+    from app.db import get_async_db
+    from conftest import _create_schema
+
+    monkeypatch.setattr(api, "embedder", ClusteredStubProvider())
+    engines = []
+
+    async def override():
+        # Created lazily, inside the TestClient's event loop
+        if not engines:
+            engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(_create_schema)
+            engines.append(engine)
+        async with async_sessionmaker(bind=engines[0], expire_on_commit=False)() as db:
+            yield db
+
+    monkeypatch.setitem(api.app.dependency_overrides, get_async_db, override)
+
+    def body():
+        for t in CLAIMS[:3]:
+            yield (json.dumps({"claim_text": t}) + "\n").encode()
+
+    with TestClient(api.app) as client:
+        resp = client.post("/claims/check-duplicate-stream?top_k=3", content=body())
+        bad = client.post("/claims/check-duplicate-stream?top_k=0", content=b"")
+        client.portal.call(engines[0].dispose)
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    out = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["line"] for r in out[:-1]] == [1, 2, 3]
+    assert out[-1]["summary"]["claims"] == 3
+    assert bad.status_code == 422
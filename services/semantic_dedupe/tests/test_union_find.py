@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.clustering import UnionFind, intra_batch_topk, merge_topk
+
+
+def test_union_is_rooted_at_target():
+    uf = UnionFind()
+    uf.union(2, 1)
+    uf.union(3, 2)
+    uf.union(5, 4)
+    assert uf.find(3) == 1
+    assert uf.find(5) == 4
+    assert sorted(map(sorted, uf.components().values())) == [[1, 2, 3], [4, 5]]
+
+
+def test_intra_batch_topk_respects_visibility():
+    vecs = np.eye(3, dtype=np.float32)
+    vecs[2] = [0.6, 0.8, 0.0]
+
+    hits = intra_batch_topk(vecs, vecs, visible=[1, 2, 3], top_k=2, self_index=[0, 1, 2])
+
+    assert hits[0] == []
+    assert [j for j, _ in hits[1]] == [0]
+    assert [j for j, _ in hits[2]] == [1, 0]
+    assert abs(hits[2][0][1] - 0.8) < 1e-6
+
+
+def test_merge_topk_dedupes_by_claim():
+    merged = merge_topk(
+        [
+            [{"claim_id": 1, "similarity": 0.5}, {"claim_id": 2, "similarity": 0.4}],
+            [{"claim_id": 2, "similarity": 0.9}],
+        ],
+        top_k=5,
+    )
+    assert [(m["claim_id"], m["similarity"]) for m in merged] == [(2, 0.9), (1, 0.5)]
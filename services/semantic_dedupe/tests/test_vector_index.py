@@ -0,0 +1,56 @@
+from app.db import get_or_create_claim_with_embedding
+from app.similarity import cosine_similarity
+from app.vector_index import EmbeddingMatrix, get_vector_index
+
+
+def test_matrix_topk_matches_bruteforce(embedder):
+    index = EmbeddingMatrix(initial_capacity=2)
+    vectors = {cid: embedder.embed(f"claim {cid}") for cid in range(1, 40)}
+    for cid, vec in vectors.items():
+        index.add(cid, vec)
+
+    query = vectors[7]
+    expected = sorted(
+        (cid for cid in vectors if cid != 7),
+        key=lambda cid: cosine_similarity(query, vectors[cid]),
+        reverse=True,
+    )[:5]
+
+    hits = index.search(query, 5, exclude=(7,))
+    assert [cid for cid, _ in hits] == expected
+    for cid, sim in hits:
+        assert abs(sim - cosine_similarity(query, vectors[cid])) < 1e-5
+
+
+def test_matrix_rejects_duplicates_and_bad_dims():
+    index = EmbeddingMatrix()
+    assert index.add(1, [1.0, 0.0]) is True
+    assert index.add(1, [0.0, 1.0]) is False
+    assert index.add(2, [1.0, 0.0, 0.0]) is False
+    assert len(index) == 1
+    assert index.search([1.0, 0.0], 5, exclude=(1,)) == []
+
+
+def test_matrix_sync_is_incremental(db_session, embedder):
+    index = get_vector_index(db_session)
+    assert index.sync(db_session) == 0
+
+    id1, _ = get_or_create_claim_with_embedding(db_session, claim_text="one", embedder=embedder)
+    assert index.sync(db_session) == 1
+
+    id2, _ = get_or_create_claim_with_embedding(db_session, claim_text="two", embedder=embedder)
+    assert index.sync(db_session) == 1
+    assert index.sync(db_session) == 0
+
+    assert id1 in index and id2 in index
+
+
+def test_matrix_direct_add_does_not_hide_older_rows(db_session, embedder):
+    id1, _ = get_or_create_claim_with_embedding(db_session, claim_text="one", embedder=embedder)
+    id2, _ = get_or_create_claim_with_embedding(db_session, claim_text="two", embedder=embedder)
+
+    index = get_vector_index(db_session)
+    index.add(id2, embedder.embed("two"))
+    index.sync(db_session)
+
+    assert id1 in index and len(index) == 2